@@ -241,7 +241,7 @@ start_tts_service() {
             python3 tts_server.py --host 127.0.0.1 --port "$TTS_PORT" --device "$TTS_DEVICE" > "$LOGS_DIR/tts_real.log" 2>&1 &
             echo $! > "$LOGS_DIR/tts.pid"
         )
-        log_success "Real TTS started"
+        log_success "Real TTS started (model loads in background, /health reports 'loading' until ready)"
     else
         (
             cd "$REPO_ROOT/web"
@@ -14,12 +14,15 @@ ATLAS Whisper.cpp Speech Recognition Service (Metal on Apple Silicon)
   - Для Metal: whisper.cpp должен быть собран с Metal, используйте -ngl > 0
 
 Примечание: whisper.cpp не поддерживает WebM/Opus напрямую, поэтому мы конвертируем
-в WAV PCM 16k mono через PyAV.
+в WAV PCM 16k mono: PyAV декодирует, частоту меняет общий ресемплер
+ukrainian-tts/ukrainian_tts/resampling.py (фильтры кешируются).
 """
 
+import importlib.util
 import json
 import logging
 import os
+import wave
 import tempfile
 import subprocess
 from datetime import datetime
@@ -99,8 +102,73 @@ def _check_ready():
     return bin_ok, model_ok
 
 
+def _load_shared_resampling():
+    """Общий ресемплер `ukrainian_tts.resampling` (кешированные полифазные фильтры).
+
+    Загружается из файла: импорт пакета ukrainian_tts потянул бы TTS-фронтенд.
+    Без numpy/scipy возвращает None, и конвертация идёт через PyAV.
+    """
+    path = Path(__file__).resolve().parents[2] / 'ukrainian-tts' / 'ukrainian_tts' / 'resampling.py'
+    try:
+        import scipy.signal  # noqa: F401
+        spec = importlib.util.spec_from_file_location('atlas_resampling', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except (OSError, ImportError) as e:
+        logger.warning(f'Shared resampler unavailable ({e}), using PyAV resampler')
+        return None
+    module.warm()
+    return module
+
+
+RESAMPLING = _load_shared_resampling()
+TARGET_RATE = 16000
+
+
 def _convert_to_wav16k_mono(in_path: str, out_path: str):
     """Конвертировать входной аудио-файл (webm/opus/...) в PCM WAV 16k mono."""
+    if RESAMPLING is None:
+        return _convert_to_wav16k_mono_av(in_path, out_path)
+    import numpy as np
+
+    input_container = av.open(in_path)
+    try:
+        audio_stream = next((s for s in input_container.streams if s.type == 'audio'), None)
+        if audio_stream is None:
+            raise RuntimeError('No audio stream found')
+
+        # PyAV только декодирует и сводит в float32 mono на исходной частоте; частоту меняет общий ресемплер
+        to_mono = av.AudioResampler(format='flt', layout='mono')
+        stream = None
+        with wave.open(out_path, 'wb') as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(TARGET_RATE)
+
+            def write(samples):
+                if len(samples):
+                    pcm = np.clip(samples * 32768.0, -32768, 32767).astype('<i2')
+                    out.writeframes(pcm.tobytes())
+
+            def mono_frames():
+                for frame in input_container.decode(audio_stream):
+                    if isinstance(frame, av.AudioFrame):
+                        yield from to_mono.resample(frame)
+                # хвост, который AudioResampler держит у себя до сброса
+                yield from to_mono.resample(None)
+
+            for mono in mono_frames():
+                if stream is None:
+                    stream = RESAMPLING.StreamResampler(mono.sample_rate, TARGET_RATE)
+                write(stream.process(mono.to_ndarray().reshape(-1)))
+            if stream is not None:
+                write(stream.flush())
+    finally:
+        input_container.close()
+
+
+def _convert_to_wav16k_mono_av(in_path: str, out_path: str):
+    """То же самое через av.AudioResampler (когда numpy/scipy недоступны)."""
     input_container = av.open(in_path)
     audio_stream = None
     for stream in input_container.streams:
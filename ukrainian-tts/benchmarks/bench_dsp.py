@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Benchmark every post-processing step and check them against golden outputs.
+
+Effects: the FX presets of `quick_tts_demo.py` (`fx_presets/`), the server's
+time stretch, pitch shift and LUFS loudness normalisation (`normalise`, also
+past the limiter ceiling and streaming), the AGC + limiter `dsp.Normaliser`
+(`agc`, no longer on an output path), `add_silence_at_boundaries`, the
+in-process sox chain (`--sox` adds the sox binary through `sox_process`),
+resampling and `convert_wav.convert`. Each runs on synthetic speech-like
+audio of several lengths (1 s, 10 s, 5 min by default) and on any audio
+files given with `--audio`, and reports milliseconds per audio second and
+peak memory (tracemalloc, a separate run). `--json` writes the results for
+regression tracking.
+
+`data/dsp_golden.json` holds fingerprints (length, peak, RMS, 64 block RMS
+values) of every effect's output for a fixed-seed input. The check runs
+first and fails on numerical drift; when an optimisation changes the output
+on purpose, re-record it with `--update-golden`. `data/sox_overdrive.npz`
+holds renders of the real sox `overdrive` (libsox 14.4.2) of the first half
+second of that input, keyed `<gain>_<colour>`; `soxchain.overdrive` has to
+match them sample for sample.
+
+Usage:
+  python ukrainian-tts/benchmarks/bench_dsp.py --check
+  python ukrainian-tts/benchmarks/bench_dsp.py --seconds 1 10 300 --json /tmp/dsp.json
+  python ukrainian-tts/benchmarks/bench_dsp.py --only fx: normalise --audio ukrainian-tts/samples/*.wav
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(ROOT))  # ukrainian_accentor fallback lives at repo root
+sys.path.insert(0, os.path.join(ROOT, 'vocoder'))
+
+import soundfile as sf  # noqa: E402
+
+from ukrainian_tts.dsp import normaliser  # noqa: E402
+from ukrainian_tts.fx import default_library  # noqa: E402
+from ukrainian_tts.loudness import LoudnessNormaliser, normalise  # noqa: E402
+from ukrainian_tts.pitch import pitch_shift  # noqa: E402
+from ukrainian_tts.resampling import resample  # noqa: E402
+from ukrainian_tts.soxchain import SoxChain, overdrive  # noqa: E402
+from ukrainian_tts.timescale import wsola  # noqa: E402
+from add_pauses_and_process import STYLES, add_silence_at_boundaries, sox_process  # noqa: E402
+from convert_wav import convert  # noqa: E402
+
+GOLDEN = os.path.join(HERE, 'data', 'dsp_golden.json')
+SOX_RENDERS = os.path.join(HERE, 'data', 'sox_overdrive.npz')
+GOLDEN_SEED = 1234
+GOLDEN_SECONDS = 1.5
+SAMPLE_RATE = 22050
+# fingerprints may move by float32 rounding, not more
+GOLDEN_RTOL = 1e-3
+GOLDEN_ATOL = 1e-5
+
+
+def speech_like(seconds, sr=SAMPLE_RATE, seed=0):
+    """Voiced phrases (gliding harmonics plus breath noise) separated by pauses."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    t = np.arange(n) / sr
+    f0 = 140.0 * (1 + 0.08 * np.sin(2 * np.pi * 0.7 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    # 1.2 s phrases and 0.3 s pauses, with short fades
+    envelope = np.clip(np.minimum((t % 1.5) / 0.02, (1.2 - t % 1.5) / 0.02), 0.0, 1.0)
+    audio = 0.25 * voice * envelope + 0.01 * rng.standard_normal(n)
+    return audio.astype(np.float32)
+
+
+def _via_files(fn, suffix='.wav'):
+    """Run a file-to-file step on an array: write, call, read back."""
+    def run(audio, sr):
+        with tempfile.TemporaryDirectory() as tmp:
+            src, dst = os.path.join(tmp, 'in' + suffix), os.path.join(tmp, 'out' + suffix)
+            sf.write(src, audio, sr, subtype='FLOAT')
+            fn(src, dst)
+            return sf.read(dst, dtype='float32')[0]
+    return run
+
+
+def effects(with_sox=False):
+    """name -> fn(audio, sr) returning the processed audio."""
+    rough = STYLES['rough']
+    chain = SoxChain(tempo=rough['tempo'], pitch_semitones=rough['pitch'], overdrive_db=rough['overdrive'],
+                     bass_gain=rough['bass'], treble_gain=rough['treble'])
+    table = {}
+    library = default_library()
+    for name in library.names():
+        table[f'fx:{name}'] = lambda audio, sr, preset=library.get(name): preset.apply(audio, sr)
+    table.update({
+        'time_stretch': lambda audio, sr: wsola(audio, 1.25, sr),
+        'pitch': lambda audio, sr: pitch_shift(audio, sr, -4),
+        'normalise': lambda audio, sr: normalise(audio, sr),
+        'agc': lambda audio, sr: normaliser(sr).apply(audio),
+        'loudness_limited': lambda audio, sr: normalise(audio, sr, target_lufs=-6.0),
+        'loudness_stream': lambda audio, sr: LoudnessNormaliser(sr).apply(audio),
+        'resample_44100': lambda audio, sr: resample(audio, sr, 44100),
+        'add_silence_at_boundaries': lambda audio, sr: add_silence_at_boundaries(audio, sr),
+        'sox_chain': lambda audio, sr: chain.apply(audio, sr),
+        'convert_wav': _via_files(lambda src, dst: convert(src, dst, sr=44100, subtype='FLOAT')),
+    })
+    if with_sox:
+        table['sox_binary'] = _via_files(lambda src, dst: sox_process(
+            src, dst, tempo=rough['tempo'], pitch_semitones=rough['pitch'], overdrive_db=rough['overdrive'],
+            bass_gain=rough['bass'], treble_gain=rough['treble']))
+    return table
+
+
+def fingerprint(audio):
+    audio = np.asarray(audio, dtype=np.float64).reshape(-1)
+    blocks = np.array_split(audio, 64) if len(audio) >= 64 else [audio]
+    return {
+        'length': int(len(audio)),
+        'peak': float(np.abs(audio).max()) if len(audio) else 0.0,
+        'rms': float(np.sqrt(np.mean(audio ** 2))) if len(audio) else 0.0,
+        'blocks': [float(np.sqrt(np.mean(b ** 2))) if len(b) else 0.0 for b in blocks],
+    }
+
+
+def check_golden(table, update=False):
+    audio = speech_like(GOLDEN_SECONDS, seed=GOLDEN_SEED)
+    current = {name: fingerprint(fn(audio.copy(), SAMPLE_RATE)) for name, fn in table.items() if name != 'sox_binary'}
+    if update or not os.path.exists(GOLDEN):
+        with open(GOLDEN, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=1, sort_keys=True)
+        print(f'golden outputs written: {len(current)} effects -> {GOLDEN}')
+        return True
+    with open(GOLDEN, 'r', encoding='utf-8') as f:
+        golden = json.load(f)
+    ok = True
+    for name, got in current.items():
+        expected = golden.get(name)
+        if expected is None:
+            print(f'NEW      {name} (no golden output; re-record with --update-golden)')
+            continue
+        if got['length'] != expected['length']:
+            print(f'DRIFT    {name}: length {got["length"]} != {expected["length"]}')
+            ok = False
+            continue
+        values = np.array([got['peak'], got['rms']] + got['blocks'])
+        reference = np.array([expected['peak'], expected['rms']] + expected['blocks'])
+        if not np.allclose(values, reference, rtol=GOLDEN_RTOL, atol=GOLDEN_ATOL):
+            worst = float(np.max(np.abs(values - reference)))
+            print(f'DRIFT    {name}: fingerprint differs by up to {worst:.2e}')
+            ok = False
+    missing = sorted(set(golden) - set(current))
+    for name in missing:
+        print(f'MISSING  {name}')
+    print(f'golden outputs: {len(current)} effects checked, {"ok" if ok else "DRIFT"}')
+    return ok
+
+
+def check_sox_renders():
+    """Compare `soxchain.overdrive` with the stored sox renders."""
+    audio = speech_like(0.5, seed=GOLDEN_SEED)
+    ok = True
+    with np.load(SOX_RENDERS) as renders:
+        for key in renders.files:
+            gain, colour = (float(v) for v in key.split('_'))
+            worst = float(np.max(np.abs(overdrive(audio, gain, colour) - renders[key])))
+            if worst > GOLDEN_ATOL:
+                print(f'DRIFT    overdrive {gain:g} {colour:g}: differs from sox by up to {worst:.2e}')
+                ok = False
+        print(f'sox renders: {len(renders.files)} overdrive settings checked, {"ok" if ok else "DRIFT"}')
+    return ok
+
+
+def best_time(fn, audio, sr, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(audio.copy(), sr)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(fn, audio, sr):
+    """Peak bytes allocated while `fn` runs, beyond the input."""
+    tracemalloc.start()
+    try:
+        fn(audio.copy(), sr)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def inputs(seconds, paths):
+    for s in seconds:
+        yield f'synthetic {s:g}s', speech_like(s), SAMPLE_RATE
+    for path in paths:
+        audio, sr = sf.read(path, dtype='float32')
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+        yield os.path.basename(path), audio, sr
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--seconds', type=float, nargs='+', default=[1.0, 10.0, 300.0])
+    p.add_argument('--audio', nargs='*', default=[], help='Sample audio files to benchmark as well')
+    p.add_argument('--only', nargs='*', help='Effect names or name prefixes (e.g. fx: normalise)')
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('--sox', action='store_true', help='Also time the sox binary (sox_process)')
+    p.add_argument('--json', help='Write results to this JSON file')
+    p.add_argument('--check', action='store_true', help='Only verify the golden outputs')
+    p.add_argument('--update-golden', action='store_true', help='Re-record the golden outputs')
+    args = p.parse_args()
+
+    table = effects(args.sox)
+    ok = check_sox_renders()
+    ok = check_golden(table, args.update_golden) and ok
+    if args.check or args.update_golden:
+        sys.exit(0 if ok else 1)
+    if args.only:
+        table = {name: fn for name, fn in table.items() if any(name.startswith(prefix) for prefix in args.only)}
+
+    results = []
+    print(f'{"input":>16} {"effect":>28} {"ms/audio s":>11} {"peak MB":>9}')
+    for label, audio, sr in inputs(args.seconds, args.audio):
+        duration = len(audio) / sr
+        for name, fn in table.items():
+            elapsed = best_time(fn, audio, sr, args.repeat)
+            memory = peak_memory(fn, audio, sr)
+            results.append({'input': label, 'seconds': duration, 'sample_rate': sr, 'effect': name,
+                            'ms_per_audio_second': elapsed * 1000 / duration, 'peak_bytes': memory})
+            print(f'{label:>16} {name:>28} {elapsed * 1000 / duration:11.2f} {memory / 1e6:9.1f}')
+
+    if args.json:
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'golden_ok': ok,
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        print('wrote', args.json)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
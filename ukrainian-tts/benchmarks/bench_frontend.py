@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Benchmark the text frontend on the story from `vocoder/run_story_tts.py`.
+
+Compares `sentence_to_stress` with per-word model calls (old behaviour) against
+the batched `stress_with_model_many` resolution.
+
+Usage:
+  python ukrainian-tts/benchmarks/bench_frontend.py --repeat 3
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(ROOT))  # ukrainian_accentor fallback lives at repo root
+
+from ukrainian_tts.formatter import preprocess_text  # noqa: E402
+from ukrainian_tts.frontend import split_sentences  # noqa: E402
+from ukrainian_tts import stress  # noqa: E402
+
+
+def load_story():
+    path = os.path.join(ROOT, 'vocoder', 'run_story_tts.py')
+    with open(path, 'r', encoding='utf-8') as f:
+        s = f.read()
+    start = s.find('STORY = """') + len('STORY = """')
+    return s[start:s.find('"""', start)].strip()
+
+
+def per_word(words):
+    return [stress.stress_with_model(word) for word in words]
+
+
+def run(sentences, batch_function):
+    calls = {'batches': 0, 'words': 0}
+
+    def counted(words):
+        calls['batches'] += 1
+        calls['words'] += len(words)
+        return batch_function(words)
+
+    start = time.perf_counter()
+    out = [stress.sentence_to_stress(s, stress.stress_dict, model_batch_function=counted) for s in sentences]
+    return time.perf_counter() - start, calls, out
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--repeat', type=int, default=3)
+    args = p.parse_args()
+    logging.getLogger('ukrainian_word_stress').setLevel(logging.ERROR)
+
+    sentences = [preprocess_text(s) for s in split_sentences(load_story())]
+    print('Sentences:', len(sentences), 'chars:', sum(len(s) for s in sentences))
+
+    # warm up the Stressifier before timing
+    stress.stress_dict(sentences[0])
+
+    results = {}
+    for name, fn in (('per-word', per_word), ('batched', stress.stress_with_model_many)):
+        best = None
+        for _ in range(args.repeat):
+            elapsed, calls, out = run(sentences, fn)
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = out
+        model_runs = calls['words'] if fn is per_word else calls['batches']
+        print(f'{name:>9}: {best * 1000:8.1f} ms (best of {args.repeat}), model runs: {model_runs}')
+
+    same = sum(a == b for a, b in zip(results['per-word'], results['batched']))
+    print(f'identical sentences: {same}/{len(sentences)}')
+
+
+if __name__ == '__main__':
+    main()
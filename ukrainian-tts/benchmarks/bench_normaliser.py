@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Check and benchmark `formatter.preprocess_text` against the previous implementation.
+
+The golden corpus in `data/normaliser_corpus.json` holds inputs and the outputs
+of the previous, multi-pass normaliser (`legacy_formatter.py`). `--check` fails
+if the current normaliser diverges from it; the benchmark then times both on
+long texts built from the story in `vocoder/run_story_tts.py`.
+
+Usage:
+  python ukrainian-tts/benchmarks/bench_normaliser.py --check
+  python ukrainian-tts/benchmarks/bench_normaliser.py --copies 20 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(ROOT))  # ukrainian_accentor fallback lives at repo root
+sys.path.insert(0, HERE)
+
+from ukrainian_tts.formatter import preprocess_text  # noqa: E402
+from legacy_formatter import preprocess_text as legacy_preprocess_text  # noqa: E402
+
+CORPUS = os.path.join(HERE, 'data', 'normaliser_corpus.json')
+
+
+def load_story():
+    path = os.path.join(ROOT, 'vocoder', 'run_story_tts.py')
+    with open(path, 'r', encoding='utf-8') as f:
+        s = f.read()
+    start = s.find('STORY = """') + len('STORY = """')
+    return s[start:s.find('"""', start)].strip()
+
+
+def check(corpus):
+    failures = 0
+    for case in corpus:
+        got = preprocess_text(case['input'])
+        if got != case['expected']:
+            failures += 1
+            print('MISMATCH', repr(case['input']))
+            print('  expected:', repr(case['expected']))
+            print('  got:     ', repr(got))
+    print(f'golden corpus: {len(corpus) - failures}/{len(corpus)} match')
+    return failures == 0
+
+
+def best_time(fn, text, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--check', action='store_true', help='Only verify the golden corpus')
+    p.add_argument('--copies', type=int, default=10, help='How many times to repeat the story')
+    p.add_argument('--repeat', type=int, default=5)
+    args = p.parse_args()
+
+    with open(CORPUS, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+    ok = check(corpus)
+    if args.check:
+        sys.exit(0 if ok else 1)
+
+    # mix the corpus into the story so numbers, currencies and latin are exercised too
+    text = '\n'.join([load_story()] + [case['input'] for case in corpus]) * args.copies
+    if preprocess_text(text) != legacy_preprocess_text(text):
+        print('WARNING: outputs differ on the benchmark text')
+        ok = False
+
+    legacy = best_time(legacy_preprocess_text, text, args.repeat)
+    current = best_time(preprocess_text, text, args.repeat)
+    print(f'text length: {len(text)} chars')
+    print(f'legacy:  {legacy * 1000:8.1f} ms')
+    print(f'current: {current * 1000:8.1f} ms  ({legacy / current:.1f}x)')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Benchmark `pitch.pitch_shift` against `librosa.effects.pitch_shift`.
+
+The input is a synthetic voiced signal (harmonics of a slowly gliding 150 Hz
+fundamental), so the script can also check the pitch of the result: the
+estimated f0 after the shift must be within a few percent of the target.
+
+Usage:
+  python ukrainian-tts/benchmarks/bench_pitch.py
+  python ukrainian-tts/benchmarks/bench_pitch.py --steps -4 --seconds 1 5 30 --out-rate 48000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(ROOT))  # ukrainian_accentor fallback lives at repo root
+
+from ukrainian_tts.pitch import pitch_shift  # noqa: E402
+
+
+def voiced(seconds, sr, f0=150.0):
+    t = np.arange(int(seconds * sr)) / sr
+    phase = 2 * np.pi * np.cumsum(f0 * (1 + 0.05 * np.sin(2 * np.pi * 3 * t))) / sr
+    return (0.3 * sum(np.sin(k * phase) / k for k in range(1, 15))).astype(np.float32)
+
+
+def estimate_f0(y, sr):
+    """Autocorrelation f0 of a 200 ms excerpt from the middle."""
+    mid = len(y) // 2
+    y = y[mid:mid + int(0.2 * sr)]
+    corr = np.correlate(y, y, 'full')[len(y) - 1:]
+    lo, hi = int(sr / 400), int(sr / 60)
+    return sr / (lo + int(np.argmax(corr[lo:hi])))
+
+
+def best_time(fn, repeat):
+    fn()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--steps', type=float, default=-4.0, help='Shift in semitones (robot fx uses -4)')
+    p.add_argument('--seconds', type=float, nargs='+', default=[1.0, 5.0, 30.0])
+    p.add_argument('--sr', type=int, default=22050)
+    p.add_argument('--out-rate', type=int, default=None, help='Fold a conversion to this rate into the shift')
+    p.add_argument('--repeat', type=int, default=5)
+    args = p.parse_args()
+
+    import librosa  # type: ignore
+
+    ok = True
+    out_rate = args.out_rate or args.sr
+    factor = 2 ** (args.steps / 12)
+    print(f'shift {args.steps:+g} semitones, {args.sr} Hz -> {out_rate} Hz')
+    print(f'{"audio":>8} {"librosa":>16} {"fast":>16} {"speed-up":>9} {"f0 fast":>8} {"target":>8}')
+    for seconds in args.seconds:
+        audio = voiced(seconds, args.sr)
+        target = estimate_f0(audio, args.sr) * factor
+
+        def baseline():
+            y = librosa.effects.pitch_shift(audio, sr=args.sr, n_steps=args.steps)
+            return librosa.resample(y, orig_sr=args.sr, target_sr=out_rate) if out_rate != args.sr else y
+
+        legacy = best_time(baseline, args.repeat)
+        current = best_time(lambda: pitch_shift(audio, args.sr, args.steps, out_rate), args.repeat)
+        f0 = estimate_f0(pitch_shift(audio, args.sr, args.steps, out_rate), out_rate)
+        if abs(f0 / target - 1) > 0.04:
+            print(f'WARNING: f0 {f0:.1f} Hz is off target {target:.1f} Hz')
+            ok = False
+        print(f'{seconds:7.1f}s {legacy * 1000 / seconds:10.2f} ms/s {current * 1000 / seconds:10.2f} ms/s '
+              f'{legacy / current:8.1f}x {f0:8.1f} {target:8.1f}')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
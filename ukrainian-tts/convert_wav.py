@@ -3,25 +3,19 @@
 Usage:
     python3 convert_wav.py in.wav out.wav --sr 44100 --subtype PCM_24
 
-This reads input WAV, optionally rescales (linear) to desired sample rate using librosa,
-normalizes, and writes with requested subtype.
+This streams the input block by block, normalises its loudness (-18 LUFS,
+true peaks limited), resamples it to the desired rate with the shared
+polyphase resampler and writes it with the requested subtype (see
+`ukrainian_tts.mastering`; `master_batch.py` does the same for whole
+directories in parallel).
 """
 import argparse
-import soundfile as sf
-import librosa
-import numpy as np
+
+from ukrainian_tts.mastering import MasterSettings, master_file
 
 
 def convert(infile, outfile, sr=44100, subtype='PCM_24'):
-    audio, src_sr = sf.read(infile, dtype='float32')
-    if audio.ndim > 1:
-        audio = audio.mean(axis=1)
-    if sr != src_sr:
-        audio = librosa.resample(audio, orig_sr=src_sr, target_sr=sr)
-    # normalize
-    peak = float(np.max(np.abs(audio)) or 1.0)
-    audio = (audio / peak) * 0.95
-    sf.write(outfile, audio, sr, subtype=subtype)
+    master_file(infile, outfile, MasterSettings(sample_rate=sr, subtype=subtype))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,59 @@
+"""Batch mastering: resample and normalise many audio files in parallel.
+
+Usage:
+    python3 master_batch.py samples/ 'takes/**/*.wav' --out-dir mastered --sr 44100 --subtype PCM_24
+    python3 master_batch.py samples/ --out-dir mastered --mode peak --ceiling 0.9 --workers 4
+
+Inputs are directories (their audio files) or glob patterns. Files are
+streamed block by block (two passes: measure, then gain + resample + write),
+so memory stays bounded for long recordings. Outputs that are newer than
+their input and were made with the same settings are skipped; --force
+re-masters everything. Inputs with the same name from different
+directories keep their relative paths under --out-dir. Files that fail are
+listed at the end and make the exit status non-zero.
+"""
+import argparse
+import sys
+
+from ukrainian_tts.mastering import MasterSettings, find_inputs, master_batch
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('inputs', nargs='+', help='Directories or glob patterns')
+    p.add_argument('--out-dir', required=True)
+    p.add_argument('--sr', type=int, default=44100)
+    p.add_argument('--subtype', default='PCM_24')
+    p.add_argument('--mode', choices=['loudness', 'peak'], default='loudness')
+    p.add_argument('--ceiling', type=float, default=0.95, help='Peak ceiling (linear; true peak in loudness mode)')
+    p.add_argument('--target-db', type=float, default=-18.0, help='Integrated loudness target (LUFS) for --mode loudness')
+    p.add_argument('--workers', type=int, help='Processes (default: CPU count)')
+    p.add_argument('--force', action='store_true', help='Re-master files that are up to date')
+    args = p.parse_args()
+
+    sources = find_inputs(args.inputs)
+    if not sources:
+        print('No audio files found')
+        sys.exit(1)
+    settings = MasterSettings(args.sr, args.subtype, args.mode, args.ceiling, args.target_db)
+    try:
+        results, wall = master_batch(sources, args.out_dir, settings, workers=args.workers, force=args.force)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    failed = [r for r in results if r.error]
+    done = [r for r in results if not r.skipped and not r.error]
+    for r in done:
+        print(f'{r.output}: {r.seconds:.1f}s, gain {r.gain_db:+.1f} dB')
+    audio = sum(r.seconds for r in done)
+    print(f'{len(done)} mastered, {sum(r.skipped for r in results)} up to date, {len(failed)} failed; '
+          f'{audio:.1f} audio s in {wall:.1f} wall s ({audio / wall if wall > 0 else 0.0:.1f}x real time)')
+    for r in failed:
+        print(f'FAILED {r.source}: {r.error}')
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -11,9 +11,10 @@ import logging
 import argparse
 import io
 import json
-import tempfile
+import atexit
+import threading
 from pathlib import Path
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 # ukrainian_tts import is done lazily in _init_tts() so we can log environment
 # early and avoid module import-time crashes that prevent useful logs.
@@ -26,9 +27,7 @@ try:
     logging.getLogger('ukrainian-tts-server').info(f"Module import time - sys.path (first entries): {sys.path[:6]}")
 except Exception:
     logging.getLogger('ukrainian-tts-server').exception("Failed to log import-time Python environment")
-import soundfile as sf  # type: ignore
-import numpy as np
-import librosa  # type: ignore
+# numpy, librosa, torch and espnet are imported lazily so the port opens immediately
 
 # Налаштування логування
 logging.basicConfig(
@@ -38,10 +37,17 @@ logging.basicConfig(
 logger = logging.getLogger('ukrainian-tts-server')
 
 class UkrainianTTSServer:
-    def __init__(self, host='127.0.0.1', port=3001, device='cpu'):
+    # Версія постобробки (_apply_effects): змінюйте разом з нею, щоб банк фраз перерендерився
+    POSTPROCESS_VERSION = 'lufs-1'
+    
+    def __init__(self, host='127.0.0.1', port=3001, device='cpu', frontend_cache_path=None, workers=None,
+                 phrase_bank_path=None):
         self.host = host
         self.port = port
         self.device = device
+        self.frontend_cache_path = frontend_cache_path
+        self.workers = workers
+        self.phrase_bank_path = phrase_bank_path
         
         # Створюємо Flask app
         self.app = Flask(__name__)
@@ -59,9 +65,18 @@ class UkrainianTTSServer:
         except Exception:
             logger.exception("Failed to log Python environment")
 
-        # Ініціалізуємо TTS
+        # Ініціалізуємо TTS у фоновому потоці: HTTP сервер відповідає на /health
+        # зі статусом 'loading', поки модель завантажується і прогрівається
         self.tts = None
-        self._init_tts()
+        self.scheduler = None
+        self.phrase_bank = None
+        # Формати, які вміє кодувати встановлений libsndfile (визначаються при старті)
+        self.formats = []
+        self.state = 'loading'
+        self._Voices = None
+        self._Stress = None
+        self._init_thread = threading.Thread(target=self._init_tts, name='tts-init', daemon=True)
+        self._init_thread.start()
         
         # Реєструємо маршрути
         self._register_routes()
@@ -70,26 +85,37 @@ class UkrainianTTSServer:
     
     def _init_tts(self):
         """Ініціалізуємо TTS систему"""
+        started = time.time()
         try:
             logger.info(f"Initializing Ukrainian TTS on device: {self.device}")
             # Импортируем реализацию внутри функции, чтобы поймать ModuleNotFoundError
             try:
                 from ukrainian_tts.tts import TTS, Voices, Stress  # type: ignore
+                from ukrainian_tts.frontend import FrontendCache, PersistentFrontendCache  # type: ignore
             except Exception as e:
                 logger.exception("Failed to import ukrainian_tts.tts")
                 self.tts = None
                 # Поместим заглушки, чтобы маршрут /voices и т.д. корректно отвечали
                 self._Voices = None
                 self._Stress = None
+                self.state = 'error'
                 return
 
+            # Кеш фронтенду (нормалізація + наголоси) — персистентний, якщо задано шлях
+            if self.frontend_cache_path:
+                frontend_cache = PersistentFrontendCache(self.frontend_cache_path)
+                atexit.register(frontend_cache.save)
+                logger.info(f"Frontend cache: {self.frontend_cache_path} ({len(frontend_cache)} sentences warmed)")
+            else:
+                frontend_cache = FrontendCache()
+
             # Спробуємо з заданим девайсом, fallback до CPU якщо помилка
             try:
-                self.tts = TTS(cache_folder="../", device=self.device)
+                tts = TTS(cache_folder="../", device=self.device, frontend_cache=frontend_cache, workers=self.workers)
             except Exception as e:
                 if self.device == "mps" and "float64" in str(e).lower():
                     logger.warning("MPS doesn't support float64, falling back to CPU")
-                    self.tts = TTS(cache_folder="../", device="cpu")
+                    tts = TTS(cache_folder="../", device="cpu", frontend_cache=frontend_cache, workers=self.workers)
                     self.device = "cpu"
                 else:
                     raise
@@ -97,12 +123,125 @@ class UkrainianTTSServer:
             # Сохраняем классы для использования в маршрутах
             self._Voices = Voices
             self._Stress = Stress
+            logger.info(f"Ukrainian TTS model loaded in {time.time() - started:.1f}s")
+
+            # Прогрів: перший синтез ініціалізує ліниві частини (stress, kernels)
+            warmup_started = time.time()
+            try:
+                tts.synthesize("Привіт.", Voices.Dmytro.value, Stress.Dictionary.value)
+                logger.info(f"Warm-up synthesis done in {time.time() - warmup_started:.2f}s")
+            except Exception:
+                logger.exception("Warm-up synthesis failed")
+            # фільтри ресемплінгу для типових пар частот, щоб перший запит не чекав на їх розрахунок
+            from ukrainian_tts.resampling import warm as warm_resampling  # type: ignore
+            warm_resampling()
+            # libsndfile може бути зібраний без MP3/Opus: такі формати одразу відхиляються з 400
+            from ukrainian_tts.encoding import available_formats  # type: ignore
+            self.formats = available_formats()
+            logger.info(f"Audio formats: {', '.join(self.formats)}")
 
-            logger.info("Ukrainian TTS initialized successfully")
+            # Планувальник: пріоритети interactive/normal/bulk, витіснення між реченнями
+            from ukrainian_tts.scheduler import SynthesisScheduler  # type: ignore
+            self.scheduler = SynthesisScheduler(tts)
+            from ukrainian_tts.metrics import REGISTRY  # type: ignore
+            REGISTRY.register_collector(self._runtime_samples)
+
+            self.tts = tts
+            self.state = 'ready'
+            logger.info(f"Ukrainian TTS ready in {time.time() - started:.1f}s")
+            self._start_phrase_bank()
 
         except Exception as e:
             logger.exception(f"Failed to initialize Ukrainian TTS: {e}")
             self.tts = None
+            self.state = 'error'
+    
+    def _start_phrase_bank(self):
+        """Банк готових фраз: рендеримо у фоні з пріоритетом bulk, далі віддаємо з пам'яті"""
+        if not self.phrase_bank_path:
+            return
+        try:
+            from ukrainian_tts.phrasebank import PhraseBank  # type: ignore
+            from ukrainian_tts.scheduler import Priority  # type: ignore
+            bank = PhraseBank.from_file(
+                self.phrase_bank_path,
+                os.path.join(self.tts.cache_folder, 'phrase_bank'),
+                self.tts.model_fingerprint,
+                self.tts.voices.vector,
+                self._effect_key,
+            )
+        except Exception:
+            logger.exception(f"Failed to load phrase bank {self.phrase_bank_path}")
+            return
+        
+        def render(phrase):
+            job = self.scheduler.submit(
+                phrase.text, phrase.voice, 'dictionary', priority=Priority.Bulk,
+                postprocess=lambda audio, sr, accented: (*self._apply_effects(audio, sr, phrase.fx), accented),
+            )
+            return job.result()
+        
+        self._render_phrase = render
+        self.phrase_bank = bank
+        self._warm_phrase_bank()
+    
+    def _warm_phrase_bank(self, voice=None):
+        """(Пере)рендер банку у фоні; після зміни голосу його фрази рендеряться наново"""
+        bank = self.phrase_bank
+        if bank is None:
+            return
+        if voice is not None:
+            bank.forget(voice)
+        
+        def warm():
+            warm_started = time.time()
+            bank.warm(self._render_phrase)
+            logger.info(f"Phrase bank ready in {time.time() - warm_started:.1f}s: {bank.stats()}")
+        
+        threading.Thread(target=warm, name='tts-phrase-bank', daemon=True).start()
+    
+    def _effect_key(self, fx):
+        """Що саме означає ефект fx: вміст пресету + версія постобробки (ключ кешу банку фраз)"""
+        from ukrainian_tts.fx import default_library  # type: ignore
+        preset = default_library().get(fx)
+        return f"{self.POSTPROCESS_VERSION}:{fx}:{preset.digest if preset is not None else 'none'}"
+    
+    def _apply_effects(self, audio, sr, fx, out_rate=None):
+        """Звукові ефекти і нормалізація блоками, зі станом між блоками; повертає (audio, sr).
+        Зсув тону на початку пресету одразу переводить аудіо в out_rate (один ресемплінг)"""
+        from ukrainian_tts.fx import default_library  # type: ignore
+        from ukrainian_tts.loudness import normalise  # type: ignore
+        from ukrainian_tts.metrics import span  # type: ignore
+        # Пресет з fx_presets/: фільтри вже скомпільовані в SOS-каскади для цієї частоти
+        preset = default_library().get(fx)
+        if preset is not None:
+            with span('fx'):
+                audio, sr = preset.render(audio, sr, out_rate)
+        
+        # Нормалізуємо за гучністю (LUFS, K-зважування) на місці + true-peak limiter:
+        # окремо синтезовані речення звучать однаково гучно
+        with span('normalisation'):
+            audio = normalise(audio, sr)
+        return audio, sr
+    
+    def _runtime_samples(self):
+        """Стан кешу фронтенду і черги планувальника для /metrics"""
+        if self.tts is not None:
+            stats = self.tts.frontend_cache.stats()
+            yield ('tts_frontend_cache_hits_total', 'counter', 'Frontend cache hits.', stats['hits'])
+            yield ('tts_frontend_cache_misses_total', 'counter', 'Frontend cache misses.', stats['misses'])
+            yield ('tts_frontend_cache_size', 'gauge', 'Sentences in the frontend cache.', stats['size'])
+            yield ('tts_voices', 'gauge', 'Voices in the registry.', len(self.tts.voices))
+        if self.scheduler is not None:
+            stats = self.scheduler.stats()
+            for priority, queued in stats['queued_chunks'].items():
+                yield (f'tts_scheduler_queued_chunks{{priority="{priority}"}}', 'gauge',
+                       'Chunks waiting in the scheduler.', queued)
+            yield ('tts_scheduler_running_chunks', 'gauge', 'Chunks being synthesised.', stats['running_chunks'])
+        if self.phrase_bank is not None:
+            stats = self.phrase_bank.stats()
+            yield ('tts_phrase_bank_hits_total', 'counter', 'Requests served from the phrase bank.', stats['hits'])
+            yield ('tts_phrase_bank_ready', 'gauge', 'Phrases rendered and held in memory.', stats['ready'])
     
     def _register_routes(self):
         """Реєструємо API маршрути"""
@@ -111,9 +250,13 @@ class UkrainianTTSServer:
         def health():
             """Health check endpoint"""
             return jsonify({
-                'status': 'ok' if self.tts else 'error',
-                'tts_ready': self.tts is not None,
+                'status': 'ok' if self.state == 'ready' else self.state,
+                'state': self.state,
+                'tts_ready': self.state == 'ready',
                 'device': self.device,
+                'frontend_cache': self.tts.frontend_cache.stats() if self.tts else None,
+                'scheduler': self.scheduler.stats() if self.scheduler else None,
+                'phrase_bank': self.phrase_bank.stats() if self.phrase_bank else None,
                 'timestamp': time.time()
             })
         
@@ -121,6 +264,14 @@ class UkrainianTTSServer:
         def get_voices():
             """Список доступних голосів"""
             try:
+                if self.tts is not None:
+                    # Реєстр голосів: вбудовані + зареєстровані/змішані
+                    return jsonify({
+                        'voices': self.tts.voices.names(),
+                        'custom': self.tts.voices.custom(),
+                        'default': 'dmytro',
+                        'timestamp': time.time()
+                    })
                 if getattr(self, '_Voices', None) is None or self._Voices is None:
                     return jsonify({'voices': [], 'default': None, 'timestamp': time.time()})
                 voices_list = [v.value for v in self._Voices] if self._Voices else []
@@ -133,12 +284,84 @@ class UkrainianTTSServer:
                 logger.error(f"Error getting voices: {e}")
                 return jsonify({'error': str(e)}), 500
         
+        @self.app.route('/fx', methods=['GET'])
+        def get_fx():
+            """Список пресетів ефектів (fx_presets/*.json)"""
+            try:
+                from ukrainian_tts.fx import default_library  # type: ignore
+                library = default_library()
+                return jsonify({
+                    'fx': ['none'] + library.names(),
+                    'errors': library.errors,
+                    'timestamp': time.time()
+                })
+            except Exception as e:
+                logger.error(f"Error getting fx presets: {e}")
+                return jsonify({'error': str(e)}), 500
+        
+        @self.app.route('/voices', methods=['POST'])
+        def register_voice():
+            """Реєстрація голосу з x-vector файлу (multipart 'xvector') або суміші голосів (JSON 'blend')"""
+            if not self.tts:
+                return jsonify({'error': 'TTS not initialized', 'status': self.state}), 503
+            try:
+                from ukrainian_tts.voices import read_xvector  # type: ignore
+                
+                if 'xvector' in request.files:
+                    upload = request.files['xvector']
+                    name = request.form.get('name', '').strip()
+                    fmt = os.path.splitext(upload.filename or '')[1].lstrip('.') or None
+                    xvector = read_xvector(io.BytesIO(upload.read()), key=request.form.get('key'), format=fmt)
+                    self.tts.voices.register(name, xvector)
+                else:
+                    data = request.get_json(silent=True) or {}
+                    name = str(data.get('name', '')).strip()
+                    blend = data.get('blend')
+                    if not isinstance(blend, dict):
+                        return jsonify({'error': "Send an 'xvector' file or JSON with 'name' and 'blend': {voice: weight}"}), 400
+                    self.tts.voices.blend(name, blend)
+                
+                logger.info(f"Registered voice '{name}' ({len(self.tts.voices)} voices)")
+                self._warm_phrase_bank(name)
+                return jsonify({'status': 'success', 'voice': name, 'voices': self.tts.voices.names()}), 201
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except Exception as e:
+                logger.exception("Voice registration failed")
+                return jsonify({'error': str(e)}), 500
+        
+        @self.app.route('/voices/<name>', methods=['DELETE'])
+        def delete_voice(name):
+            """Видалення зареєстрованого голосу"""
+            if not self.tts:
+                return jsonify({'error': 'TTS not initialized', 'status': self.state}), 503
+            try:
+                self.tts.voices.remove(name)
+                self._warm_phrase_bank(name)
+                return jsonify({'status': 'success', 'voice': name})
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 404
+        
         @self.app.route('/tts', methods=['POST'])
         def synthesize_text():
             """Основний ендпойнт для синтезу мови"""
+            in_flight = False
+            request_start = time.time()
             try:
+                if self.state == 'loading':
+                    return jsonify({'error': 'TTS is loading', 'status': 'loading'}), 503, {'Retry-After': '2'}
                 if not self.tts:
                     return jsonify({'error': 'TTS not initialized'}), 503
+                from ukrainian_tts.encoding import encode_audio, negotiate_rate  # type: ignore
+                from ukrainian_tts.tts import SynthesisCancelled  # type: ignore
+                from ukrainian_tts.metrics import (  # type: ignore
+                    CHARS_PER_SECOND, IN_FLIGHT, REAL_TIME_FACTOR, Timings, span
+                )
+                
+                # Таймінги етапів: потрапляють у /metrics і, за запитом, у відповідь
+                timings = Timings()
+                IN_FLIGHT.inc()
+                in_flight = True
                 
                 data = request.get_json()
                 if not data:
@@ -148,23 +371,40 @@ class UkrainianTTSServer:
                 if not text:
                     return jsonify({'error': 'Text is required'}), 400
                 
-                # Збільшуємо довжину тексту для підтримки повноцінних відповідей в чаті
-                MAX_TEXT_LENGTH = 1500  # символів - достатньо для повних відповідей
-                if len(text) > MAX_TEXT_LENGTH:
-                    logger.warning(f"Text too long ({len(text)} chars), truncating to {MAX_TEXT_LENGTH}")
-                    text = text[:MAX_TEXT_LENGTH].rsplit(' ', 1)[0] + '...'
-                    if len(text) > MAX_TEXT_LENGTH:  # якщо навіть після truncate все ще довго
-                        text = text[:MAX_TEXT_LENGTH]
-                
                 voice = data.get('voice', 'dmytro')
-                fx = data.get('fx', 'none')  # Звукові ефекти
-                speed = float(data.get('speed', 1.0))
+                # Пріоритет (interactive/normal/bulk) і сесія: новий запит сесії скасовує попередні
+                priority = data.get('priority', 'normal')
+                session = data.get('session') or request.headers.get('X-Session-Id')
+                fx = data.get('fx', 'none') or 'none'  # Звукові ефекти: пресет з fx_presets/
+                try:
+                    # Швидкість мовлення застосовується всередині моделі (тривалості/мел-кадри)
+                    speed = float(data.get('speed', 1.0) or 1.0)
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'speed must be a number'}), 400
+                if not 0.25 <= speed <= 4.0:
+                    return jsonify({'error': 'speed must be between 0.25 and 4.0'}), 400
                 return_audio = data.get('return_audio', False)  # Повертати аудіо файл
+                want_timings = bool(data.get('timings', False))
+                # Формат відповіді: кодек (wav/flac/ogg/opus/mp3), частота, канали
+                audio_format = str(data.get('format', 'wav')).lower()
+                try:
+                    out_rate = int(data['sample_rate']) if data.get('sample_rate') else None
+                    channels = int(data.get('channels', 1))
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'sample_rate and channels must be integers'}), 400
+                if return_audio and audio_format not in self.formats:
+                    return jsonify({'error': f"Unsupported format '{audio_format}'. Use one of: {', '.join(self.formats)}"}), 400
+                if channels not in (1, 2) or (out_rate is not None and not 8000 <= out_rate <= 96000):
+                    return jsonify({'error': 'channels must be 1 or 2, sample_rate 8000..96000'}), 400
+                from ukrainian_tts.fx import default_library  # type: ignore
+                if fx != 'none' and fx not in default_library():
+                    return jsonify({'error': f"Unknown fx '{fx}'", 'fx': ['none'] + default_library().names()}), 400
                 
                 logger.info(f"TTS request: text='{text[:50]}...', voice={voice}, fx={fx}, length={len(text)} chars")
                 
-                # Синтезуємо в пам'яті з обробкою помилок
-                buf = io.BytesIO()
+                # Синтезуємо в пам'яті з обробкою помилок (float32, без WAV-кодування)
+                audio = None
+                sr = 0
                 start_time = time.time()
                 stress_val: str = "dictionary"  # Default value
                 accented: str = text  # Initialize with original text - ЗАВЖДИ буде значення
@@ -173,77 +413,73 @@ class UkrainianTTSServer:
                     if hasattr(self._Stress, 'Dictionary'):
                         stress_val = str(self._Stress.Dictionary.value)
 
+                def postprocess(audio, sr, accented):
+                    """Третій етап конвеєра: ефекти, нормалізація, кодування"""
+                    rate = negotiate_rate(audio_format, sr, out_rate) if return_audio else None
+                    audio, sr = self._apply_effects(audio, sr, fx, rate)
+                    encoded = None
+                    if return_audio:
+                        # Єдине кодування, одразу в пам'ять
+                        with span('encoding'):
+                            encoded = encode_audio(audio, sr, audio_format, out_rate, channels)
+                    return audio, sr, accented, encoded
+                
+                # Готові фрази з банку віддаються одразу, без моделі (аудіо вже з ефектом)
+                cached = None
+                if self.phrase_bank is not None and speed == 1.0:
+                    cached = self.phrase_bank.get(text, voice, fx)
+                
+                # Довгий текст синтезується частинами паралельно, без обрізання;
+                # частина, що впала, перезапускається окремо. Фронтенд, модель і
+                # постобробка - окремі етапи конвеєра, що перекриваються між запитами
                 try:
-                    _, accented_result = self.tts.tts(text, voice, stress_val, buf)
-                    if accented_result:  # Перевіряємо що результат не None
-                        accented = accented_result
+                    if cached is not None:
+                        # Готова фраза теж перебиває попередні запити сесії (barge-in)
+                        if session:
+                            self.scheduler.cancel_session(session)
+                        audio, sr, accented = cached
+                        encoded = None
+                        if return_audio:
+                            with span('encoding'):
+                                encoded = encode_audio(audio, sr, audio_format, out_rate, channels)
+                    else:
+                        job = self.scheduler.submit(text, voice, stress_val, speed, priority=priority, session=session,
+                                                     timings=timings, postprocess=postprocess)
+                        audio, sr, accented_result, encoded = job.result()
+                        if accented_result:  # Перевіряємо що результат не None
+                            accented = accented_result
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                except SynthesisCancelled:
+                    logger.info(f"TTS job cancelled (session={session})")
+                    return jsonify({'status': 'cancelled', 'session': session}), 409
                 except Exception as e:
-                    logger.error(f"TTS synthesis failed: {e}")
-                    # accented вже має значення text, використовуємо його
-                    # Якщо текст занадто складний, спробуємо поступово зменшувати розмір
-                    retry_lengths = [800, 500, 300, 150, 80]  # Поступово зменшуємо
-                    success = False
-                    
-                    for retry_length in retry_lengths:
-                        if len(text) > retry_length:
-                            shortened_text = text[:retry_length].rsplit(' ', 1)[0] + '...'
-                            logger.info(f"Retrying with shortened text ({retry_length} chars): '{shortened_text[:50]}...'")
-                            try:
-                                buf = io.BytesIO()  # Очищаємо буфер
-                                _, accented = self.tts.tts(shortened_text, voice, stress_val, buf)
-                                text = shortened_text  # Оновлюємо текст для логування
-                                success = True
-                                break
-                            except Exception as e2:
-                                logger.error(f"Text with {retry_length} chars failed: {e2}")
-                                continue
-                        else:
-                            break
-                    
-                    if not success:
-                        return jsonify({'error': f'TTS synthesis failed even with shortened text: {str(e)}'}), 500
+                    logger.exception("TTS synthesis failed")
+                    return jsonify({'error': f'TTS synthesis failed: {str(e)}'}), 500
                 
                 synthesis_time = time.time() - start_time
-                
-                # Читаємо аудіо
-                buf.seek(0)
-                audio, sr = sf.read(buf, dtype="float32")
-                
-                if audio.ndim > 1:
-                    audio = audio.mean(axis=1)
-                
-                # Застосовуємо швидкість
-                if speed and abs(speed - 1.0) > 1e-3:
-                    try:
-                        audio = librosa.effects.time_stretch(audio, rate=speed)
-                    except Exception:
-                        pass
-                
-                # Застосовуємо звукові ефекти (простий варіант)
-                if fx == "robot":
-                    try:
-                        audio = librosa.effects.pitch_shift(audio, sr=sr, n_steps=-4)
-                    except Exception:
-                        pass
-                
-                # Нормалізуємо
-                peak = float(np.max(np.abs(audio)) or 1.0)
-                audio = (audio / peak) * 0.95
+                audio_duration = len(audio) / sr
+                if audio_duration > 0 and cached is None:
+                    REAL_TIME_FACTOR.observe(synthesis_time / audio_duration)
+                if synthesis_time > 0 and cached is None:
+                    CHARS_PER_SECOND.observe(len(text) / synthesis_time)
                 
                 if return_audio:
                     # Повертаємо аудіо файл
-                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-                    sf.write(temp_file.name, audio, sr, subtype="PCM_16")
-                    
-                    return send_file(
-                        temp_file.name,
-                        mimetype='audio/wav',
+                    out, fmt, out_sr = encoded
+                    response = send_file(
+                        out,
+                        mimetype=fmt.mimetype,
                         as_attachment=True,
-                        download_name=f'tts_{int(time.time())}.wav'
+                        download_name=f'tts_{int(time.time())}.{fmt.extension}'
                     )
+                    response.headers['X-Sample-Rate'] = str(out_sr)
+                    if want_timings:
+                        response.headers['X-TTS-Timings'] = json.dumps(timings.as_dict())
+                    return response
                 else:
                     # Повертаємо JSON відповідь
-                    return jsonify({
+                    reply = {
                         'status': 'success',
                         'accented_text': accented,
                         'synthesis_time': round(synthesis_time, 3),
@@ -251,13 +487,41 @@ class UkrainianTTSServer:
                         'sample_rate': int(sr),
                         'voice': voice,
                         'fx': fx,
+                        'cached': cached is not None,
                         'timestamp': time.time()
-                    })
+                    }
+                    if want_timings:
+                        reply['timings'] = timings.as_dict()
+                    return jsonify(reply)
                 
             except Exception as e:
                 # Log full traceback to help diagnose issues (was logging only str(e))
                 logger.exception("TTS synthesis error")
                 return jsonify({'error': str(e)}), 500
+            finally:
+                if in_flight:
+                    from ukrainian_tts.metrics import IN_FLIGHT, REQUEST_SECONDS  # type: ignore
+                    IN_FLIGHT.dec()
+                    REQUEST_SECONDS.observe(time.time() - request_start)
+        
+        @self.app.route('/metrics', methods=['GET'])
+        def metrics():
+            """Prometheus метрики: етапи синтезу, RTF, черга, кеші"""
+            try:
+                from ukrainian_tts.metrics import REGISTRY  # type: ignore
+            except Exception as e:
+                return Response(f'# metrics unavailable: {e}\n', mimetype='text/plain'), 503
+            return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+        
+        @self.app.route('/cancel', methods=['POST'])
+        def cancel_session():
+            """Скасування всіх незавершених запитів сесії (barge-in)"""
+            data = request.get_json(silent=True) or {}
+            session = data.get('session') or request.headers.get('X-Session-Id')
+            if not session:
+                return jsonify({'error': 'session is required'}), 400
+            cancelled = self.scheduler.cancel_session(session) if self.scheduler else 0
+            return jsonify({'status': 'success', 'session': session, 'cancelled': cancelled})
         
         @self.app.route('/speak', methods=['POST'])
         def speak_text():
@@ -278,7 +542,7 @@ class UkrainianTTSServer:
         """Запускаємо сервер"""
         try:
             logger.info(f"Starting Ukrainian TTS Server on {self.host}:{self.port}")
-            logger.info(f"TTS ready: {self.tts is not None}")
+            logger.info(f"TTS state: {self.state} (model loads in background)")
             logger.info(f"Device: {self.device}")
             
             self.app.run(
@@ -302,6 +566,13 @@ def main():
     parser.add_argument("--port", type=int, default=3001, help="Port to bind to")
     parser.add_argument("--device", default="cpu", choices=["cpu", "mps", "gpu"], help="Device to use")
     parser.add_argument("--debug", action="store_true", help="Enable debug mode")
+    parser.add_argument("--frontend-cache", default=os.environ.get("TTS_FRONTEND_CACHE"),
+                        help="Path to a persistent frontend cache file (JSON); in-memory only if omitted")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("TTS_WORKERS", 0)) or None,
+                        help="Threads for parallel synthesis of long-text chunks")
+    parser.add_argument("--phrase-bank",
+                        default=os.environ.get("TTS_PHRASE_BANK", str(Path(__file__).parent / "phrase_bank.json")),
+                        help="JSON file of stock phrases rendered at startup and served from memory; '' disables")
     
     args = parser.parse_args()
     
@@ -309,7 +580,10 @@ def main():
     server = UkrainianTTSServer(
         host=args.host,
         port=args.port,
-        device=args.device
+        device=args.device,
+        frontend_cache_path=args.frontend_cache,
+        workers=args.workers,
+        phrase_bank_path=args.phrase_bank or None
     )
     server.run(debug=args.debug)
 
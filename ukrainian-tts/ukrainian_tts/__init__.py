@@ -3,5 +3,10 @@ Ukrainian TTS Package
 """
 
 from .tts import TTS, Voices, Stress
+from .frontend import FrontendCache, PersistentFrontendCache
+from .voices import VoiceRegistry
+from .scheduler import Priority, SynthesisScheduler
+from .phrasebank import PhraseBank
 
-__all__ = ['TTS', 'Voices', 'Stress']
+__all__ = ['TTS', 'Voices', 'Stress', 'FrontendCache', 'PersistentFrontendCache', 'VoiceRegistry',
+           'Priority', 'SynthesisScheduler', 'PhraseBank']
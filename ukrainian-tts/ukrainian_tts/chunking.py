@@ -0,0 +1,166 @@
+"""Splitting long texts into synthesis chunks and joining the audio back.
+
+Chunks follow prosodic boundaries: whole sentences are packed together up to
+`max_chars`, longer sentences are split at clause punctuation and only then
+between words. Every chunk remembers the pause that should follow it, so the
+joined audio has the same pause at the same kind of boundary regardless of
+how much silence the model produced at the chunk edges.
+"""
+
+import re
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .frontend import split_sentences
+
+MAX_CHUNK_CHARS = 250
+SENTENCE_PAUSE = 0.25
+CLAUSE_PAUSE = 0.12
+CROSSFADE_MS = 10.0
+# edge samples quieter than this, relative to the chunk peak, are trimmed
+SILENCE_DB = -40.0
+
+# boundaries tried in order when a sentence is longer than `max_chars`
+_BOUNDARIES = (
+    (re.compile(r"(?<=[,;:—–])\s+"), CLAUSE_PAUSE),
+    (re.compile(r"\s+"), 0.0),
+)
+
+
+class Chunk(NamedTuple):
+    text: str
+    # seconds of silence after this chunk; 0 means a crossfade into the next one
+    pause: float
+
+
+def _pieces(text: str, max_chars: int, level: int = 0) -> Iterator[Tuple[str, Optional[float]]]:
+    """Yield (piece, pause after piece); the last piece gets None, the caller decides."""
+    if len(text) <= max_chars or level == len(_BOUNDARIES):
+        yield text, None
+        return
+    pattern, pause = _BOUNDARIES[level]
+    packed: List[str] = []
+    current = ""
+    for part in pattern.split(text):
+        candidate = f"{current} {part}" if current else part
+        if current and len(candidate) > max_chars:
+            packed.append(current)
+            current = part
+        else:
+            current = candidate
+    if current:
+        packed.append(current)
+    for i, part in enumerate(packed):
+        for piece, piece_pause in _pieces(part, max_chars, level + 1):
+            if piece_pause is None and i < len(packed) - 1:
+                piece_pause = pause
+            yield piece, piece_pause
+
+
+def split_chunks(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[Chunk]:
+    """Split `text` into chunks of at most `max_chars` characters (single long words excepted)."""
+    chunks: List[Chunk] = []
+    pack = ""
+    for sentence in split_sentences(text):
+        if len(sentence) <= max_chars:
+            candidate = f"{pack} {sentence}" if pack else sentence
+            if pack and len(candidate) > max_chars:
+                chunks.append(Chunk(pack, SENTENCE_PAUSE))
+                candidate = sentence
+            pack = candidate
+            continue
+        if pack:
+            chunks.append(Chunk(pack, SENTENCE_PAUSE))
+            pack = ""
+        for piece, pause in _pieces(sentence, max_chars):
+            chunks.append(Chunk(piece, SENTENCE_PAUSE if pause is None else pause))
+    if pack:
+        chunks.append(Chunk(pack, SENTENCE_PAUSE))
+    return chunks
+
+
+def trim_bounds(audio: np.ndarray, sample_rate: int, threshold_db: float = SILENCE_DB, margin_ms: float = 10.0) -> Tuple[int, int]:
+    """`(start, stop)` of the part of `audio` that `trim_silence` keeps."""
+    if len(audio) == 0:
+        return 0, 0
+    peak = float(np.max(np.abs(audio)))
+    if peak == 0.0:
+        return 0, 0
+    voiced = np.flatnonzero(np.abs(audio) > peak * 10 ** (threshold_db / 20))
+    margin = int(sample_rate * margin_ms / 1000)
+    return max(0, int(voiced[0]) - margin), min(len(audio), int(voiced[-1]) + 1 + margin)
+
+
+def trim_silence(audio: np.ndarray, sample_rate: int, threshold_db: float = SILENCE_DB, margin_ms: float = 10.0) -> np.ndarray:
+    """Cut leading and trailing silence, keeping `margin_ms` around the voiced part."""
+    start, stop = trim_bounds(audio, sample_rate, threshold_db, margin_ms)
+    return audio[start:stop]
+
+
+def chunk_offsets(
+    lengths: Sequence[int],
+    pauses: Sequence[float],
+    sample_rate: int,
+    crossfade_ms: float = CROSSFADE_MS,
+) -> List[int]:
+    """Where each chunk of `lengths` samples starts in the output of `join_chunks`."""
+    fade = int(sample_rate * crossfade_ms / 1000)
+    gaps = [int(round(pause * sample_rate)) for pause in pauses[: len(lengths) - 1]]
+    fades = [min(fade, n) for n in lengths]
+    offsets = [0]
+    for i, gap in enumerate(gaps):
+        seam = -min(fades[i], fades[i + 1]) if gap == 0 else gap
+        offsets.append(offsets[-1] + lengths[i] + seam)
+    return offsets
+
+
+def join_chunks(
+    waves: Sequence[np.ndarray],
+    pauses: Sequence[float],
+    sample_rate: int,
+    crossfade_ms: float = CROSSFADE_MS,
+) -> np.ndarray:
+    """Concatenate chunk waveforms with `pauses[i]` seconds after chunk `i`.
+
+    Chunk edges are faded in/out over `crossfade_ms`; a zero pause overlaps the
+    fades instead, i.e. crossfades the two chunks.
+    """
+    fade = int(sample_rate * crossfade_ms / 1000)
+    offsets = chunk_offsets([len(w) for w in waves], pauses, sample_rate, crossfade_ms)
+    out = np.zeros(offsets[-1] + len(waves[-1]) if waves else 0, dtype=np.float32)
+
+    for i, wave in enumerate(waves):
+        wave = np.array(wave, dtype=np.float32)
+        n = min(fade, len(wave))
+        if n:
+            ramp = 0.5 - 0.5 * np.cos(np.linspace(0.0, np.pi, n, dtype=np.float32))
+            if i > 0:
+                wave[:n] *= ramp
+            if i < len(waves) - 1:
+                wave[-n:] *= ramp[::-1]
+        out[offsets[i] : offsets[i] + len(wave)] += wave
+    return out
+
+
+def join_alignments(
+    alignments: Sequence[Sequence[Tuple[str, int, int]]],
+    bounds: Sequence[Tuple[int, int]],
+    offsets: Sequence[int],
+) -> List[Tuple[str, int, int]]:
+    """One `(token, start, end)` alignment for joined chunks.
+
+    `bounds[i]` is the `(start, stop)` that trimming kept of chunk `i`, and
+    `offsets[i]` where the trimmed chunk starts in the joined audio. Tokens in
+    trimmed-off silence collapse onto the chunk edge; the chunks are separated
+    by a space token covering the pause between them.
+    """
+    joined: List[Tuple[str, int, int]] = []
+    for i, (alignment, (start, stop), offset) in enumerate(zip(alignments, bounds, offsets)):
+        if i:
+            joined.append((" ", min(joined[-1][2], offset) if joined else offset, offset))
+        for token, begin, end in alignment:
+            begin = min(max(begin, start), stop) - start + offset
+            end = min(max(end, start), stop) - start + offset
+            joined.append((token, begin, end))
+    return joined
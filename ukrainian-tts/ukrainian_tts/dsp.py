@@ -0,0 +1,281 @@
+"""Block processors: effects that run on fixed-size blocks of a stream.
+
+Every processor keeps its own state (filter memory, delay lines, envelopes)
+between `process` calls, returns exactly as many samples as it was given and
+delays the signal by a constant `latency`. Memory stays bounded and the cost
+per block is constant, so the same code runs on a whole utterance
+(`apply`) and on audio streamed out of the synthesiser chunk by chunk.
+
+`clone()` returns a processor with fresh state that shares the designed
+coefficients, so a compiled chain is built once and cloned per stream.
+"""
+
+import copy
+import math
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+
+BLOCK_SIZE = 4096
+
+
+class BlockProcessor:
+    """Base class; subclasses implement `process` and `reset`."""
+
+    latency = 0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        pass
+
+    def clone(self) -> "BlockProcessor":
+        twin = copy.copy(self)
+        twin.reset()
+        return twin
+
+    def flush(self) -> np.ndarray:
+        """The last `latency` samples of a finished stream."""
+        return self.process(np.zeros(self.latency, dtype=np.float32)) if self.latency else np.zeros(0, np.float32)
+
+    def apply(self, audio: np.ndarray, block_size: int = BLOCK_SIZE, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Process a whole signal with fresh state; the output is aligned with `audio` (latency removed).
+
+        `out` - float32 array of `len(audio)` to write into; it may be `audio` itself (in place).
+        """
+        audio = np.asarray(audio, dtype=np.float32)
+        processor = self.clone()
+        latency = processor.latency
+        if out is None:
+            out = np.empty(len(audio), dtype=np.float32)
+        total = len(audio) + latency
+        for start in range(0, total, block_size):
+            stop = min(start + block_size, total)
+            if stop <= len(audio):
+                block = processor.process(audio[start:stop])
+            else:
+                tail = np.zeros(stop - start, dtype=np.float32)
+                tail[: max(0, len(audio) - start)] = audio[start:len(audio)]
+                block = processor.process(tail)
+            # output sample i is input sample i - latency, always one already read
+            skip = max(0, latency - start)
+            if skip < stop - start:
+                out[start + skip - latency:stop - latency] = block[skip:]
+        return out
+
+
+class Fifo:
+    """Sample FIFO used to turn frame-wise output into block-sized output."""
+
+    def __init__(self, prefill: int = 0) -> None:
+        self._buffer = np.zeros(max(prefill, 1024), dtype=np.float32)
+        self._start = 0
+        self._stop = prefill
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def push(self, samples: np.ndarray) -> None:
+        n = len(samples)
+        if self._stop + n > len(self._buffer):
+            size = len(self)
+            if size + n > len(self._buffer):
+                grown = np.empty(max(2 * len(self._buffer), size + n), dtype=np.float32)
+                grown[:size] = self._buffer[self._start:self._stop]
+                self._buffer = grown
+            else:
+                self._buffer[:size] = self._buffer[self._start:self._stop]
+            self._start, self._stop = 0, size
+        self._buffer[self._stop:self._stop + n] = samples
+        self._stop += n
+
+    def pop(self, n: int) -> np.ndarray:
+        out = self._buffer[self._start:self._start + n].copy()
+        self._start += n
+        return out
+
+
+class Chain(BlockProcessor):
+    """Processors run one after another."""
+
+    def __init__(self, stages: List[BlockProcessor]) -> None:
+        self.stages = stages
+        self.latency = sum(stage.latency for stage in stages)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        for stage in self.stages:
+            block = stage.process(block)
+        return block
+
+    def reset(self) -> None:
+        for stage in self.stages:
+            stage.reset()
+
+    def clone(self) -> "Chain":
+        return Chain([stage.clone() for stage in self.stages])
+
+
+class Delay(BlockProcessor):
+    """Delay line of `samples`; also used to align parallel branches."""
+
+    def __init__(self, samples: int) -> None:
+        self.samples = samples
+        self.reset()
+
+    def reset(self) -> None:
+        self._line = np.zeros(self.samples, dtype=np.float32)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if not self.samples:
+            return block
+        joined = np.concatenate([self._line, block])
+        self._line = joined[len(joined) - self.samples:]
+        return joined[: len(block)]
+
+
+def decaying_max(values: np.ndarray, decay: float, previous: float) -> np.ndarray:
+    """y[k] = max(values[k], decay * y[k-1]) without a Python loop."""
+    if not len(values):
+        return values
+    log_decay = math.log(decay)
+    k = np.arange(len(values))
+    with np.errstate(divide="ignore"):
+        weighted = np.log(np.maximum(values, 0.0)) - k * log_decay
+        start = math.log(previous) + log_decay if previous > 0 else -np.inf
+    return np.exp(np.maximum.accumulate(np.maximum(weighted, start)) + k * log_decay)
+
+
+class LookaheadLimiter(BlockProcessor):
+    """Brick-wall peak limiter with look-ahead.
+
+    The gain is computed per `frame` of samples. It ramps down over the
+    look-ahead window before a loud frame arrives, so no sample leaves above
+    `ceiling`, and recovers exponentially with `release_ms`.
+
+    Subclasses measure frames differently by overriding `_peaks`; `guard`
+    is the number of samples after a frame that the measurement needs.
+    """
+
+    guard = 0
+
+    def __init__(self, sample_rate: int, ceiling: float = 0.95, lookahead_ms: float = 5.0,
+                 release_ms: float = 80.0, frame: int = 32) -> None:
+        self.ceiling = ceiling
+        self.frame = frame
+        self.lookahead = max(1, int(math.ceil(sample_rate * lookahead_ms / 1000 / frame)))
+        self.release = math.exp(-frame / (sample_rate * release_ms / 1000))
+        self.latency = (self.lookahead + 1) * frame + self.guard
+        # gain allowed j frames before a frame that needs `required`: all of it at j <= 1, then
+        # rising linearly, so the ramp between two frame gains never overshoots either frame
+        self._ramp = np.maximum(np.arange(self.lookahead + 1) - 1, 0) / self.lookahead
+        self._steps = np.arange(1, frame + 1) / frame
+        self.reset()
+
+    def reset(self) -> None:
+        self._pending = np.zeros(0, dtype=np.float32)
+        # complete frames waiting for their look-ahead, and the gain each one needs
+        self._frames = np.zeros((0, self.frame), dtype=np.float32)
+        self._required = np.zeros(0)
+        self._gain = 1.0
+        self._out = Fifo(self.latency)
+
+    def _peaks(self, pending: np.ndarray, count: int) -> np.ndarray:
+        """Peak of each of the first `count` frames of `pending`."""
+        return np.abs(pending[: count * self.frame].reshape(count, self.frame)).max(axis=1)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        pending = np.concatenate([self._pending, np.asarray(block, dtype=np.float32)])
+        count = max(0, len(pending) - self.guard) // self.frame
+        if count:
+            frames = pending[: count * self.frame].reshape(count, self.frame)
+            with np.errstate(divide="ignore"):
+                required = np.minimum(1.0, self.ceiling / self._peaks(pending, count))
+            self._frames = np.concatenate([self._frames, frames])
+            self._required = np.concatenate([self._required, required])
+            self._pending = pending[count * self.frame:]
+        else:
+            self._pending = pending
+        ready = len(self._required) - self.lookahead
+        if ready > 0:
+            windows = np.lib.stride_tricks.sliding_window_view(self._required, self.lookahead + 1)[:ready]
+            target = (windows + (1.0 - windows) * self._ramp).min(axis=1)
+            # gain[k] = min(target[k], 1 - release * (1 - gain[k-1]))
+            gains = 1.0 - decaying_max(1.0 - target, self.release, 1.0 - self._gain)
+            previous = np.concatenate([[self._gain], gains[:-1]])
+            curve = previous[:, None] + (gains - previous)[:, None] * self._steps
+            self._out.push((self._frames[:ready] * curve).astype(np.float32).ravel())
+            self._gain = float(gains[-1])
+            self._frames = self._frames[ready:]
+            self._required = self._required[ready:]
+        return self._out.pop(len(block))
+
+
+class AutoGain(BlockProcessor):
+    """Slow automatic gain control towards `target_db` RMS.
+
+    The level is measured in `window_ms` frames; frames below `gate_db` (pauses)
+    do not move the gain. The first voiced frame sets the gain at once, later
+    ones move it by at most `max_step_db` per second, within +-`range_db`.
+    Follow with a `LookaheadLimiter` to catch the peaks.
+    """
+
+    def __init__(self, sample_rate: int, target_db: float = -18.0, range_db: float = 15.0,
+                 window_ms: float = 50.0, max_step_db: float = 6.0, gate_db: float = -50.0) -> None:
+        self.target_db = target_db
+        self.range_db = range_db
+        self.gate_db = gate_db
+        self.frame = max(1, int(sample_rate * window_ms / 1000))
+        self.step_db = max_step_db * self.frame / sample_rate
+        self.latency = self.frame
+        self._steps = np.arange(1, self.frame + 1) / self.frame
+        self.reset()
+
+    def reset(self) -> None:
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._gain_db: Optional[float] = None
+        self._applied: Optional[float] = None
+        self._out = Fifo(self.latency)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        pending = np.concatenate([self._pending, np.asarray(block, dtype=np.float32)])
+        count = len(pending) // self.frame
+        if count:
+            frames = pending[: count * self.frame].reshape(count, self.frame)
+            with np.errstate(divide="ignore"):
+                level = 10 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=1))
+            gains_db = np.full(count, np.nan)
+            gain_db = self._gain_db
+            # one step per 50 ms frame: a short loop, the samples are scaled vectorised below
+            for i, db in enumerate(level):
+                if db > self.gate_db:
+                    wanted = min(max(self.target_db - db, -self.range_db), self.range_db)
+                    gain_db = wanted if gain_db is None else gain_db + min(max(wanted - gain_db, -self.step_db), self.step_db)
+                if gain_db is not None:
+                    gains_db[i] = gain_db
+            self._gain_db = gain_db
+            voiced = np.flatnonzero(~np.isnan(gains_db))
+            # silence before the first voiced frame takes its gain: no fade-in at speech onset
+            gains_db[: voiced[0] if len(voiced) else count] = gains_db[voiced[0]] if len(voiced) else 0.0
+            gains = 10 ** (gains_db / 20)
+            previous = np.concatenate([[gains[0] if self._applied is None else self._applied], gains[:-1]])
+            curve = previous[:, None] + (gains - previous)[:, None] * self._steps
+            self._out.push((frames * curve).astype(np.float32).ravel())
+            if gain_db is not None:
+                self._applied = float(gains[-1])
+        self._pending = pending[count * self.frame:]
+        return self._out.pop(len(block))
+
+
+class Normaliser(Chain):
+    """AGC followed by a look-ahead limiter: the streaming replacement for peak normalisation."""
+
+    def __init__(self, sample_rate: int, target_db: float = -18.0, ceiling: float = 0.95) -> None:
+        super().__init__([AutoGain(sample_rate, target_db), LookaheadLimiter(sample_rate, ceiling)])
+
+
+@lru_cache(maxsize=None)
+def normaliser(sample_rate: int) -> Normaliser:
+    """Shared default `Normaliser` for `sample_rate`; `apply` clones it, so it is safe across threads."""
+    return Normaliser(sample_rate)
@@ -0,0 +1,93 @@
+"""In-memory encoding of synthesised audio for HTTP responses.
+
+`encode_audio` converts a float32 mono waveform to the requested sample rate
+and channel layout and encodes it with libsndfile directly into a `BytesIO`,
+block by block, so nothing touches the disk.
+"""
+
+from io import BytesIO
+from typing import NamedTuple, Optional
+
+import numpy as np
+import soundfile as sf  # type: ignore
+
+from .resampling import resample
+
+
+class AudioFormat(NamedTuple):
+    container: str
+    subtype: str
+    mimetype: str
+    extension: str
+
+
+FORMATS = {
+    "wav": AudioFormat("WAV", "PCM_16", "audio/wav", "wav"),
+    "flac": AudioFormat("FLAC", "PCM_16", "audio/flac", "flac"),
+    "ogg": AudioFormat("OGG", "VORBIS", "audio/ogg", "ogg"),
+    "opus": AudioFormat("OGG", "OPUS", "audio/ogg; codecs=opus", "opus"),
+    "mp3": AudioFormat("MP3", "MPEG_LAYER_III", "audio/mpeg", "mp3"),
+}
+
+# the Opus encoder only accepts these rates
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+MAX_CHANNELS = 2
+BLOCK_SIZE = 65536
+
+
+def available_formats():
+    """Names from `FORMATS` that the installed libsndfile can encode."""
+    return [
+        name
+        for name, fmt in FORMATS.items()
+        if fmt.subtype in sf.available_subtypes(fmt.container)
+    ]
+
+
+def negotiate_rate(format: str, sample_rate: int, requested: Optional[int] = None) -> int:
+    """Pick the output sample rate: `requested` or the model rate, snapped for Opus."""
+    rate = int(requested or sample_rate)
+    if rate <= 0:
+        raise ValueError(f"Invalid sample rate: {rate}")
+    if FORMATS[format].subtype == "OPUS" and rate not in OPUS_RATES:
+        # the smallest supported rate that keeps the requested bandwidth
+        rate = next((r for r in OPUS_RATES if r >= rate), OPUS_RATES[-1])
+    return rate
+
+
+def encode_audio(
+    audio: np.ndarray,
+    sample_rate: int,
+    format: str = "wav",
+    target_rate: Optional[int] = None,
+    channels: int = 1,
+):
+    """
+    Encode a mono float32 waveform in memory.
+    - `format` - one of `FORMATS`.
+    - `target_rate` - output sample rate, the model rate by default.
+    - `channels` - 1 (mono) or 2 (the mono signal on both channels).
+
+    Returns `(buffer, AudioFormat, rate)` with `buffer` rewound to the start.
+    """
+    format = format.lower()
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported format '{format}'. Use one of: {', '.join(FORMATS)}")
+    if not 1 <= int(channels) <= MAX_CHANNELS:
+        raise ValueError(f"Unsupported channel count {channels}, use 1 or 2")
+    fmt = FORMATS[format]
+    rate = negotiate_rate(format, sample_rate, target_rate)
+
+    audio = resample(np.asarray(audio, dtype=np.float32), sample_rate, rate)
+
+    out = BytesIO()
+    with sf.SoundFile(
+        out, "w", samplerate=rate, channels=int(channels), subtype=fmt.subtype, format=fmt.container
+    ) as f:
+        for start in range(0, len(audio), BLOCK_SIZE):
+            block = audio[start : start + BLOCK_SIZE]
+            if channels > 1:
+                block = np.repeat(block[:, None], channels, axis=1)
+            f.write(block)
+    out.seek(0)
+    return out, fmt, rate
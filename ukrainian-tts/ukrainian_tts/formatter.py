@@ -1,3 +1,4 @@
+from functools import lru_cache
 from num2words import num2words
 import re
 
@@ -30,29 +31,110 @@ def replace_currency_with_words(text, currency, num_form):
     return text
 
 
-def find_any_char(text: str, find: str, start: int):
-    result = -1
-    for c in find:
-        index = text.find(c, start)
-        if (index >= 0) and (result > index or result == -1):
-            result = index
-
-    return result
+_SEPARATORS = re.compile(r"([ ,])")
 
 
 # Have to check if I can use https://github.com/lang-uk/tokenize-uk
 def simple_tokenizer(text: str):
-    start = 0
-    index = find_any_char(text, " ,", start)
-    while index >= 0:
-        word = text[start:index]
-        yield word
-        separator = text[index]
-        yield separator
-        start = index + 1
-        index = find_any_char(text, " ,", start)
+    """Yield words and the `" "`/`","` separators between them."""
+    yield from _SEPARATORS.split(text)
+
+
+# single-character normalisation, applied with one str.translate pass
+SYMBOLS = str.maketrans(
+    {
+        "`": "'",
+        "ʼ": "'",
+        "…": "...",
+        "”": '"',
+        "“": '"',
+        "’": '"',
+        "‘": '"',
+        "«": '"',
+        "»": '"',
+        "–": "-",
+        "—": "-",
+        "―": "-",
+    }
+)
+
+# digits left over after number conversion
+DIGITS = str.maketrans(
+    {
+        "1": "один ",
+        "2": "два ",
+        "3": "три ",
+        "4": "чотири ",
+        "5": "п'ять ",
+        "6": "шість ",
+        "7": "сім ",
+        "8": "вісім ",
+        "9": "дев'ять ",
+        "0": "нуль ",
+    }
+)
+
+# speak english alphabet using brute force transliteration,
+# digraphs are replaced in this order before single letters
+ENGLISH_DIGRAPHS = (
+    ("qu", "кв"),
+    ("ch", "ч"),
+    ("sh", "ш"),
+    ("ph", "ф"),
+    ("kh", "х"),
+    ("yo", "йо"),
+    ("yu", "ю"),
+    ("ya", "я"),
+    ("ye", "є"),
+    ("yi", "ї"),
+    ("zh", "ж"),
+    ("ts", "ц"),
+    ("th", "т"),
+)
+ENGLISH_LETTERS = str.maketrans(
+    {
+        "a": "а",
+        "b": "б",
+        "c": "ц",
+        "d": "д",
+        "e": "е",
+        "f": "ф",
+        "g": "ґ",
+        "h": "г",
+        "i": "і",
+        "j": "дж",
+        "k": "к",
+        "l": "л",
+        "m": "м",
+        "n": "н",
+        "o": "о",
+        "p": "п",
+        "q": "кв",
+        "r": "р",
+        "s": "с",
+        "t": "т",
+        "u": "ю",
+        "v": "в",
+        "w": "в",
+        "x": "кс",
+        "y": "і",
+        "z": "з",
+    }
+)
 
-    yield text[start:]
+_DIGIT_GAP = re.compile(r"(\d)\s+(\d)")
+# a whole " "/","-separated token that contains at least one digit
+_NUMBER_TOKEN = re.compile(r"(?<![^ ,])[^ ,\d]*\d[^ ,]*")
+_LATIN_RUN = re.compile(r"[a-z]+")
+
+
+@lru_cache(maxsize=8192)
+def transliterate(word: str) -> str:
+    """Transliterate a run of lowercase latin letters into cyrillic."""
+    for english_chars, value in ENGLISH_DIGRAPHS:
+        if english_chars in word:
+            word = word.replace(english_chars, value)
+    return word.translate(ENGLISH_LETTERS)
 
 
 def preprocess_text(text):
@@ -72,26 +154,10 @@ def preprocess_text(text):
         gender = "masculine"
 
     num_form = 0
-    # replace apostrophe
-    text = text.replace("`", "'")
-    text = text.replace("ʼ", "'")
-    text = text.replace("…", "...")
-
-    symbols = {
-        "”": '"',
-        "“": '"',
-        "’": '"',
-        "‘": '"',
-        "«": '"',
-        "»": '"',
-        "–": "-",
-        "—": "-",
-        "―": "-",
-    }
-    for symbol, value in symbols.items():
-        text = text.replace(symbol, value)
+    # replace apostrophe, quotes and dashes
+    text = text.translate(SYMBOLS)
     # numbers
-    text = re.sub(r"(\d)\s+(\d)", r"\1\2", text)
+    text = _DIGIT_GAP.sub(r"\1\2", text)
 
     def detect_num_and_convert(word):
         numbers = "0123456789"
@@ -147,67 +213,15 @@ def preprocess_text(text):
                 result.append(part)
         return "-".join(result)
 
-    # print([detect_num_and_convert(word) for word in simple_tokenizer(text)])
-    text = "".join([detect_num_and_convert(word) for word in simple_tokenizer(text)])
+    # only tokens containing digits need conversion, the rest stay as is
+    text = _NUMBER_TOKEN.sub(lambda match: detect_num_and_convert(match.group(0)), text)
     text = replace_currency_with_words(text, currency, num_form)
 
     # fallback numbers
-    text = text.replace("1", "один ")
-    text = text.replace("2", "два ")
-    text = text.replace("3", "три ")
-    text = text.replace("4", "чотири ")
-    text = text.replace("5", "п'ять ")
-    text = text.replace("6", "шість ")
-    text = text.replace("7", "сім ")
-    text = text.replace("8", "вісім ")
-    text = text.replace("9", "дев'ять ")
-    text = text.replace("0", "нуль ")
-    # speak english alphabet using brute force transliteration
-    english = {
-        "qu": "кв",
-        "ch": "ч",
-        "sh": "ш",
-        "шч": "щ",  # after previous cases
-        "ph": "ф",
-        "kh": "х",
-        "yo": "йо",
-        "yu": "ю",
-        "ya": "я",
-        "ye": "є",
-        "yi": "ї",
-        "zh": "ж",
-        "ts": "ц",
-        "th": "т",
-        "a": "а",
-        "b": "б",
-        "c": "ц",
-        "d": "д",
-        "e": "е",
-        "f": "ф",
-        "g": "ґ",
-        "h": "г",
-        "i": "і",
-        "j": "дж",
-        "k": "к",
-        "l": "л",
-        "m": "м",
-        "n": "н",
-        "o": "о",
-        "p": "п",
-        "q": "кв",
-        "r": "р",
-        "s": "с",
-        "t": "т",
-        "u": "ю",
-        "v": "в",
-        "w": "в",
-        "x": "кс",
-        "y": "і",
-        "z": "з",
-    }
-    for english_char, english_value in english.items():
-        # uppercase
-        text = text.replace(english_char.upper(), english_value.upper())
-        text = text.replace(english_char, english_value)
+    text = text.translate(DIGITS)
+    # text is lowercase at this point, so only lowercase latin needs transliteration;
+    # "sh" + "ch" -> "шч" -> "щ" is applied after the runs are converted
+    text = _LATIN_RUN.sub(lambda match: transliterate(match.group(0)), text)
+    text = text.replace("шч", "щ")
 
     return text
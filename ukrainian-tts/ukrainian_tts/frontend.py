@@ -0,0 +1,157 @@
+"""Sentence-level memoisation of the text frontend.
+
+The frontend (``preprocess_text`` + ``sentence_to_stress``) is deterministic for
+a given sentence and stress mode, so its output can be reused across requests.
+``FrontendCache`` keeps the most recently used sentences in memory, while
+``PersistentFrontendCache`` additionally warms itself from a JSON file on disk.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .formatter import preprocess_text
+from .metrics import span
+from .stress import sentence_to_stress
+
+# split after sentence-final punctuation, keeping the punctuation with the sentence
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?…])\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split `text` into sentences on `.`, `!`, `?` and `…` followed by whitespace."""
+    return [sentence for sentence in _SENTENCE_SPLIT.split(text.strip()) if sentence]
+
+
+class FrontendCache:
+    """Thread-safe LRU cache of normalised, stressed sentences."""
+
+    def __init__(self, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sentence: str, stress: str) -> Optional[str]:
+        key = (stress, sentence)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, sentence: str, stress: str, value: str) -> None:
+        key = (stress, sentence)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PersistentFrontendCache(FrontendCache):
+    """`FrontendCache` that is loaded from and periodically saved to `path`.
+
+    The file is rewritten atomically every `autosave_every` new entries and on
+    `save()`; a missing or corrupted file simply starts an empty cache.
+    """
+
+    # bump when normalisation or stress results change (2: compiled stress lexicon), so old files are dropped
+    VERSION = 2
+
+    def __init__(self, path: str, maxsize: int = 4096, autosave_every: int = 64) -> None:
+        super().__init__(maxsize=maxsize)
+        self.path = path
+        self.autosave_every = autosave_every
+        self._dirty = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return
+        entries = data.get("entries")
+        if not isinstance(entries, list):
+            return
+        for entry in entries[-self.maxsize :]:
+            # skip malformed entries instead of failing the server start
+            if isinstance(entry, list) and len(entry) == 3 and all(isinstance(item, str) for item in entry):
+                stress, sentence, value = entry
+                self._entries[(stress, sentence)] = value
+
+    def put(self, sentence: str, stress: str, value: str) -> None:
+        super().put(sentence, stress, value)
+        with self._lock:
+            self._dirty += 1
+            should_save = self.autosave_every and self._dirty >= self.autosave_every
+        if should_save:
+            self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            entries = [[stress, sentence, value] for (stress, sentence), value in self._entries.items()]
+            self._dirty = 0
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def run_frontend(
+    text: str,
+    stress: str,
+    stress_function: Callable[[str], str],
+    cache: Optional[FrontendCache] = None,
+) -> str:
+    """Normalise and stress `text` sentence by sentence, reusing cached sentences.
+
+    - `stress` - stress mode name, used as part of the cache key.
+    - `stress_function` - function passed to `sentence_to_stress`.
+    """
+    result = []
+    for sentence in split_sentences(text):
+        stressed = cache.get(sentence, stress) if cache is not None else None
+        if stressed is None:
+            with span("preprocess_text"):
+                normalised = preprocess_text(sentence)
+            with span("sentence_to_stress"):
+                stressed = sentence_to_stress(normalised, stress_function)
+            if cache is not None:
+                cache.put(sentence, stress, stressed)
+        result.append(stressed)
+    return " ".join(result)
@@ -0,0 +1,430 @@
+"""Voice effect presets compiled from declarative JSON graphs.
+
+A preset is a chain of nodes, each a dict with a "type":
+
+    {"name": "Robot Bass", "chain": [
+        {"type": "pitch", "steps": -4},
+        {"type": "parallel", "dry": 0.9, "branches": [
+            {"gain": 0.1, "chain": [{"type": "ring", "freq": 80.0}]}]},
+        {"type": "highpass", "freq": 40.0},
+        {"type": "lowshelf", "freq": 120.0, "gain_db": 6.0},
+        {"type": "compander", "threshold": 0.6, "ratio": 1.6}]}
+
+Linear filters (`highpass`, `lowpass`, `bandpass`, `lowshelf`, `highshelf`,
+`peak`, `gain`) are designed once per sample rate and consecutive ones are
+fused into a single second-order-section cascade, run with one `sosfilt`
+call per block. Every node is a block processor (see `dsp`): filter state,
+delay lines, oscillator phase and envelopes carry over between blocks, so a
+preset can run on streamed audio. Other nodes: `pitch` (semitones), `ring` (ring modulation), `saturate`
+(tanh), `hold` (sample-and-hold), `quantize` (bits), `delay` (ms),
+`compander` (above `threshold`, optional `release_ms` envelope) and `parallel` (dry signal plus
+weighted branch chains).
+
+The flat presets in `fx_presets/` (`anonymous.json`, `atlavs_*.json`, with
+keys like "hpf", "lpf", "delay_ms_1") are read as the "anonymous" chain.
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.signal import butter, sosfilt  # type: ignore
+
+from .dsp import BlockProcessor, Chain, Delay, Fifo, decaying_max
+from .pitch import pitch_shift
+
+PRESETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fx_presets")
+
+_LINEAR = ("highpass", "lowpass", "bandpass", "lowshelf", "highshelf", "peak", "gain")
+
+
+def _rbj(kind: str, sample_rate: int, freq: float, gain_db: float, q: float) -> np.ndarray:
+    """RBJ cookbook biquad as one SOS row; `q` is the shelf slope S for shelves."""
+    A = 10 ** (gain_db / 40)
+    w0 = 2 * np.pi * freq / sample_rate
+    cosw0 = np.cos(w0)
+    if kind == "peak":
+        alpha = np.sin(w0) / (2 * q)
+        b = [1 + alpha * A, -2 * cosw0, 1 - alpha * A]
+        a = [1 + alpha / A, -2 * cosw0, 1 - alpha / A]
+    else:
+        alpha = np.sin(w0) / (2 * q)
+        sqrt_a = 2 * np.sqrt(A) * alpha
+        if kind == "lowshelf":
+            b = [A * ((A + 1) - (A - 1) * cosw0 + sqrt_a), 2 * A * ((A - 1) - (A + 1) * cosw0),
+                 A * ((A + 1) - (A - 1) * cosw0 - sqrt_a)]
+            a = [(A + 1) + (A - 1) * cosw0 + sqrt_a, -2 * ((A - 1) + (A + 1) * cosw0),
+                 (A + 1) + (A - 1) * cosw0 - sqrt_a]
+        else:
+            b = [A * ((A + 1) + (A - 1) * cosw0 + sqrt_a), -2 * A * ((A - 1) + (A + 1) * cosw0),
+                 A * ((A + 1) + (A - 1) * cosw0 - sqrt_a)]
+            a = [(A + 1) - (A - 1) * cosw0 + sqrt_a, 2 * ((A - 1) - (A + 1) * cosw0),
+                 (A + 1) - (A - 1) * cosw0 - sqrt_a]
+    return np.array([[b[0] / a[0], b[1] / a[0], b[2] / a[0], 1.0, a[1] / a[0], a[2] / a[0]]])
+
+
+def design_sos(node: Dict, sample_rate: int) -> np.ndarray:
+    """Second-order sections of one linear node at `sample_rate`."""
+    kind = node["type"]
+    nyquist = sample_rate / 2
+    if kind == "gain":
+        gain = 10 ** (float(node.get("db", 0.0)) / 20) * float(node.get("linear", 1.0))
+        return np.array([[gain, 0.0, 0.0, 1.0, 0.0, 0.0]])
+    if kind in ("highpass", "lowpass"):
+        order = int(node.get("order", 2 if kind == "highpass" else 4))
+        freq = min(float(node["freq"]), 0.99 * nyquist)
+        return butter(order, freq / nyquist, btype=kind[:-4], output="sos")
+    if kind == "bandpass":
+        low = float(node["low"]) / nyquist
+        high = min(float(node["high"]), 0.99 * nyquist) / nyquist
+        return butter(int(node.get("order", 2)), [low, high], btype="band", output="sos")
+    default_q = 1.0 if kind == "peak" else 0.707
+    return _rbj(kind, sample_rate, float(node["freq"]), float(node.get("gain_db", 0.0)),
+                float(node.get("q", node.get("slope", default_q))))
+
+
+class _Filter(BlockProcessor):
+    """SOS cascade carrying `sosfilt` state between blocks."""
+
+    def __init__(self, sos: np.ndarray) -> None:
+        self.sos = sos
+        self.reset()
+
+    def reset(self) -> None:
+        self._zi = np.zeros((len(self.sos), 2))
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        out, self._zi = sosfilt(self.sos, block, zi=self._zi)
+        return out.astype(np.float32, copy=False)
+
+
+class _Pointwise(BlockProcessor):
+    """Memoryless waveshaper."""
+
+    def __init__(self, function: Callable[[np.ndarray], np.ndarray]) -> None:
+        self.function = function
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        return self.function(block)
+
+
+def _saturate(drive: float) -> _Pointwise:
+    norm = 1.0 / float(np.tanh(drive))
+    return _Pointwise(lambda x: np.tanh(drive * x) * norm)
+
+
+def _quantize(bits: int) -> _Pointwise:
+    levels = float(2 ** bits - 1)
+    return _Pointwise(lambda x: np.round((x + 1.0) * 0.5 * levels) * (2.0 / levels) - 1.0)
+
+
+def _compress(x: np.ndarray, level: np.ndarray, threshold: float, ratio: float) -> np.ndarray:
+    over = level > threshold
+    gain = np.ones_like(x)
+    gain[over] = (threshold + (level[over] - threshold) / ratio) / level[over]
+    return x * gain
+
+
+class _Compander(BlockProcessor):
+    """Compresses above `threshold`.
+
+    Without `release_ms` every sample is its own level (the static curve of the
+    original presets); with it the level is a peak envelope with instant attack
+    and exponential release, carried across blocks.
+    """
+
+    def __init__(self, threshold: float, ratio: float, sample_rate: int, release_ms: Optional[float] = None) -> None:
+        self.threshold = threshold
+        self.ratio = ratio
+        self.release = math.exp(-1.0 / (sample_rate * release_ms / 1000)) if release_ms else None
+        self.reset()
+
+    def reset(self) -> None:
+        self._envelope = 0.0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if self.release is None:
+            return _compress(block, np.abs(block), self.threshold, self.ratio)
+        envelope = decaying_max(np.abs(block).astype(np.float64), self.release, self._envelope)
+        if len(envelope):
+            self._envelope = float(envelope[-1])
+        return _compress(block, envelope.astype(np.float32), self.threshold, self.ratio)
+
+
+class _Ring(BlockProcessor):
+    """Ring modulation; the oscillator phase continues across blocks."""
+
+    def __init__(self, freq: float, sample_rate: int) -> None:
+        self.step = 2 * np.pi * freq / sample_rate
+        self.reset()
+
+    def reset(self) -> None:
+        self._phase = 0.0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        carrier = np.sin(self._phase + self.step * np.arange(len(block)))
+        self._phase = (self._phase + self.step * len(block)) % (2 * np.pi)
+        return block * carrier.astype(np.float32)
+
+
+class _Hold(BlockProcessor):
+    """Sample-and-hold every `n` samples; the held value crosses block edges."""
+
+    def __init__(self, n: int) -> None:
+        self.n = max(1, n)
+        self.reset()
+
+    def reset(self) -> None:
+        self._offset = 0
+        self._held = 0.0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if self.n == 1 or not len(block):
+            return block
+        index = self._offset + np.arange(len(block))
+        anchors = index - index % self.n - self._offset
+        out = block[np.maximum(anchors, 0)]
+        out[anchors < 0] = self._held
+        self._held = float(out[-1])
+        self._offset = (self._offset + len(block)) % self.n
+        return out
+
+
+class _Pitch(BlockProcessor):
+    """Pitch shift of overlapping `segment`s, cross-faded over `overlap` samples.
+
+    The shifter needs context, so the stage runs a fixed `segment + overlap`
+    samples behind its input.
+    """
+
+    def __init__(self, steps: float, sample_rate: int, segment: int = 4096, overlap: int = 1024) -> None:
+        self.steps = steps
+        self.sample_rate = sample_rate
+        self.segment = segment
+        self.overlap = overlap
+        self.latency = segment + overlap
+        fade = np.sin(0.5 * np.pi * (np.arange(overlap) + 0.5) / overlap) ** 2
+        self._fade_in = fade.astype(np.float32)
+        self._fade_out = (1.0 - fade).astype(np.float32)
+        self.reset()
+
+    def reset(self) -> None:
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._history = np.zeros(self.overlap, dtype=np.float32)
+        self._tail = np.zeros(self.overlap, dtype=np.float32)
+        self._out = Fifo(self.segment)
+
+    def _shift(self, x: np.ndarray) -> np.ndarray:
+        return pitch_shift(x, self.sample_rate, self.steps)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        pending = np.concatenate([self._pending, block])
+        start = 0
+        while len(pending) - start >= self.segment:
+            window = np.concatenate([self._history, pending[start:start + self.segment]])
+            shifted = self._shift(window).astype(np.float32, copy=False)
+            head = shifted[: self.segment].copy()
+            head[: self.overlap] = self._tail * self._fade_out + head[: self.overlap] * self._fade_in
+            self._out.push(head)
+            self._tail = shifted[self.segment:self.segment + self.overlap]
+            self._history = window[len(window) - self.overlap:]
+            start += self.segment
+        self._pending = pending[start:]
+        return self._out.pop(len(block))
+
+
+class _Parallel(BlockProcessor):
+    """Dry signal plus weighted branches; shorter paths are delayed to line up with the longest."""
+
+    def __init__(self, dry: float, branches: List[Tuple[float, Chain]]) -> None:
+        self.dry = dry
+        self.branches = branches
+        self.latency = max([chain.latency for _, chain in branches] + [0])
+        self._dry_delay = Delay(self.latency)
+        self._align = [Delay(self.latency - chain.latency) for _, chain in branches]
+
+    def reset(self) -> None:
+        self._dry_delay.reset()
+        for (_, chain), align in zip(self.branches, self._align):
+            chain.reset()
+            align.reset()
+
+    def clone(self) -> "_Parallel":
+        return _Parallel(self.dry, [(gain, chain.clone()) for gain, chain in self.branches])
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        out = self.dry * self._dry_delay.process(block)
+        for (gain, chain), align in zip(self.branches, self._align):
+            out += gain * align.process(chain.process(block))
+        return out
+
+
+def compile_chain(chain: List[Dict], sample_rate: int) -> Chain:
+    """Turn preset nodes into a chain of block processors; runs of linear nodes become one SOS cascade."""
+    stages: List[BlockProcessor] = []
+    pending: List[np.ndarray] = []
+
+    def flush() -> None:
+        if pending:
+            stages.append(_Filter(np.vstack(pending)))
+            pending.clear()
+
+    for node in chain:
+        kind = node.get("type")
+        if kind in _LINEAR:
+            pending.append(design_sos(node, sample_rate))
+            continue
+        flush()
+        if kind == "pitch":
+            if float(node.get("steps", 0.0)):
+                stages.append(_Pitch(float(node["steps"]), sample_rate))
+        elif kind == "ring":
+            stages.append(_Ring(float(node["freq"]), sample_rate))
+        elif kind == "saturate":
+            stages.append(_saturate(float(node.get("drive", 1.0))))
+        elif kind == "hold":
+            stages.append(_Hold(int(node.get("samples", 1))))
+        elif kind == "quantize":
+            stages.append(_quantize(int(node.get("bits", 16))))
+        elif kind == "delay":
+            stages.append(Delay(max(1, int(sample_rate * float(node["ms"]) / 1000.0))))
+        elif kind == "compander":
+            release_ms = node.get("release_ms")
+            stages.append(_Compander(float(node.get("threshold", 0.5)), float(node.get("ratio", 2.0)), sample_rate,
+                                     float(release_ms) if release_ms else None))
+        elif kind == "parallel":
+            branches = [(float(b.get("gain", 1.0)), compile_chain(b.get("chain", []), sample_rate))
+                        for b in node.get("branches", [])]
+            stages.append(_Parallel(float(node.get("dry", 1.0)), branches))
+        else:
+            raise ValueError(f"Unknown FX node type '{kind}'")
+    flush()
+    return Chain(stages)
+
+
+def legacy_chain(cfg: Dict) -> List[Dict]:
+    """Chain of a flat "anonymous"-style preset (pitch, band EQ, doubling, compander, soft clip)."""
+    get = lambda key, default: float(cfg.get(key, default))  # noqa: E731
+    return [
+        {"type": "pitch", "steps": get("pitch_steps", -5)},
+        {"type": "highpass", "freq": get("hpf", 200.0), "order": 2},
+        {"type": "lowpass", "freq": get("lpf", 3400.0), "order": 4},
+        {"type": "peak", "freq": get("presence_f0", 1200.0), "gain_db": get("presence_gain_db", 2.5),
+         "q": get("presence_Q", 1.1)},
+        {"type": "parallel", "dry": get("mix_dry", 0.85), "branches": [
+            {"gain": get("mix_d1", 0.10), "chain": [{"type": "delay", "ms": get("delay_ms_1", 6.0)}]},
+            {"gain": get("mix_d2", 0.05), "chain": [{"type": "delay", "ms": get("delay_ms_2", 12.0)}]},
+        ]},
+        {"type": "compander", "threshold": get("comp_thresh", 0.45), "ratio": get("comp_ratio", 2.8)},
+        {"type": "saturate", "drive": get("clip_drive", 1.8)},
+    ]
+
+
+class Preset:
+    """A named effect chain; the compiled chain is cached per sample rate and cloned per stream."""
+
+    def __init__(self, name: str, chain: List[Dict], title: Optional[str] = None) -> None:
+        self.name = name
+        self.title = title or name
+        self.chain = chain
+        self._compiled: Dict[Tuple[int, int], Chain] = {}
+        self._lock = threading.Lock()
+        # fail on unknown nodes when loading, not on the first request
+        compile_chain(chain, 22050)
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict) -> "Preset":
+        chain = data["chain"] if "chain" in data else legacy_chain(data)
+        return cls(name, chain, data.get("name"))
+
+    @classmethod
+    def from_file(cls, path: str) -> "Preset":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls.from_dict(os.path.splitext(os.path.basename(path))[0], data)
+
+    @property
+    def digest(self) -> str:
+        """Hash of the chain definition: changes whenever the preset's effect does."""
+        return hashlib.sha1(json.dumps(self.chain, sort_keys=True).encode()).hexdigest()
+
+    def compiled(self, sample_rate: int, first: int = 0) -> Chain:
+        """The shared compiled chain (from node `first`); never process with it directly, clone it."""
+        with self._lock:
+            chain = self._compiled.get((sample_rate, first))
+            if chain is None:
+                chain = self._compiled[(sample_rate, first)] = compile_chain(self.chain[first:], sample_rate)
+            return chain
+
+    def processor(self, sample_rate: int) -> Chain:
+        """Fresh block processor for one stream: `process(block)` per block, `flush()` at the end."""
+        return self.compiled(sample_rate).clone()
+
+    def apply(self, audio: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Run the chain over a whole signal in blocks; returns a new float32 array of the same length."""
+        return self.compiled(sample_rate).apply(audio)
+
+    def render(self, audio: np.ndarray, sample_rate: int, out_rate: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """Like `apply`, returning `(audio, rate)`.
+
+        A leading pitch node is done on the whole signal and its resample also
+        converts to `out_rate`; the rest of the chain then runs at `out_rate`.
+        Otherwise the rate is unchanged and the caller resamples.
+        """
+        first = self.chain[0] if self.chain else {}
+        if first.get("type") == "pitch" and float(first.get("steps", 0.0)):
+            rate = int(out_rate or sample_rate)
+            audio = pitch_shift(audio, sample_rate, float(first["steps"]), rate)
+            return self.compiled(rate, 1).apply(audio), rate
+        return self.apply(audio, sample_rate), sample_rate
+
+
+class FxLibrary:
+    """Presets by name, loaded from a directory of JSON files."""
+
+    def __init__(self, directory: Optional[str] = PRESETS_DIR) -> None:
+        self.directory = directory
+        self._presets: Dict[str, Preset] = {}
+        self.errors: Dict[str, str] = {}
+        if directory and os.path.isdir(directory):
+            for file_name in sorted(os.listdir(directory)):
+                if file_name.endswith(".json"):
+                    try:
+                        preset = Preset.from_file(os.path.join(directory, file_name))
+                    except (OSError, ValueError, KeyError, TypeError) as e:
+                        self.errors[file_name] = str(e)
+                        continue
+                    self._presets[preset.name] = preset
+
+    def names(self) -> List[str]:
+        return list(self._presets)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._presets
+
+    def add(self, preset: Preset) -> None:
+        self._presets[preset.name] = preset
+
+    def get(self, name: Optional[str]) -> Optional[Preset]:
+        """Preset called `name`; None for "none"/empty; `ValueError` if unknown."""
+        if not name or name == "none":
+            return None
+        try:
+            return self._presets[name]
+        except KeyError:
+            raise ValueError(f"Unknown fx '{name}'. Use one of: none, {', '.join(self._presets)}") from None
+
+    def apply(self, name: Optional[str], audio: np.ndarray, sample_rate: int) -> np.ndarray:
+        preset = self.get(name)
+        return audio if preset is None else preset.apply(audio, sample_rate)
+
+
+@lru_cache(maxsize=None)
+def default_library() -> FxLibrary:
+    """Presets shipped in `fx_presets/`."""
+    return FxLibrary(PRESETS_DIR)
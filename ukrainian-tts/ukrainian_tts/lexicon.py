@@ -0,0 +1,256 @@
+"""Compiled, memory-mapped stress lexicon.
+
+The lexicon is a `marisa_trie.BytesTrie` mapping a word form to its accent
+positions (Stressifier convention: index *after* the stressed vowel). It is
+built offline from the `ukrainian_word_stress` dictionary plus the overrides in
+`vocoder/` and memory-mapped at runtime, so lookups take microseconds and the
+pages are shared between worker processes.
+
+Words whose stress depends on context (e.g. "з+амок"/"зам+ок") are stored with
+an empty value; sentences containing them fall back to the Stressifier NLP
+pipeline. An override only applies to the word it is keyed by, and words
+whose overrides disagree, or that the dictionary marks as ambiguous, stay
+ambiguous.
+
+`get_lexicon` builds the file on first use when it is missing (next to this
+module, or in `CACHE_PATH` if the package directory is read-only). To build
+it ahead of time:
+    python -m ukrainian_tts.lexicon --out ukrainian_tts/data/stress_lexicon.marisa
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+from os.path import abspath, dirname, exists, expanduser, join
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+ACUTE = "\u0301"
+AMBIGUOUS = b""
+
+DEFAULT_PATH = join(dirname(abspath(__file__)), "data", "stress_lexicon.marisa")
+CACHE_PATH = join(expanduser("~"), ".cache", "ukrainian_tts", "stress_lexicon.marisa")
+VOCODER_DIR = join(dirname(dirname(abspath(__file__))), "vocoder")
+
+# override files use combining accents, standalone acute signs or Latin look-alikes
+_ACCENT_MARKS = {"\u0301", "\u00b4", "\u02c8"}
+_PRECOMPOSED = {"á": "а", "é": "е", "ó": "о", "í": "і", "ú": "у", "ý": "у"}
+_WORD = re.compile(r"[^\W\d_]+(?:['-][^\W\d_]+)*")
+_CYRILLIC_WORD = re.compile(r"^[а-щьюяєіїґ'-]+$")
+
+
+class StressLexicon:
+    """Read-only, memory-mapped word -> accent positions lookup."""
+
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        import marisa_trie  # type: ignore
+
+        self.path = path
+        self._trie = marisa_trie.BytesTrie()
+        self._trie.mmap(path)
+
+    def lookup(self, word: str) -> Optional[bytes]:
+        """Return accent positions as bytes, `AMBIGUOUS` or None for unknown words."""
+        for candidate in (word, word.lower(), word.title()):
+            values = self._trie.get(candidate)
+            if values:
+                return values[0]
+        return None
+
+    def __contains__(self, word: str) -> bool:
+        return self.lookup(word) is not None
+
+    def __len__(self) -> int:
+        return len(self._trie)
+
+    def stressify(self, text: str) -> Optional[str]:
+        """Insert `ACUTE` after stressed vowels of every known word in `text`.
+
+        Returns None if any word is ambiguous, so the caller can resolve the
+        whole sentence with context instead.
+        """
+        result = []
+        last = 0
+        for match in _WORD.finditer(text):
+            word = match.group(0)
+            accents = self.lookup(word)
+            if accents is None and "-" in word:
+                parts = [self.lookup(part) for part in word.split("-")]
+                if any(part == AMBIGUOUS for part in parts):
+                    return None
+                accented = "-".join(
+                    _apply_accents(part, part_accents or b"")
+                    for part, part_accents in zip(word.split("-"), parts)
+                )
+            elif accents == AMBIGUOUS:
+                return None
+            else:
+                accented = _apply_accents(word, accents or b"")
+            result.append(text[last : match.start()])
+            result.append(accented)
+            last = match.end()
+        result.append(text[last:])
+        return "".join(result)
+
+
+def _apply_accents(word: str, positions: bytes) -> str:
+    for position in sorted(positions, reverse=True):
+        word = word[:position] + ACUTE + word[position:]
+    return word
+
+
+_lexicons: Dict[str, StressLexicon] = {}
+_build_failed: Set[str] = set()
+_lock = threading.RLock()
+
+
+def _build_on_first_use(paths: List[str]) -> Optional[str]:
+    """Build the lexicon into the first writable of `paths`; each path is tried once per process."""
+    for path in paths:
+        if path in _build_failed:
+            continue
+        try:
+            build_lexicon(path)
+            return path
+        except (ImportError, OSError, RuntimeError, ValueError):
+            _build_failed.add(path)
+    return None
+
+
+def get_lexicon(path: Optional[str] = None) -> Optional[StressLexicon]:
+    """Return the shared lexicon, building it if it is missing; None if it can't be built or loaded.
+
+    Only a loaded lexicon is cached: a file that appears later (built by
+    another process) is picked up on the next call.
+    """
+    explicit = path or os.environ.get("UKRAINIAN_TTS_LEXICON")
+    candidates = [explicit] if explicit else [DEFAULT_PATH, CACHE_PATH]
+    for candidate in candidates:
+        if candidate in _lexicons:
+            return _lexicons[candidate]
+    with _lock:
+        found = next((candidate for candidate in candidates if exists(candidate)), None)
+        if found is None:
+            found = _build_on_first_use(candidates)
+        if found is None:
+            return None
+        if found not in _lexicons:
+            try:
+                _lexicons[found] = StressLexicon(found)
+            except (ImportError, OSError, RuntimeError):
+                return None
+        return _lexicons[found]
+
+
+def parse_accented(form: str) -> Optional[Tuple[str, bytes]]:
+    """Split an accented form like "замо́к" into ("замок", positions)."""
+    word = ""
+    positions = []
+    for char in form.strip():
+        if char in _ACCENT_MARKS:
+            if word:
+                positions.append(len(word))
+        elif char in _PRECOMPOSED:
+            word += _PRECOMPOSED[char]
+            positions.append(len(word))
+        else:
+            word += char
+    word = word.lower().replace("’", "'").replace("ʼ", "'")
+    if not positions or not _CYRILLIC_WORD.match(word):
+        return None
+    return word, bytes(positions)
+
+
+def _dictionary_entries() -> Iterable[Tuple[str, bytes]]:
+    """Yield (word, positions or AMBIGUOUS) from the ukrainian_word_stress dictionary."""
+    from importlib import resources as pkg_resources
+
+    import marisa_trie  # type: ignore
+
+    trie = marisa_trie.BytesTrie()
+    trie.load(str(pkg_resources.files("ukrainian_word_stress").joinpath("data/stress.trie")))
+    for word, value in trie.iteritems():
+        if b"\n" not in value:
+            if value:
+                yield word, value
+            continue
+        options = {item.partition(b"\t")[0] for item in value.split(b"\n") if item}
+        options.discard(b"")
+        if len(options) == 1:
+            yield word, options.pop()
+        elif options:
+            yield word, AMBIGUOUS
+
+
+def _plain(word: str) -> str:
+    return word.strip().lower().replace("’", "'").replace("ʼ", "'")
+
+
+def _override_entries(vocoder_dir: str = VOCODER_DIR) -> Iterable[Tuple[str, bytes]]:
+    """Yield accented forms from the word -> replacement maps and Wiktionary extracts.
+
+    A map entry counts only if its value is an accented form of its key:
+    replacements of other words (spelling fixes, accented keys) are skipped.
+    """
+    for name in ("intonation_overrides_expanded.json", "intonation_overrides.json", "overrides_plus.json"):
+        path = join(vocoder_dir, name)
+        if not exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            overrides: Dict[str, str] = json.load(f)
+        for key, value in overrides.items():
+            if key.startswith("#") or not isinstance(value, str):
+                continue
+            parsed = parse_accented(value)
+            if parsed and parsed[0] == _plain(key):
+                yield parsed
+
+    path = join(vocoder_dir, "wiktionary_sample.json")
+    if exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            sample = json.load(f)
+        for entry in sample.values():
+            for form in entry.get("forms", []):
+                parsed = parse_accented(form)
+                if parsed:
+                    yield parsed
+
+
+def build_lexicon(out_path: str = DEFAULT_PATH, vocoder_dir: str = VOCODER_DIR) -> int:
+    """Compile the lexicon into `out_path`; returns the number of entries."""
+    import marisa_trie  # type: ignore
+
+    entries: Dict[str, bytes] = dict(_dictionary_entries())
+    overrides: Dict[str, Set[bytes]] = {}
+    for word, positions in _override_entries(vocoder_dir):
+        overrides.setdefault(word, set()).add(positions)
+    # hand-written overrides win over an unambiguous dictionary entry; when they disagree with
+    # each other or the dictionary knows the word as ambiguous, context has to decide
+    for word, options in overrides.items():
+        entries[word] = options.pop() if len(options) == 1 and entries.get(word) != AMBIGUOUS else AMBIGUOUS
+
+    os.makedirs(dirname(abspath(out_path)), exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    try:
+        marisa_trie.BytesTrie(entries.items()).save(tmp_path)
+        os.replace(tmp_path, out_path)
+    finally:
+        if exists(tmp_path):
+            os.remove(tmp_path)
+    with _lock:
+        _lexicons.pop(out_path, None)
+    return len(entries)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the compiled stress lexicon")
+    parser.add_argument("--out", default=DEFAULT_PATH, help="Output .marisa file")
+    parser.add_argument("--vocoder-dir", default=VOCODER_DIR, help="Directory with override JSON files")
+    args = parser.parse_args(argv)
+    count = build_lexicon(args.out, args.vocoder_dir)
+    print(f"Wrote {count} entries to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Loudness normalisation: K-weighted integrated loudness, gain, true-peak limiter.
+
+Loudness is measured as in ITU-R BS.1770: the signal goes through the
+K-weighting filter (a high shelf and a high pass), mean squares are taken
+over 400 ms blocks overlapping by 75 % (built from 100 ms hops), blocks
+below -70 LUFS and then those 10 LU below the mean are gated out. Pauses
+therefore do not count, and sentences synthesised separately come out at
+the same loudness, which peak normalisation does not give.
+
+- `integrated_loudness` measures a whole signal in one vectorised pass
+  (filtered in blocks, so memory stays bounded).
+- `normalise` measures, applies the gain in place and runs `TruePeakLimiter`
+  in place: the output shares the input's memory.
+- `LoudnessMeter` keeps running statistics (filter state, the last hops and
+  the energy of every 400 ms block, 8 bytes per 100 ms of audio) for audio
+  that arrives in chunks; `LoudnessNormaliser` is the streaming `BlockProcessor`
+  that drives its gain from them.
+
+`TruePeakLimiter` is `dsp.LookaheadLimiter` measuring each frame at four
+times the sample rate (the shared polyphase filter of `resampling`), so
+inter-sample peaks stay under the ceiling too.
+"""
+
+import math
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+from scipy.signal import sosfilt, upfirdn  # type: ignore
+
+from .dsp import BLOCK_SIZE, BlockProcessor, Chain, Fifo, LookaheadLimiter
+from .resampling import HALF_TAPS, polyphase_filter
+
+TARGET_LUFS = -18.0
+CEILING = 0.95  # linear true-peak ceiling, the same as the sample-peak ceiling before
+
+HOP_SECONDS = 0.1
+BLOCK_HOPS = 4  # 400 ms gating blocks, 75 % overlap
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+OVERSAMPLE = 4
+
+
+@lru_cache(maxsize=None)
+def k_weighting(sample_rate: int) -> np.ndarray:
+    """BS.1770 K-weighting as two second-order sections, for any sample rate."""
+    # high shelf (+4 dB above ~1.7 kHz): the head's acoustic effect
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+             1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    # RLB high pass at ~38 Hz
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.array([shelf, highpass])
+
+
+def _lufs(mean_square):
+    with np.errstate(divide="ignore"):
+        return -0.691 + 10 * np.log10(mean_square)
+
+
+def gated_loudness(blocks: np.ndarray) -> float:
+    """Integrated loudness (LUFS) from the K-weighted mean squares of the 400 ms blocks."""
+    blocks = blocks[_lufs(blocks) > ABSOLUTE_GATE]
+    if not len(blocks):
+        return -math.inf
+    blocks = blocks[_lufs(blocks) > _lufs(blocks.mean()) + RELATIVE_GATE]
+    return float(_lufs(blocks.mean()))
+
+
+class LoudnessMeter:
+    """Running integrated loudness of mono audio fed in chunks.
+
+    `update(chunk)` filters the chunk (state carried over) and records the
+    400 ms blocks it completes; `integrated()` gates the blocks so far.
+    Audio shorter than one block is measured as a whole, ungated.
+    """
+
+    def __init__(self, sample_rate: int) -> None:
+        self.sample_rate = sample_rate
+        self.sos = k_weighting(sample_rate)
+        self.hop = max(1, int(round(sample_rate * HOP_SECONDS)))
+        self.reset()
+
+    def reset(self) -> None:
+        self._zi = np.zeros((len(self.sos), 2))
+        self._partial = 0.0  # energy of the unfinished hop
+        self._filled = 0  # its samples
+        self._recent = np.zeros(0)  # energies of the last BLOCK_HOPS - 1 hops
+        self._blocks: List[np.ndarray] = []
+        self._energy = 0.0
+        self.samples = 0
+        self.peak = 0.0
+
+    def update(self, chunk: np.ndarray) -> "LoudnessMeter":
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if not len(chunk):
+            return self
+        self.peak = max(self.peak, float(np.abs(chunk).max()))
+        weighted, self._zi = sosfilt(self.sos, chunk, zi=self._zi)
+        self.samples += len(weighted)
+        # complete the pending hop, then whole hops, then keep the remainder
+        head = min(self.hop - self._filled, len(weighted))
+        self._partial += float(np.dot(weighted[:head], weighted[:head]))
+        self._filled += head
+        rest = weighted[head:]
+        if self._filled < self.hop:
+            return self
+        count = len(rest) // self.hop
+        hops = rest[: count * self.hop].reshape(count, self.hop)
+        energies = np.concatenate([self._recent, [self._partial], np.einsum("ij,ij->i", hops, hops)])
+        tail = rest[count * self.hop:]
+        self._partial = float(np.dot(tail, tail))
+        self._filled = len(tail)
+        self._energy += float(energies[len(self._recent):].sum())
+        if len(energies) >= BLOCK_HOPS:
+            sums = np.convolve(energies, np.ones(BLOCK_HOPS), "valid")
+            self._blocks.append(sums / (BLOCK_HOPS * self.hop))
+        self._recent = energies[-(BLOCK_HOPS - 1):]
+        return self
+
+    def integrated(self) -> float:
+        """Integrated loudness in LUFS of everything so far (-inf for silence)."""
+        if self._blocks:
+            return gated_loudness(np.concatenate(self._blocks))
+        if not self.samples:
+            return -math.inf
+        mean_square = (self._energy + self._partial) / self.samples
+        return float(_lufs(mean_square)) if mean_square > 0 else -math.inf
+
+
+def integrated_loudness(audio: np.ndarray, sample_rate: int, block_size: int = BLOCK_SIZE * 16) -> float:
+    """Integrated loudness (LUFS) of mono `audio`, filtered `block_size` samples at a time."""
+    meter = LoudnessMeter(sample_rate)
+    for start in range(0, len(audio), block_size):
+        meter.update(audio[start:start + block_size])
+    return meter.integrated()
+
+
+def loudness_gain(loudness: float, target_lufs: float = TARGET_LUFS, range_db: float = 30.0) -> float:
+    """Linear gain that brings `loudness` to `target_lufs`, within +-`range_db`; 1 for silence."""
+    if not math.isfinite(loudness):
+        return 1.0
+    return 10 ** (min(max(target_lufs - loudness, -range_db), range_db) / 20)
+
+
+class TruePeakLimiter(LookaheadLimiter):
+    """`LookaheadLimiter` on true peaks: frames are measured 4x oversampled."""
+
+    guard = HALF_TAPS  # input samples after a frame that its interpolation needs
+
+    def __init__(self, sample_rate: int, ceiling: float = CEILING, lookahead_ms: float = 5.0,
+                 release_ms: float = 80.0, frame: int = 32) -> None:
+        self._taps = polyphase_filter(OVERSAMPLE, 1) * np.float32(OVERSAMPLE)
+        # upsampled index of input sample i of the measured signal: OVERSAMPLE * i + centre
+        self._centre = (len(self._taps) - 1) // 2
+        # no interpolated value exceeds this many times the largest input sample around it
+        self._bound = float(max(np.abs(self._taps[phase::OVERSAMPLE]).sum() for phase in range(OVERSAMPLE)))
+        super().__init__(sample_rate, ceiling, lookahead_ms, release_ms, frame)
+
+    def reset(self) -> None:
+        super().reset()
+        self._past = np.zeros(self.guard, dtype=np.float32)
+
+    def _peaks(self, pending: np.ndarray, count: int) -> np.ndarray:
+        n = count * self.frame
+        signal = np.concatenate([self._past, pending[: n + self.guard]])
+        self._past = signal[n:n + self.guard]
+        peaks = np.abs(pending[:n].reshape(count, self.frame)).max(axis=1)
+        # frames whose neighbourhood cannot reach the ceiling between samples are not oversampled
+        edges = np.abs(signal[: self.guard]).max(initial=0.0), np.abs(signal[n + self.guard:]).max(initial=0.0)
+        padded = np.concatenate([[edges[0]], peaks, [edges[1]]])
+        local = np.maximum(np.maximum(padded[:-2], padded[1:-1]), padded[2:])
+        loud = np.flatnonzero(local * self._bound > self.ceiling)
+        if len(loud):
+            windows = np.lib.stride_tricks.sliding_window_view(signal, self.frame + 2 * self.guard)[::self.frame][loud]
+            first = OVERSAMPLE * self.guard + self._centre
+            upsampled = upfirdn(self._taps, windows, OVERSAMPLE, axis=1)[:, first:first + OVERSAMPLE * self.frame]
+            peaks[loud] = np.maximum(peaks[loud], np.abs(upsampled).max(axis=1))
+        return peaks
+
+
+@lru_cache(maxsize=None)
+def true_peak_limiter(sample_rate: int, ceiling: float = CEILING) -> TruePeakLimiter:
+    """Shared `TruePeakLimiter`; `apply` clones it, so it is safe across threads."""
+    return TruePeakLimiter(sample_rate, ceiling)
+
+
+def normalise(audio: np.ndarray, sample_rate: int, target_lufs: float = TARGET_LUFS,
+              ceiling: float = CEILING) -> np.ndarray:
+    """Bring mono `audio` to `target_lufs` and limit true peaks to `ceiling`.
+
+    Works in place on a writable float32 array (returned); anything else is
+    converted to float32 first.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if not audio.flags.writeable:
+        audio = audio.copy()
+    audio *= np.float32(loudness_gain(integrated_loudness(audio, sample_rate), target_lufs))
+    return true_peak_limiter(sample_rate, ceiling).apply(audio, out=audio)
+
+
+class _LoudnessGain(BlockProcessor):
+    """Gain towards `target_lufs` from the running integrated loudness.
+
+    Audio is held back three hops (plus the hop being filled), so the first
+    400 ms block is measured before its audio leaves: no fade-in at the
+    start. The first measurement sets the gain at once, later ones move it
+    by at most `max_step_db` per second, ramped linearly within each hop.
+    """
+
+    def __init__(self, sample_rate: int, target_lufs: float = TARGET_LUFS, max_step_db: float = 6.0) -> None:
+        self.sample_rate = sample_rate
+        self.target_lufs = target_lufs
+        self.hop = max(1, int(round(sample_rate * HOP_SECONDS)))
+        self.step_db = max_step_db * HOP_SECONDS
+        self.lookahead = (BLOCK_HOPS - 1) * self.hop
+        self.latency = self.lookahead + self.hop
+        self._steps = np.arange(1, self.hop + 1, dtype=np.float32) / self.hop
+        self.reset()
+
+    def reset(self) -> None:
+        self.meter = LoudnessMeter(self.sample_rate)
+        self._held = np.zeros(0, dtype=np.float32)
+        self._gain_db: Optional[float] = None
+        self._applied = 1.0
+        self._out = Fifo(self.latency)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        block = np.asarray(block, dtype=np.float32)
+        self.meter.update(block)
+        held = np.concatenate([self._held, block])
+        count = max(0, len(held) - self.lookahead) // self.hop
+        if count:
+            loudness = self.meter.integrated()
+            if math.isfinite(loudness):
+                wanted = 20 * math.log10(loudness_gain(loudness, self.target_lufs))
+                if self._gain_db is None:
+                    self._gain_db = wanted
+                # one step per hop; within a call every hop sees the same measurement
+                steps = np.clip(wanted - self._gain_db, -self.step_db * np.arange(1, count + 1),
+                                self.step_db * np.arange(1, count + 1))
+                gains = (10 ** ((self._gain_db + steps) / 20)).astype(np.float32)
+                self._gain_db += float(steps[-1])
+            else:
+                gains = np.full(count, self._applied, dtype=np.float32)
+            previous = np.concatenate([[np.float32(self._applied)], gains[:-1]])
+            curve = previous[:, None] + (gains - previous)[:, None] * self._steps
+            frames = held[: count * self.hop].reshape(count, self.hop)
+            self._out.push((frames * curve).ravel())
+            self._applied = float(gains[-1])
+            held = held[count * self.hop:]
+        self._held = held
+        return self._out.pop(len(block))
+
+
+class LoudnessNormaliser(Chain):
+    """Streaming `normalise`: running loudness gain followed by the true-peak limiter.
+
+    For audio synthesised chunk by chunk: every chunk is scaled by the same
+    running measurement, so the chunks match each other without a second
+    pass over the joined audio.
+    """
+
+    def __init__(self, sample_rate: int, target_lufs: float = TARGET_LUFS, ceiling: float = CEILING) -> None:
+        super().__init__([_LoudnessGain(sample_rate, target_lufs), TruePeakLimiter(sample_rate, ceiling)])
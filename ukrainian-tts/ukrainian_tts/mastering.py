@@ -0,0 +1,203 @@
+"""Streaming batch mastering: resample and normalise audio files in bounded memory.
+
+`master_file` reads its input twice through `soundfile.blocks()`: the first
+pass measures peak and integrated loudness (`loudness.LoudnessMeter`), the
+second applies the gain, the true-peak limiter in "loudness" mode, and
+resamples with `resampling.StreamResampler` while writing. Only one block
+is in memory at a time, whatever the file length.
+
+`master_batch` runs `master_file` over many files on a process pool, skips
+outputs that are newer than their input and were made with the same
+settings (recorded in `MANIFEST` in the output directory), and reports
+throughput in audio seconds per wall second. Outputs are named after their
+input; when two inputs share a name, the input directories are mirrored
+under the output directory instead. A file that fails is reported in its
+result and does not stop the others.
+"""
+
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import soundfile as sf  # type: ignore
+
+from .loudness import CEILING, TARGET_LUFS, LoudnessMeter, TruePeakLimiter, loudness_gain
+from .resampling import StreamResampler
+
+BLOCK_SIZE = 65536
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg")
+MANIFEST = ".mastering.json"
+
+
+class MasterSettings(NamedTuple):
+    sample_rate: int = 44100
+    subtype: str = "PCM_24"
+    # "peak": scale the peak to `ceiling`; "loudness": integrated loudness to `target_db` LUFS,
+    # true peaks limited to `ceiling`
+    mode: str = "loudness"
+    ceiling: float = CEILING
+    target_db: float = TARGET_LUFS
+
+
+class MasterResult(NamedTuple):
+    source: str
+    output: str
+    seconds: float  # audio duration
+    gain_db: float
+    skipped: bool = False
+    error: Optional[str] = None
+
+
+def _mono_blocks(path: str, block_size: int = BLOCK_SIZE) -> Iterable[np.ndarray]:
+    for block in sf.blocks(path, blocksize=block_size, dtype="float32", always_2d=True):
+        yield block[:, 0] if block.shape[1] == 1 else block.mean(axis=1)
+
+
+def scan(path: str, block_size: int = BLOCK_SIZE) -> Tuple[float, float, int]:
+    """(peak, integrated loudness in LUFS, frames) of the mono mix, one block at a time."""
+    meter = LoudnessMeter(sf.info(path).samplerate)
+    for block in _mono_blocks(path, block_size):
+        meter.update(block)
+    return meter.peak, meter.integrated(), meter.samples
+
+
+def master_gain(peak: float, loudness: float, settings: MasterSettings) -> float:
+    """Linear gain for a file with the measured `peak` and `loudness`."""
+    if peak <= 0.0:
+        return 1.0
+    if settings.mode == "peak":
+        return settings.ceiling / peak
+    if settings.mode != "loudness":
+        raise ValueError(f"Unknown mastering mode '{settings.mode}'")
+    return loudness_gain(loudness, settings.target_db)
+
+
+def master_file(source: str, output: str, settings: MasterSettings = MasterSettings(),
+                block_size: int = BLOCK_SIZE) -> MasterResult:
+    """Normalise and resample `source` into `output` (mono), streaming; written atomically."""
+    info = sf.info(source)
+    peak, loudness, frames = scan(source, block_size)
+    gain = np.float32(master_gain(peak, loudness, settings))
+    resampler = StreamResampler(info.samplerate, settings.sample_rate)
+    limiter = TruePeakLimiter(info.samplerate, settings.ceiling) if settings.mode == "loudness" else None
+    # the limiter's first `latency` output samples come before the audio
+    skip = limiter.latency if limiter is not None else 0
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f".{os.path.basename(output)}.{os.getpid()}.tmp")
+    try:
+        with sf.SoundFile(tmp, "w", samplerate=settings.sample_rate, channels=1, subtype=settings.subtype,
+                          format=os.path.splitext(output)[1][1:].upper() or "WAV") as out:
+            for block in _mono_blocks(source, block_size):
+                block *= gain
+                if limiter is not None:
+                    block = limiter.process(block)
+                    block, skip = block[skip:], max(0, skip - len(block))
+                out.write(resampler.process(block))
+            if limiter is not None:
+                out.write(resampler.process(limiter.flush()[skip:]))
+            out.write(resampler.flush())
+        os.replace(tmp, output)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return MasterResult(source, output, frames / info.samplerate, float(20 * np.log10(gain)))
+
+
+def find_inputs(patterns: Iterable[str]) -> List[str]:
+    """Audio files from directories (not recursive) and glob patterns, sorted, without duplicates."""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = glob.glob(os.path.join(pattern, "*"))
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+        found.update(path for path in candidates if path.lower().endswith(AUDIO_EXTENSIONS) and os.path.isfile(path))
+    return sorted(found)
+
+
+def output_names(sources: List[str]) -> Dict[str, str]:
+    """source -> output path relative to the output directory (`.wav`).
+
+    Plain `<name>.wav` unless two sources share a name; then the paths
+    relative to the sources' common directory are mirrored.
+    """
+    def stem(path: str) -> str:
+        return os.path.splitext(path)[0] + ".wav"
+
+    names = {source: stem(os.path.basename(source)) for source in sources}
+    if len(set(names.values())) < len(names):
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(source)) for source in sources])
+        names = {source: stem(os.path.relpath(os.path.abspath(source), root)) for source in sources}
+    taken: Dict[str, str] = {}
+    for source, name in names.items():
+        if name in taken:
+            raise ValueError(f"'{source}' and '{taken[name]}' would both be mastered to '{name}'")
+        taken[name] = source
+    return names
+
+
+def _read_manifest(out_dir: str) -> Dict[str, Dict]:
+    try:
+        with open(os.path.join(out_dir, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _up_to_date(source: str, output: str, record: Optional[Dict], settings: MasterSettings) -> bool:
+    if record is None or not os.path.exists(output):
+        return False
+    stat = os.stat(source)
+    return (record.get("settings") == settings._asdict() and record.get("size") == stat.st_size
+            and record.get("mtime") == stat.st_mtime and os.path.getmtime(output) >= stat.st_mtime)
+
+
+def master_batch(sources: List[str], out_dir: str, settings: MasterSettings = MasterSettings(),
+                 workers: Optional[int] = None, force: bool = False) -> Tuple[List[MasterResult], float]:
+    """Master `sources` into `out_dir` in parallel (names from `output_names`); returns (results, wall seconds).
+
+    Raises `ValueError` before any work if two sources would share an output.
+    """
+    started = time.perf_counter()
+    names = output_names(sources)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _read_manifest(out_dir)
+    results: List[MasterResult] = []
+    jobs = []
+    for source in sources:
+        output = os.path.join(out_dir, names[source])
+        record = manifest.get(names[source])
+        if not force and _up_to_date(source, output, record, settings):
+            results.append(MasterResult(source, output, record.get("seconds", 0.0), record.get("gain_db", 0.0), True))
+        else:
+            jobs.append((source, output))
+
+    if jobs:
+        workers = min(workers or os.cpu_count() or 1, len(jobs))
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(master_file, source, output, settings): (source, output)
+                           for source, output in jobs}
+                for future in as_completed(futures):
+                    source, output = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:  # one bad file must not lose the rest of the batch
+                        results.append(MasterResult(source, output, 0.0, 0.0, error=f"{type(e).__name__}: {e}"))
+                        manifest.pop(names[source], None)
+                        continue
+                    stat = os.stat(result.source)
+                    manifest[names[source]] = {
+                        "source": os.path.abspath(result.source), "size": stat.st_size, "mtime": stat.st_mtime,
+                        "settings": settings._asdict(), "seconds": result.seconds, "gain_db": result.gain_db,
+                    }
+                    results.append(result)
+        finally:
+            with open(os.path.join(out_dir, MANIFEST), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return sorted(results, key=lambda r: r.source), time.perf_counter() - started
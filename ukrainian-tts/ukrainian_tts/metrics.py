@@ -0,0 +1,186 @@
+"""Stage timings and Prometheus metrics for the TTS service.
+
+`span(stage)` times a block, adds it to the `tts_stage_seconds` histogram and,
+if the current thread is collecting (`collect(timings)`), to a per-request
+`Timings`. Scheduler workers collect into the timings of the job they run, so
+chunk work done on other threads still ends up in the request's breakdown.
+
+The exposition format is written by hand to avoid a `prometheus_client`
+dependency; `REGISTRY.render()` returns the text served on `/metrics`.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        # label values -> [bucket counts..., sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            series = self._series.setdefault(labelvalues, [0.0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labelvalues, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _labels(self.labelnames, labelvalues, f'le="{_number(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {int(count)}")
+                labels = _labels(self.labelnames, labelvalues)
+                lines.append(f"{self.name}_sum{labels} {_number(series[-1])}")
+                lines.append(f"{self.name}_count{labels} {int(series[-2])}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = float(value)
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_number(self._value)}",
+        ]
+
+
+# (name, type, help, value) samples produced on demand, e.g. from cache stats;
+# `name` may carry labels: 'tts_queued{priority="bulk"}'
+Sample = Tuple[str, str, str, float]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[object] = []
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        described = set()
+        for collector in self._collectors:
+            for name, kind, documentation, value in collector():
+                base = name.split("{", 1)[0]
+                if base not in described:
+                    described.add(base)
+                    lines += [f"# HELP {base} {documentation}", f"# TYPE {base} {kind}"]
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "tts_stage_seconds", "Time spent in each synthesis stage.", labelnames=("stage",)))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "tts_request_seconds", "End-to-end /tts request time."))
+QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "tts_queue_wait_seconds", "Time a job waited in the scheduler before its first chunk ran."))
+REAL_TIME_FACTOR = REGISTRY.register(Histogram(
+    "tts_real_time_factor", "Synthesis time divided by audio duration.",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)))
+CHARS_PER_SECOND = REGISTRY.register(Histogram(
+    "tts_chars_per_second", "Input characters synthesised per second of wall time.",
+    buckets=(10, 25, 50, 100, 200, 400, 800, 1600, 3200)))
+IN_FLIGHT = REGISTRY.register(Gauge("tts_in_flight_requests", "Requests currently being synthesised."))
+
+
+class Timings:
+    """Per-request accumulated seconds by stage; thread-safe."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage -> milliseconds."""
+        with self._lock:
+            return {stage: round(seconds * 1000, 2) for stage, seconds in self._stages.items()}
+
+
+_current = threading.local()
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add an already measured duration for `stage`."""
+    STAGE_SECONDS.observe(seconds, stage)
+    timings: Optional[Timings] = getattr(_current, "timings", None)
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def collect(timings: Optional[Timings]):
+    """Send spans recorded by the current thread to `timings` as well."""
+    previous = getattr(_current, "timings", None)
+    _current.timings = timings
+    try:
+        yield timings
+    finally:
+        _current.timings = previous
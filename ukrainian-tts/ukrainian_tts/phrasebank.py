@@ -0,0 +1,202 @@
+"""Pre-rendered stock phrases.
+
+Agents keep saying the same short phrases ("Виконую команду", "Скрін
+готовий", ...). A phrase bank file lists them with their voice and effect; the
+service renders them in the background at low priority and then answers exact
+or normalised matches from memory without touching the model.
+
+Rendered audio is also stored in `cache_dir`, one `.npz` per phrase, named by
+a hash of the phrase, its voice embedding, the model fingerprint and the
+effect key (preset content and post-processing version). A new model, changed
+voice embedding, edited preset or new normalisation therefore misses the
+cache and the phrase is rendered again; files nobody refers to any more are
+removed.
+
+Phrase bank file:
+
+    {"defaults": {"voice": "dmytro", "fx": "none"},
+     "phrases": [{"text": "Виконую команду", "voice": "tetiana"}, ...]}
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+_NOT_WORD = re.compile(r"[^\w']+")
+_FINAL_MARKS = re.compile(r"[^\w']*$")
+
+
+def normalise_key(text: str) -> str:
+    """Case, punctuation and spacing insensitive form of `text`.
+
+    A final question or exclamation mark is kept: "Готово?" is said
+    differently from "Готово." and must not share its audio.
+    """
+    text = text.lower().replace("’", "'").replace("ʼ", "'")
+    final = _FINAL_MARKS.search(text).group(0)
+    mark = "?" if "?" in final else "!" if "!" in final else ""
+    return " ".join(_NOT_WORD.sub(" ", text).split()) + mark
+
+
+class Phrase(NamedTuple):
+    text: str
+    voice: str
+    fx: str
+
+
+class RenderedPhrase(NamedTuple):
+    audio: np.ndarray
+    sample_rate: int
+    accented: str
+
+
+def load_phrases(path: str) -> List[Phrase]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    defaults = data.get("defaults", {})
+    phrases = []
+    for item in data.get("phrases", []):
+        if isinstance(item, str):
+            item = {"text": item}
+        text = item.get("text", "").strip()
+        if text:
+            phrases.append(Phrase(
+                text,
+                item.get("voice", defaults.get("voice", "dmytro")),
+                item.get("fx", defaults.get("fx", "none")),
+            ))
+    return phrases
+
+
+class PhraseBank:
+    """In-memory audio for stock phrases, backed by `cache_dir`.
+
+    - `fingerprint` - identifies the model; part of every cache file name.
+    - `voice_vector` - returns the embedding of a voice, so changed voices re-render.
+    - `effect_key` - identifies what post-processing an effect name stands for
+      (preset content, normaliser version), so edited effects re-render.
+    """
+
+    def __init__(self, phrases: List[Phrase], cache_dir: Optional[str], fingerprint: str,
+                 voice_vector: Callable[[str], np.ndarray],
+                 effect_key: Callable[[str], str] = lambda fx: fx) -> None:
+        self.phrases = phrases
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint
+        self.voice_vector = voice_vector
+        self.effect_key = effect_key
+        self._audio: Dict[Tuple[str, str, str], RenderedPhrase] = {}
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rendered = 0
+        self.loaded = 0
+        self.failed = 0
+
+    @classmethod
+    def from_file(cls, path: str, cache_dir: Optional[str], fingerprint: str,
+                  voice_vector: Callable[[str], np.ndarray],
+                  effect_key: Callable[[str], str] = lambda fx: fx) -> "PhraseBank":
+        return cls(load_phrases(path), cache_dir, fingerprint, voice_vector, effect_key)
+
+    def _cache_path(self, phrase: Phrase) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha1()
+        digest.update(self.fingerprint.encode())
+        digest.update(np.ascontiguousarray(self.voice_vector(phrase.voice), dtype=np.float32).tobytes())
+        digest.update(f"\0{self.effect_key(phrase.fx)}\0{normalise_key(phrase.text)}".encode())
+        return os.path.join(self.cache_dir, f"{digest.hexdigest()}.npz")
+
+    def get(self, text: str, voice: str, fx: str) -> Optional[RenderedPhrase]:
+        key = (normalise_key(text), voice, fx)
+        with self._lock:
+            rendered = self._audio.get(key)
+            if rendered is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return rendered
+
+    def put(self, phrase: Phrase, rendered: RenderedPhrase, path: Optional[str] = None) -> None:
+        with self._lock:
+            self._audio[(normalise_key(phrase.text), phrase.voice, phrase.fx)] = rendered
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp.npz"
+            np.savez(tmp_path, audio=rendered.audio, sample_rate=rendered.sample_rate, accented=rendered.accented)
+            os.replace(tmp_path, path)
+
+    def forget(self, voice: str) -> None:
+        """Drop the audio of `voice`, e.g. after its x-vector changed; `warm` renders it again."""
+        with self._lock:
+            for key in [key for key in self._audio if key[1] == voice]:
+                del self._audio[key]
+
+    def warm(self, render: Callable[[Phrase], Tuple[np.ndarray, int, str]]) -> None:
+        """Load cached phrases and `render` the missing ones, one at a time.
+
+        `render(phrase)` returns `(audio, sample_rate, accented)` with the effect
+        already applied; it should run at low priority, this is called from a
+        background thread. Phrases already in memory are skipped.
+        """
+        with self._warm_lock:
+            keep = set()
+            for phrase in self.phrases:
+                path = self._warm_one(phrase, render)
+                if path:
+                    keep.add(os.path.basename(path))
+            self._prune(keep)
+
+    def _warm_one(self, phrase: Phrase, render) -> Optional[str]:
+        try:
+            path = self._cache_path(phrase)
+        except (KeyError, ValueError):
+            self.failed += 1  # unknown voice
+            return None
+        with self._lock:
+            if (normalise_key(phrase.text), phrase.voice, phrase.fx) in self._audio:
+                return path
+        if path and os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    rendered = RenderedPhrase(data["audio"], int(data["sample_rate"]), str(data["accented"]))
+                self.put(phrase, rendered)
+                self.loaded += 1
+                return path
+            except (OSError, ValueError, KeyError):
+                pass  # corrupted, render again
+        try:
+            self.put(phrase, RenderedPhrase(*render(phrase)), path)
+            self.rendered += 1
+        except Exception:
+            self.failed += 1
+        return path
+
+    def _prune(self, keep) -> None:
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz") and name not in keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "phrases": len(self.phrases),
+                "ready": len(self._audio),
+                "loaded": self.loaded,
+                "rendered": self.rendered,
+                "failed": self.failed,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,58 @@
+"""Fast pitch shifting for speech: WSOLA time-stretch plus one polyphase resample.
+
+Shifting by a factor f stretches the signal to f times its length with WSOLA
+(pitch kept) and then resamples it by 1/f (duration restored, pitch scaled).
+Both steps are cheap: WSOLA is one small correlation per 10 ms hop and the
+resample is a single `resample_poly` with a filter from the shared cache in
+`resampling`. Since the shift ends in a resample anyway, `out_rate` folds
+the conversion to the output sample rate into the same pass, and `tempo`
+folds a tempo change into the stretch.
+
+Compared to `librosa.effects.pitch_shift` (phase vocoder over an STFT plus a
+high-quality resample) this is two to four times faster and keeps
+transients sharp; see `benchmarks/bench_pitch.py`.
+"""
+
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .resampling import approximate_ratio, polyphase_filter
+from .timescale import wsola
+
+# bounds the polyphase filter bank size; the resulting pitch error is < 0.01 semitone
+MAX_DENOMINATOR = 400
+
+
+@lru_cache(maxsize=64)
+def _plan(sample_rate: int, out_rate: int, steps: float) -> Tuple[int, int, float]:
+    """(up, down, effective shift factor) for one shift."""
+    factor = 2.0 ** (steps / 12.0)
+    up, down = approximate_ratio(out_rate / (sample_rate * factor), MAX_DENOMINATOR)
+    # the exact factor the rational resample gives; WSOLA stretches by the same amount
+    factor = out_rate / (sample_rate * up / down)
+    return up, down, factor
+
+
+def pitch_shift(audio: np.ndarray, sample_rate: int, steps: float, out_rate: Optional[int] = None,
+                tempo: float = 1.0) -> np.ndarray:
+    """
+    Shift the pitch of `audio` by `steps` semitones, keeping its duration.
+    - `out_rate` - sample rate of the result, `sample_rate` by default.
+    - `tempo` - also change the tempo (>1 faster, <1 slower); the result is `tempo` times shorter.
+    """
+    from scipy.signal import resample_poly  # type: ignore
+
+    audio = np.asarray(audio, dtype=np.float32)
+    out_rate = int(out_rate or sample_rate)
+    length = int(round(len(audio) * out_rate / (sample_rate * tempo)))
+    if not len(audio):
+        return np.zeros(0, dtype=np.float32)
+    up, down, factor = _plan(int(sample_rate), out_rate, float(steps))
+    rate = tempo / factor
+    stretched = wsola(audio, rate, sample_rate) if abs(rate - 1.0) > 1e-4 else audio
+    out = resample_poly(stretched, up, down, window=polyphase_filter(up, down)).astype(np.float32, copy=False)
+    if len(out) >= length:
+        return out[:length]
+    return np.concatenate([out, np.zeros(length - len(out), dtype=np.float32)])
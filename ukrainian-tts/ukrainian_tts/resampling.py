@@ -0,0 +1,138 @@
+"""Polyphase resampling with cached filters, shared by the TTS and ASR services.
+
+Every rate conversion goes through one Kaiser-windowed FIR designed once per
+(up, down) ratio and kept in an LRU cache, instead of being redesigned on
+each call as `resample_poly` and `librosa.resample` do. The filters for the
+rate pairs the services use (`COMMON_RATES`) are built by `warm()` at start
+up. Audio stays float32 end to end.
+
+`resample` converts a whole signal, identical to `scipy.signal.resample_poly`
+with its default filter. `StreamResampler` does the same conversion block by
+block for audio that arrives in pieces (decoded packets, synthesis chunks);
+its concatenated output equals `resample` of the whole signal.
+
+This module only needs NumPy and SciPy and imports nothing else from the
+package, so services outside the TTS can load it on its own.
+"""
+
+from fractions import Fraction
+from functools import lru_cache
+from math import gcd
+from typing import Iterable, Tuple
+
+import numpy as np
+
+# model rate -> mastering / ASR / Opus rates, and browser capture -> ASR
+COMMON_RATES = ((22050, 44100), (48000, 16000), (22050, 16000), (22050, 48000))
+
+# `resample_poly` defaults: half-length 10 taps per phase, Kaiser beta 5
+HALF_TAPS = 10
+KAISER_BETA = 5.0
+
+
+def ratio(orig_sr: int, target_sr: int) -> Tuple[int, int]:
+    """(up, down) in lowest terms."""
+    g = gcd(int(orig_sr), int(target_sr))
+    return int(target_sr) // g, int(orig_sr) // g
+
+
+@lru_cache(maxsize=128)
+def polyphase_filter(up: int, down: int) -> np.ndarray:
+    """Anti-aliasing low-pass for resampling by up/down, float32, read-only."""
+    from scipy.signal import firwin  # type: ignore
+
+    max_rate = max(up, down)
+    if max_rate == 1:
+        taps = np.ones(1, dtype=np.float32)  # same rate: identity
+        taps.flags.writeable = False
+        return taps
+    taps = firwin(2 * HALF_TAPS * max_rate + 1, 1.0 / max_rate, window=("kaiser", KAISER_BETA))
+    taps = taps.astype(np.float32)
+    taps.flags.writeable = False
+    return taps
+
+
+def warm(pairs: Iterable[Tuple[int, int]] = COMMON_RATES) -> None:
+    """Design the filters of `pairs` ahead of the first request."""
+    for orig_sr, target_sr in pairs:
+        polyphase_filter(*ratio(orig_sr, target_sr))
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int, axis: int = 0) -> np.ndarray:
+    """Resample float32 `audio` (mono, or channels on the other axis) from `orig_sr` to `target_sr`."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if orig_sr == target_sr:
+        return audio
+    from scipy.signal import resample_poly  # type: ignore
+
+    up, down = ratio(orig_sr, target_sr)
+    # resample_poly copies a window given as an array and scales it by `up` itself
+    return resample_poly(audio, up, down, axis=axis, window=polyphase_filter(up, down)).astype(np.float32, copy=False)
+
+
+def approximate_ratio(rate: float, max_denominator: int) -> Tuple[int, int]:
+    """(up, down) approximating the conversion factor `rate`, with `down` at most `max_denominator`."""
+    fraction = Fraction(rate).limit_denominator(max_denominator)
+    return fraction.numerator, fraction.denominator
+
+
+class StreamResampler:
+    """Stateful resampler for mono float32 audio arriving in blocks.
+
+    `process(block)` returns the output samples that are complete so far
+    (their number varies from block to block), `flush()` the rest once the
+    input has ended. The filter is the shared cached one.
+    """
+
+    def __init__(self, orig_sr: int, target_sr: int) -> None:
+        self.orig_sr = int(orig_sr)
+        self.target_sr = int(target_sr)
+        self.up, self.down = ratio(orig_sr, target_sr)
+        taps = polyphase_filter(self.up, self.down) * np.float32(self.up)
+        half = (len(taps) - 1) // 2
+        # leading zeros put the filter centre on the output grid: output n is upfirdn sample n + self._lead
+        pad = -half % self.down
+        self._taps = np.concatenate([np.zeros(pad, dtype=np.float32), taps])
+        self._lead = (half + pad) // self.down
+        self._half = half
+        self.reset()
+
+    def reset(self) -> None:
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._base = 0  # input index of _buffer[0], a multiple of `down`
+        self._received = 0
+        self._emitted = 0
+
+    def _emit(self, stop: int) -> np.ndarray:
+        """Output samples [emitted, stop) from the buffered input (missing input counts as zeros)."""
+        from scipy.signal import upfirdn  # type: ignore
+
+        if stop <= self._emitted:
+            return np.zeros(0, dtype=np.float32)
+        first = self._emitted + self._lead - self._base * self.up // self.down
+        out = upfirdn(self._taps, self._buffer, self.up, self.down)[first:first + stop - self._emitted]
+        if len(out) < stop - self._emitted:
+            out = np.concatenate([out, np.zeros(stop - self._emitted - len(out), dtype=np.float32)])
+        self._emitted = stop
+        # keep only the input the next output sample still needs, from a multiple of `down`
+        needed = max(0, (stop * self.down + self._half - len(self._taps) + 1) // self.up)
+        base = min(needed, self._received) // self.down * self.down
+        if base > self._base:
+            self._buffer = self._buffer[base - self._base:]
+            self._base = base
+        return out.astype(np.float32, copy=False)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        block = np.asarray(block, dtype=np.float32)
+        self._buffer = np.concatenate([self._buffer, block])
+        self._received += len(block)
+        # output n needs input up to (n * down + half) / up
+        stop = max(0, (self._received * self.up - self._half - 1) // self.down + 1)
+        return self._emit(stop)
+
+    def flush(self) -> np.ndarray:
+        """The remaining output; the total length matches `resample` of the whole input."""
+        total = -(-self._received * self.up // self.down)
+        out = self._emit(total)
+        self.reset()
+        return out
@@ -0,0 +1,147 @@
+"""Pre-synthesis text sanitiser.
+
+Agent replies contain markdown, code, links and emoji that the character-level
+model has no tokens for. `TextSanitizer.clean` strips or spells those out
+before the frontend runs and rejects texts with nothing speakable left, so a
+bad request fails in microseconds with a `ValueError` instead of deep inside
+the model. `TextSanitizer.filter_tokens` is the last line of defence after the
+frontend: every character is mapped into the model's token inventory, read
+from `token_list` in `config.yaml`.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import FrozenSet, Optional
+
+# tokens of the released model, used when config.yaml can't be read
+DEFAULT_TOKENS = frozenset("+ оаинвет іср длукмпязбьгчйжхшюцщ,?-їє!'ф.\"ґ:/„")
+
+_FENCED_CODE = re.compile(r"```.*?(?:```|$)|~~~.*?(?:~~~|$)", re.S)
+_INLINE_CODE = re.compile(r"`([^`\n]*)`")
+_IMAGE_OR_LINK = re.compile(r"!?\[([^\]\n]*)\]\([^)\n]*\)")
+_URL = re.compile(r"(?:https?://|www\.)\S+", re.I)
+_HTML_TAG = re.compile(r"</?[A-Za-z][^>\n]*>")
+_TABLE_RULE = re.compile(r"^\s*\|?\s*:?-{2,}.*$", re.M)
+_LINE_MARKUP = re.compile(r"^[ \t]*(?:#{1,6}[ \t]+|>[ \t]?|[-*+•▪◦][ \t]+|\d{1,3}[.)][ \t]+)", re.M)
+_EMPHASIS = re.compile(r"(\*{1,3}|_{2,3}|~~)(?=\S)(.+?)(?<=\S)\1")
+_LINE_END = re.compile(r"(?<=[^\s.!?,:;…])[ \t]*\n+")
+_SPACES = re.compile(r"[ \t\r\f\v\n]+")
+_COMMAS = re.compile(r"\s*,[\s,]*")
+_SPEAKABLE = re.compile(r"[^\W_]")
+# `+` inside a word or before a vowel is a stress mark (за+мок, +озеро) and stays;
+# elsewhere (3+2, C++) it is spelled out
+_PLUS = re.compile(r"(?P<stress>(?<=[^\W\d_])\+(?=[^\W\d_])|\+(?=[аеєиіїоуюяАЕЄИІЇОУЮЯ]))|\+")
+
+# symbols that carry meaning are spelled out (`+` separately, see `_PLUS`)
+SPOKEN_SYMBOLS = {
+    "&": " і ",
+    "=": " дорівнює ",
+    "%": " відсотків ",
+    "@": " ет ",
+    "#": " номер ",
+    "№": " номер ",
+    "°": " градусів ",
+    "×": " на ",
+    "|": ", ",
+    "•": ", ",
+    "·": ", ",
+}
+
+# characters the frontend leaves that have a close in-inventory equivalent
+TOKEN_FALLBACKS = {
+    "ы": "и",
+    "э": "е",
+    "ё": "ьо",
+    "ъ": "'",
+    ";": ",",
+    "(": ",",
+    ")": ",",
+    "[": ",",
+    "]": ",",
+    "«": '"',
+    "»": '"',
+    "“": '"',
+    "”": '"',
+    "…": ".",
+    "—": "-",
+    "–": "-",
+    "’": "'",
+    "ʼ": "'",
+}
+
+
+@lru_cache(maxsize=None)
+def load_token_inventory(config_path: str) -> FrozenSet[str]:
+    """Single-character tokens of the model in `config_path`; `<space>` becomes " "."""
+    import yaml  # type: ignore
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        tokens = yaml.safe_load(f)["token_list"]
+    inventory = {token for token in tokens if len(token) == 1}
+    if "<space>" in tokens:
+        inventory.add(" ")
+    return frozenset(inventory)
+
+
+@lru_cache(maxsize=4096)
+def _clean_char(char: str) -> str:
+    if char == "\n":
+        return char
+    if char in SPOKEN_SYMBOLS:
+        return SPOKEN_SYMBOLS[char]
+    category = unicodedata.category(char)
+    # emoji, pictographs, box drawing, private use, control and format characters
+    if category in ("So", "Sk", "Co", "Cs", "Cn", "Cc", "Cf"):
+        return " "
+    return char
+
+
+class TextSanitizer:
+    """Strips markdown and unsupported symbols; knows the model's token inventory."""
+
+    def __init__(self, tokens: FrozenSet[str] = DEFAULT_TOKENS) -> None:
+        self.tokens = tokens
+
+    @classmethod
+    def from_config(cls, config_path: Optional[str]) -> "TextSanitizer":
+        try:
+            return cls(load_token_inventory(config_path)) if config_path else cls()
+        except (OSError, KeyError, TypeError, ImportError):
+            return cls()
+
+    def clean(self, text: str) -> str:
+        """Remove markdown, code, links and emoji; raise `ValueError` if nothing speakable is left."""
+        text = unicodedata.normalize("NFC", text)
+        text = _FENCED_CODE.sub(" ", text)
+        text = _INLINE_CODE.sub(r"\1", text)
+        text = _IMAGE_OR_LINK.sub(r"\1", text)
+        text = _URL.sub(" ", text)
+        text = _HTML_TAG.sub(" ", text)
+        text = _TABLE_RULE.sub("", text)
+        text = _LINE_MARKUP.sub("", text)
+        text = _EMPHASIS.sub(r"\2", text)
+        text = text.replace("**", "").replace("__", "").replace("~~", "")
+        text = _PLUS.sub(lambda m: m.group(0) if m.group("stress") else " плюс ", text)
+        text = "".join(_clean_char(char) for char in text)
+        # a line break without punctuation still ends a phrase (list items, headings)
+        text = _LINE_END.sub(". ", text.strip())
+        text = _SPACES.sub(" ", text).strip()
+        if not _SPEAKABLE.search(text):
+            raise ValueError("Text has nothing to synthesize after removing markup and symbols")
+        return text
+
+    def filter_tokens(self, text: str) -> str:
+        """Map every character of frontend output into the token inventory."""
+        tokens = self.tokens
+        if all(char in tokens for char in text):
+            return text
+        out = []
+        for char in text:
+            if char in tokens:
+                out.append(char)
+            else:
+                replacement = TOKEN_FALLBACKS.get(char, " ")
+                out.append(replacement if all(c in tokens for c in replacement) else " ")
+        text = _COMMAS.sub(", ", "".join(out))
+        return _SPACES.sub(" ", text).strip(" ,")
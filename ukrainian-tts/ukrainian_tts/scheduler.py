@@ -0,0 +1,348 @@
+"""Priority scheduling of synthesis jobs through a staged pipeline.
+
+Every job is split into sentence/clause chunks (see `chunking`) and each chunk
+is queued separately, ordered by the job's priority class and then by arrival.
+Chunks flow through three stages running on their own threads:
+
+1. frontend - `preprocess_text` + stress, feeding a bounded queue;
+2. acoustic - acoustic model and vocoder, one chunk at a time per worker;
+3. post - joining the chunks and the job's `postprocess` (effects, encoding).
+
+The stages overlap across chunks and requests, so the model does not wait for
+the next text to be stressed, and throughput is bound by the slowest stage.
+Workers take one chunk at a time, so a long bulk job yields to an interactive
+one at the next chunk boundary. Jobs can be tagged with a session; a new job
+for the same session (the user barging in) cancels the previous ones, and the
+chunk that is already running stops at the next decoder step.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from enum import IntEnum
+from typing import Callable, Dict, List, Optional
+
+from .chunking import MAX_CHUNK_CHARS, join_chunks, split_chunks, trim_silence
+from .metrics import QUEUE_WAIT_SECONDS, Timings, collect
+from .tts import SynthesisCancelled
+
+
+class Priority(IntEnum):
+    """Priority classes, lower runs first."""
+
+    Interactive = 0
+    Normal = 1
+    Bulk = 2
+
+    @classmethod
+    def parse(cls, value) -> "Priority":
+        if isinstance(value, cls):
+            return value
+        try:
+            return cls[str(value).strip().capitalize()]
+        except KeyError:
+            raise ValueError(
+                f"Invalid priority '{value}'. Use one of: {', '.join(p.name.lower() for p in cls)}"
+            ) from None
+
+
+class Job:
+    """A submitted synthesis request; `result()` blocks until it is done."""
+
+    def __init__(self, job_id: int, text: str, voice: str, stress: str, speed: float,
+                 priority: Priority, session: Optional[str], max_chars: int,
+                 timings: Optional[Timings] = None, postprocess: Optional[Callable] = None) -> None:
+        self.id = job_id
+        self.voice = voice
+        self.stress = stress
+        self.speed = speed
+        self.priority = priority
+        self.session = session
+        self.chunks = split_chunks(text, max_chars) or []
+        self.cancelled = threading.Event()
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.timings = timings if timings is not None else Timings()
+        self.postprocess = postprocess
+        # accented chunk texts produced by the frontend stage
+        self.accented: List[Optional[str]] = [None] * len(self.chunks)
+        self._results: List[Optional[tuple]] = [None] * len(self.chunks)
+        self._remaining = len(self.chunks)
+        self._done = threading.Event()
+        self._finish_lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._output: Optional[tuple] = None
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+        self._finish(error=SynthesisCancelled(f"job {self.id} cancelled"))
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def result(self, timeout: Optional[float] = None):
+        """Return `(wav, sample_rate, accented_text)`, or what `postprocess` made of it, or raise the job's error."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"job {self.id} is still running")
+        if self._error is not None:
+            raise self._error
+        return self._output
+
+    def _finish(self, output=None, error: Optional[BaseException] = None) -> None:
+        with self._finish_lock:
+            if self._done.is_set():
+                return
+            self._output = output
+            self._error = error
+            self._done.set()
+
+    def _chunk_done(self, index: int, result) -> bool:
+        """Store a chunk result; True when it was the last one."""
+        self._results[index] = result
+        self._remaining -= 1
+        return self._remaining == 0
+
+    def _join(self):
+        if len(self._results) == 1:
+            return self._results[0]
+        sample_rate = self._results[0][1]
+        waves = [trim_silence(wav, sample_rate) for wav, _, _ in self._results]
+        wav = join_chunks(waves, [chunk.pause for chunk in self.chunks], sample_rate)
+        return wav, sample_rate, " ".join(accented for _, _, accented in self._results)
+
+
+class _StageQueue:
+    """Priority queue between stages; `put` blocks while `maxsize` items are waiting."""
+
+    def __init__(self, maxsize: int = 0) -> None:
+        self.maxsize = maxsize
+        self._heap: List[tuple] = []
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    def put(self, priority: int, order: int, item) -> None:
+        with self._cond:
+            while self.maxsize and len(self._heap) >= self.maxsize and not self._stopped:
+                self._cond.wait()
+            heapq.heappush(self._heap, (priority, order, item))
+            self._cond.notify_all()
+
+    def get(self):
+        """Next item by priority, or None once stopped."""
+        with self._cond:
+            while not self._heap:
+                if self._stopped:
+                    return None
+                self._cond.wait()
+            item = heapq.heappop(self._heap)[2]
+            self._cond.notify_all()
+            return item
+
+    def items(self) -> List:
+        with self._cond:
+            return [entry[2] for entry in self._heap]
+
+    def stop(self) -> List:
+        with self._cond:
+            self._stopped = True
+            pending = [entry[2] for entry in self._heap]
+            self._heap.clear()
+            self._cond.notify_all()
+            return pending
+
+
+class SynthesisScheduler:
+    """Runs queued jobs through the frontend, acoustic and post stages in priority order.
+
+    - `tts` - a loaded `TTS` instance.
+    - `workers` - acoustic model threads, `tts.workers` by default.
+    - `frontend_workers` / `post_workers` - threads of the other two stages.
+    - `max_chars` - chunk size; smaller chunks preempt sooner.
+    - `queue_size` - frontend output waiting for the model; bounds memory and
+      keeps a burst of bulk text from being stressed far ahead of synthesis.
+    """
+
+    def __init__(self, tts, workers: Optional[int] = None, max_chars: int = MAX_CHUNK_CHARS,
+                 frontend_workers: int = 1, post_workers: int = 1, queue_size: Optional[int] = None) -> None:
+        self.tts = tts
+        self.max_chars = max_chars
+        workers = workers or tts.workers
+        self._frontend = _StageQueue()
+        self._acoustic = _StageQueue(queue_size or 2 * workers)
+        self._post = _StageQueue()
+        self._order = itertools.count()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, List[Job]] = {}
+        self._running = {"frontend": 0, "acoustic": 0, "post": 0}
+        self._stopped = False
+        self._threads = [
+            threading.Thread(target=target, name=f"tts-{name}-{i}", daemon=True)
+            for name, target, count in (
+                ("frontend", self._frontend_worker, frontend_workers),
+                ("acoustic", self._acoustic_worker, workers),
+                ("post", self._post_worker, post_workers),
+            )
+            for i in range(count)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, text: str, voice: str, stress: str, speed: float = 1.0,
+               priority=Priority.Normal, session: Optional[str] = None, cancel_previous: bool = True,
+               timings: Optional[Timings] = None, postprocess: Optional[Callable] = None) -> Job:
+        """Queue `text` for synthesis; with `session`, earlier jobs of that session are cancelled.
+
+        Stage spans of the job's chunks are accumulated into `timings`.
+        `postprocess(wav, sample_rate, accented_text)` runs on the post stage and
+        its return value becomes the job's result.
+        """
+        priority = Priority.parse(priority)
+        # bad options, markup, emoji and empty texts are dealt with here, before any stage runs
+        text, speed = self.tts.validate(text, voice, stress, speed)
+        job = Job(next(self._ids), text, voice, stress, speed, priority, session, self.max_chars,
+                  timings, postprocess)
+        if not job.chunks:
+            raise ValueError("Nothing to synthesize")
+        if session is not None and cancel_previous:
+            self.cancel_session(session)
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("Scheduler is shut down")
+            if session is not None:
+                jobs = [j for j in self._sessions.get(session, []) if not j.done]
+                jobs.append(job)
+                self._sessions[session] = jobs
+        for index in range(len(job.chunks)):
+            self._frontend.put(priority, next(self._order), (job, index))
+        return job
+
+    def cancel_session(self, session: str) -> int:
+        """Cancel all unfinished jobs of `session`; returns how many were cancelled."""
+        with self._lock:
+            jobs = [job for job in self._sessions.pop(session, []) if not job.done]
+        for job in jobs:
+            job.cancel()
+        return len(jobs)
+
+    def stats(self) -> Dict[str, object]:
+        queued = {p.name.lower(): 0 for p in Priority}
+        for job, _ in self._frontend.items() + self._acoustic.items():
+            if not job.cancelled.is_set():
+                queued[job.priority.name.lower()] += 1
+        with self._lock:
+            return {
+                "queued_chunks": queued,
+                "running_chunks": self._running["acoustic"],
+                "stages": dict(self._running),
+                "ready_chunks": len(self._acoustic.items()),
+                "workers": len(self._threads),
+                "sessions": len(self._sessions),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._stopped = True
+        pending = self._frontend.stop() + self._acoustic.stop() + self._post.stop()
+        for item in pending:
+            job = item[0] if isinstance(item, tuple) else item
+            job.cancel()
+
+    def _stage(self, name: str, delta: int) -> None:
+        with self._lock:
+            self._running[name] += delta
+
+    def _fail(self, job: Job, error: BaseException) -> None:
+        if isinstance(error, SynthesisCancelled):
+            job.cancel()
+        else:
+            # one failed chunk fails the job; its other chunks are skipped
+            job.cancelled.set()
+            job._finish(error=error)
+        self._forget(job)
+
+    def _forget(self, job: Job) -> None:
+        if job.session is None:
+            return
+        with self._lock:
+            jobs = self._sessions.get(job.session)
+            if jobs and job in jobs:
+                jobs.remove(job)
+                if not jobs:
+                    del self._sessions[job.session]
+
+    def _frontend_worker(self) -> None:
+        while True:
+            task = self._frontend.get()
+            if task is None:
+                return
+            job, index = task
+            # cancelled jobs are dropped lazily, without touching the model
+            if job.cancelled.is_set() or job.done:
+                continue
+            if job.started is None:
+                job.started = time.time()
+                QUEUE_WAIT_SECONDS.observe(job.started - job.submitted)
+                job.timings.add("queue_wait", job.started - job.submitted)
+            self._stage("frontend", 1)
+            try:
+                with collect(job.timings):
+                    job.accented[index] = self.tts.frontend(job.chunks[index].text, job.stress)
+            except Exception as e:
+                self._fail(job, e)
+                continue
+            finally:
+                self._stage("frontend", -1)
+            # blocks while the acoustic stage is saturated
+            self._acoustic.put(job.priority, next(self._order), (job, index))
+
+    def _acoustic_worker(self) -> None:
+        while True:
+            task = self._acoustic.get()
+            if task is None:
+                return
+            job, index = task
+            if job.cancelled.is_set() or job.done:
+                continue
+            self._stage("acoustic", 1)
+            try:
+                with collect(job.timings):
+                    try:
+                        result = self.tts.synthesize_accented(job.accented[index], job.voice, job.speed, job.cancelled)
+                    except (ValueError, SynthesisCancelled):
+                        raise
+                    except Exception:
+                        # retry the chunk alone from the raw text, splitting it if it keeps failing
+                        result = self.tts.synthesize_chunk(
+                            job.chunks[index].text, job.voice, job.stress, job.speed, job.cancelled
+                        )
+                with self._lock:
+                    last = job._chunk_done(index, result)
+                if last:
+                    self._post.put(job.priority, next(self._order), job)
+            except Exception as e:
+                self._fail(job, e)
+            finally:
+                self._stage("acoustic", -1)
+
+    def _post_worker(self) -> None:
+        while True:
+            job = self._post.get()
+            if job is None:
+                return
+            if job.cancelled.is_set() or job.done:
+                continue
+            self._stage("post", 1)
+            try:
+                with collect(job.timings):
+                    output = job._join()
+                    if job.postprocess is not None:
+                        output = job.postprocess(*output)
+                job._finish(output=output)
+                self._forget(job)
+            except Exception as e:
+                self._fail(job, e)
+            finally:
+                self._stage("post", -1)
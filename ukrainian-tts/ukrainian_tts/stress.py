@@ -1,8 +1,24 @@
+from functools import lru_cache
 from typing import List
-from ukrainian_word_stress import Stressifier, StressSymbol
 import ukrainian_accentor as accentor
+from .lexicon import ACUTE, get_lexicon
+
+
+@lru_cache(maxsize=None)
+def _get_stressifier():
+    # the Stressifier loads a stanza NLP pipeline, so build it only when the
+    # compiled lexicon can't resolve a sentence on its own
+    shared = getattr(accentor, "_get_stressifier", None)
+    if shared is not None:  # bundled accentor fallback: reuse its pipeline
+        return shared()
+    from ukrainian_word_stress import Stressifier, StressSymbol
+
+    return Stressifier(stress_symbol=StressSymbol.CombiningAcuteAccent)
+
+
+def stressify(text: str) -> str:
+    return _get_stressifier()(text)
 
-stressify = Stressifier(stress_symbol=StressSymbol.CombiningAcuteAccent)
 
 vowels = "аеєиіїоуюя"
 consonants = "бвгґджзйклмнпрстфхцчшщь"
@@ -38,14 +54,28 @@ def stress_with_model(text: str):
     return result
 
 
-def stress_dict(sentence: str):
-    stressed = stressify(sentence.replace("+", "")).replace(
-        StressSymbol.CombiningAcuteAccent, "+"
-    )
-    return _shift_stress(stressed)
+def stress_with_model_many(words: List[str]) -> List[str]:
+    """Stress several words with one model call instead of one call per word."""
+    words = [word.lower() for word in words]
+    process_many = getattr(accentor, "process_many", None)
+    if process_many is None:  # upstream ukrainian_accentor has no batched API
+        return [accentor.process(word, mode="plus") for word in words]
+    return process_many(words, mode="plus")
 
 
-def sentence_to_stress(sentence: str, stress_function=stress_dict) -> str:
+def stress_dict(sentence: str):
+    sentence = sentence.replace("+", "")
+    lexicon = get_lexicon()
+    stressed = lexicon.stressify(sentence) if lexicon is not None else None
+    if stressed is None:
+        # no lexicon or an ambiguous word: resolve with sentence context
+        stressed = stressify(sentence)
+    return _shift_stress(stressed.replace(ACUTE, "+"))
+
+
+def sentence_to_stress(
+    sentence: str, stress_function=stress_dict, model_batch_function=stress_with_model_many
+) -> str:
     # replace acute accent with plus
     sentence = _shift_stress(sentence, "́")
     sentence = sentence.replace("́", "+")
@@ -76,7 +106,8 @@ def sentence_to_stress(sentence: str, stress_function=stress_dict) -> str:
     if previous != len(new_stressed):
         new_list.append(new_stressed[previous:])
 
-    # add stress to single-vowel words
+    # add stress to single-vowel words, collect unresolved multi-vowel words
+    unresolved = []
     for word_index in range(0, len(new_list)):
         element: str = new_list[word_index]
         vowels_in_words = list(map(lambda letter: letter in vowels, element.lower()))
@@ -93,7 +124,13 @@ def sentence_to_stress(sentence: str, stress_function=stress_dict) -> str:
             vowel_index = vowels_in_words.index(True)
             new_list[word_index] = element[0:vowel_index] + "+" + element[vowel_index::]
         elif vowels_in_words.count(True) > 1:
-            new_list[word_index] = stress_with_model(element)
+            unresolved.append(word_index)
+
+    # resolve the remaining words with a single batched model call
+    if unresolved:
+        stressed_words = model_batch_function([new_list[i] for i in unresolved])
+        for word_index, stressed_word in zip(unresolved, stressed_words):
+            new_list[word_index] = stressed_word
 
     new_stressed = "".join(new_list)
 
@@ -0,0 +1,81 @@
+"""Time-domain time-scale modification (WSOLA).
+
+Used as the speaking-rate fallback for acoustic models without duration
+control and as the stretch half of `pitch.pitch_shift`. WSOLA keeps pitch and
+formants and has no phase-vocoder "phasiness". The similarity search runs
+coarse-to-fine (decimated, then refined around the best match), so it costs
+two small matrix-vector products per 10 ms of output, and the overlap-add is
+done for all frames at once.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# decimation of the coarse similarity search
+COARSE_STEP = 4
+
+
+def wsola(
+    audio: np.ndarray,
+    rate: float,
+    sample_rate: int,
+    frame_ms: float = 20.0,
+    tolerance_ms: float = 10.0,
+) -> np.ndarray:
+    """
+    Change the tempo of `audio` by `rate` (>1 faster, <1 slower) without changing pitch.
+    - `frame_ms` - analysis/synthesis frame length, frames overlap by half.
+    - `tolerance_ms` - how far a frame may shift to stay in phase with the previous one.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if rate <= 0:
+        raise ValueError(f"rate must be positive, got {rate}")
+    if abs(rate - 1.0) < 1e-3 or len(audio) == 0:
+        return audio
+
+    frame = max(2, int(sample_rate * frame_ms / 1000) // 2 * 2)
+    hop = frame // 2
+    tolerance = max(1, int(sample_rate * tolerance_ms / 1000))
+    # periodic Hann windows at half overlap sum to one
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(np.float32)
+
+    out_length = int(round(len(audio) / rate))
+    n_frames = out_length // hop + 1
+    analysis_hop = hop * rate
+    tail = int(np.ceil(n_frames * analysis_hop)) + frame
+    padded = np.zeros(tolerance + max(len(audio), tail) + frame + 2 * tolerance, dtype=np.float32)
+    padded[tolerance : tolerance + len(audio)] = audio
+
+    # coarse search on a smoothed, decimated copy, then refine around the best match;
+    # window views are built once, the loop only slices them
+    step = COARSE_STEP if tolerance >= 4 * COARSE_STEP else 1
+    windows = sliding_window_view(padded, frame)
+    if step > 1:
+        smooth = np.convolve(padded, np.full(step, 1.0 / step, dtype=np.float32), mode="same")
+        # one decimated copy per phase, so a coarse candidate set is a contiguous run of windows
+        phases = [sliding_window_view(np.ascontiguousarray(smooth[r::step]), frame // step) for r in range(step)]
+    span = 2 * tolerance // step
+    starts = np.empty(n_frames, dtype=np.int64)
+    delta = 0
+    for k in range(n_frames):
+        start = starts[k] = int(round(k * analysis_hop)) + tolerance + delta
+        # the natural continuation of this frame is the target for the next one
+        natural = start + hop
+        low = int(round((k + 1) * analysis_hop))
+        if step > 1:
+            phase = phases[low % step]
+            first = low // step
+            target = phases[natural % step][natural // step]
+            best = int(np.argmax(phase[first : first + span + 1] @ target)) * step
+            lo, hi = max(0, best - step + 1), min(2 * tolerance, best + step - 1)
+        else:
+            lo, hi = 0, 2 * tolerance
+        delta = lo + int(np.argmax(windows[low + lo : low + hi + 1] @ windows[natural])) - tolerance
+
+    # overlap-add: even and odd frames each tile the output without overlapping
+    frames = padded[starts[:, None] + np.arange(frame)] * window
+    out = np.zeros((n_frames + 2) * hop, dtype=np.float32)
+    for parity in (0, 1):
+        tiles = frames[parity::2]
+        out[parity * hop : parity * hop + len(tiles) * frame].reshape(len(tiles), frame)[:] += tiles
+    return out[:out_length]
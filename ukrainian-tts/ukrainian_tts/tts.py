@@ -1,34 +1,195 @@
 from io import BytesIO
 import requests
-from os.path import exists, join, dirname
-from espnet2.bin.tts_inference import Text2Speech  # type: ignore
-import torch  # type: ignore
+from functools import lru_cache
+from os.path import exists, join, dirname, getmtime, splitext
 from enum import Enum
-from .formatter import preprocess_text
-from .stress import sentence_to_stress, stress_dict, stress_with_model
-from torch import no_grad  # type: ignore
+from .chunking import MAX_CHUNK_CHARS, chunk_offsets, join_alignments, join_chunks, split_chunks, trim_bounds
+from .frontend import FrontendCache, run_frontend
+from .metrics import record, span
+from .sanitizer import TextSanitizer
+from .stress import stress_dict, stress_with_model
+from .timescale import wsola
+from .voices import VoiceRegistry
 import numpy as np
+import os
+import threading
 import time
 import soundfile as sf  # type: ignore
-from kaldiio import load_ark  # type: ignore
 
-class CustomText2Speech(Text2Speech):
-    def __init__(self, *args, **kwargs):
-        original_device = kwargs.get('device', 'cpu')
-        # Load model on CPU first to avoid potential MPS issues
-        kwargs['device'] = 'cpu'
-        super().__init__(*args, **kwargs)
+# torch, espnet and kaldiio are imported lazily: they take seconds to import
+# and are only needed once the model is actually being built.
 
-        # If the target device is MPS, ensure the model is float32
-        if 'mps' in str(original_device):
-            self.model.float()
 
-        # Move the model to the originally requested device
-        if original_device != 'cpu':
-            self.model.to(original_device)
-        
-        # Update the device attribute in the synthesizer
-        self.device = original_device
+@lru_cache(maxsize=None)
+def _custom_text2speech_class():
+    from espnet2.bin.tts_inference import Text2Speech  # type: ignore
+
+    class CustomText2Speech(Text2Speech):
+        def __init__(self, *args, **kwargs):
+            original_device = kwargs.get('device', 'cpu')
+            # Load model on CPU first to avoid potential MPS issues
+            kwargs['device'] = 'cpu'
+            # Build the architecture only, weights are memory-mapped below
+            model_file = kwargs.pop('model_file', None)
+            super().__init__(*args, model_file=None, **kwargs)
+            if model_file is not None:
+                state = _load_state_dict(model_file)
+                try:
+                    # the parameters become the mapped tensors themselves instead of copies of them
+                    self.model.load_state_dict(state, assign=True)
+                except TypeError:
+                    # torch < 2.1: copied into the parameters, only the read is faster
+                    self.model.load_state_dict(state)
+
+            # If the target device is MPS, ensure the model is float32
+            if 'mps' in str(original_device):
+                self.model.float()
+
+            # Move the model to the originally requested device
+            if original_device != 'cpu':
+                self.model.to(original_device)
+
+            # Update the device attribute in the synthesizer
+            self.device = original_device
+
+    return CustomText2Speech
+
+
+def __getattr__(name):
+    if name == "CustomText2Speech":
+        return _custom_text2speech_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _load_state_dict(model_path):
+    """Load weights memory-mapped, so pages are read on demand and shared between processes.
+
+    The sharing lasts only while the model uses these tensors as its parameters,
+    i.e. when they are loaded with `load_state_dict(..., assign=True)` and stay on CPU.
+    """
+    import torch  # type: ignore
+
+    try:
+        return torch.load(model_path, map_location="cpu", mmap=True)
+    except (TypeError, RuntimeError):
+        # torch < 2.1 or a legacy (non-zipfile) checkpoint
+        return torch.load(model_path, map_location="cpu")
+
+
+# speaking rate of the synthesis running in the current thread, read by the vocoder hook;
+# the hook also leaves the seconds it spent there, to split acoustic and vocoder time
+_rate = threading.local()
+
+
+def _install_rate_control(synthesizer):
+    """Hook speaking-rate control into the acoustic model.
+
+    Returns how `speed` is applied:
+    - `"alpha"` - the text2mel model has duration control (FastSpeech, VITS), passed via `decode_conf`.
+    - `"frames"` - joint text2mel + vocoder model (our Tacotron2 + HiFiGAN): the mel
+      frame sequence is resampled in time before vocoding, so pitch is unchanged.
+    - `None` - neither is available, callers fall back to WSOLA on the waveform.
+    """
+    from inspect import signature
+
+    tts = synthesizer.model.tts
+    generator = getattr(tts, "generator", None)
+    if not hasattr(generator, "keys"):
+        generator = None  # single generator network (e.g. VITS), not a text2mel + vocoder pair
+    text2mel = generator["text2mel"] if generator is not None and "text2mel" in generator else tts
+    has_alpha = "alpha" in signature(text2mel.inference).parameters
+    if generator is None or "vocoder" not in generator:
+        return "alpha" if has_alpha else None
+
+    import torch.nn.functional as F  # type: ignore
+
+    vocoder = generator["vocoder"]
+    inference = vocoder.inference
+
+    def rate_scaled_inference(c, *args, **kwargs):
+        start = time.perf_counter()
+        speed = getattr(_rate, "speed", 1.0)
+        if speed != 1.0:
+            # (T, odim) -> (T / speed, odim)
+            frames = max(1, int(round(c.size(0) / speed)))
+            c = F.interpolate(c.t().unsqueeze(0), size=frames, mode="linear", align_corners=True)[0].t()
+            record("time_stretch", time.perf_counter() - start)
+        vocoder_start = time.perf_counter()
+        try:
+            return inference(c, *args, **kwargs)
+        finally:
+            _rate.vocoder_seconds = time.perf_counter() - vocoder_start
+            _rate.hook_seconds = time.perf_counter() - start
+
+    # instance attribute shadows the method, the weights are untouched
+    vocoder.inference = rate_scaled_inference
+    return "alpha" if has_alpha else "frames"
+
+
+def token_spans(tokens, durations, samples: int):
+    """
+    `(token, start, end)` sample spans for `tokens` from per-token frame `durations`.
+
+    `durations` may be longer than `tokens` (the model's end-of-sentence token);
+    frames are scaled to `samples`, the length of the final waveform, so rate
+    control and vocoder hop size need no special casing.
+    """
+    durations = np.asarray(durations, dtype=np.float64)
+    total = durations.sum()
+    if not total:
+        return [(token, 0, 0) for token in tokens]
+    bounds = np.round(np.concatenate([[0.0], np.cumsum(durations)]) * (samples / total)).astype(np.int64)
+    return [(" " if token == "<space>" else token, int(bounds[i]), int(bounds[i + 1])) for i, token in enumerate(tokens)]
+
+
+class SynthesisCancelled(Exception):
+    """Raised from inside the model when the synthesis' cancel event is set."""
+
+
+# cancel event of the synthesis running in the current thread, checked by module hooks
+_cancel = threading.local()
+
+
+def _check_cancelled(module=None, args=None):
+    event = getattr(_cancel, "event", None)
+    if event is not None and event.is_set():
+        raise SynthesisCancelled()
+
+
+def _install_cancellation(synthesizer):
+    """Check the current thread's cancel event before every leaf module forward.
+
+    Tacotron2 decodes frame by frame, so a cancelled synthesis stops within one
+    decoder step instead of running to the end of the utterance.
+    """
+    for module in synthesizer.model.modules():
+        if next(module.children(), None) is None:
+            module.register_forward_pre_hook(_check_cancelled)
+
+
+def load_xvectors(speakers_path):
+    """Read speaker x-vectors, using a `.npy` cache next to `speakers_path` when it is fresh."""
+    cache_path = splitext(speakers_path)[0] + ".npy"
+    if exists(cache_path) and getmtime(cache_path) >= getmtime(speakers_path):
+        table = np.load(cache_path)
+        return {str(name): vector for name, vector in zip(table["name"], table["xvector"])}
+
+    from kaldiio import load_ark  # type: ignore
+
+    xvectors = {k: v for k, v in load_ark(speakers_path)}
+    if xvectors:
+        first = next(iter(xvectors.values()))
+        table = np.empty(
+            len(xvectors),
+            dtype=[("name", f"U{max(len(k) for k in xvectors)}"), ("xvector", first.dtype, first.shape)],
+        )
+        table["name"] = list(xvectors.keys())
+        table["xvector"] = np.stack(list(xvectors.values()))
+        try:
+            np.save(cache_path, table)
+        except OSError:
+            pass  # read-only cache folder, parse the ark next time
+    return xvectors
 
 
 class Voices(Enum):
@@ -53,52 +214,180 @@ class Stress(Enum):
 class TTS:
     """ """
 
-    def __init__(self, cache_folder=None, device="cpu") -> None:
+    def __init__(self, cache_folder=None, device="cpu", frontend_cache=None, workers=None) -> None:
         """
         Class to setup a text-to-speech engine, from download to model creation.  \n
         Downloads or uses files from `cache_folder` directory.  \n
-        By default stores in current directory."""
+        By default stores in current directory.  \n
+        `frontend_cache` - `FrontendCache` for normalised, stressed sentences. In-memory LRU by default.  \n
+        `workers` - threads used by `synthesize_long` for parallel chunks."""
         self.device = device
+        self.frontend_cache = frontend_cache if frontend_cache is not None else FrontendCache()
+        self.workers = workers or min(4, max(1, (os.cpu_count() or 2) // 2))
+        # the Stressifier NLP pipeline is not thread-safe
+        self._frontend_lock = threading.Lock()
         self.__setup_cache(cache_folder)
 
-    def tts(self, text: str, voice: str, stress: str, output_fp=BytesIO()):
+    @property
+    def sample_rate(self) -> int:
+        """Output sample rate of the model, in Hz."""
+        return self.synthesizer.fs
+
+    def synthesize(self, text: str, voice: str, stress: str, speed: float = 1.0, cancel=None):
         """
-        Run a Text-to-Speech engine and output to `output_fp` BytesIO-like object.
+        Run a Text-to-Speech engine and return the raw waveform.
         - `text` - your model input text.
         - `voice` - one of predefined voices from `Voices` enum.
         - `stress` - stress method options, predefined in `Stress` enum.
-        - `output_fp` - file-like object output. Stores in RAM by default.
+        - `speed` - speaking rate, >1 faster, <1 slower. Applied inside the model when possible.
+        - `cancel` - optional `threading.Event`; once set, synthesis stops with `SynthesisCancelled`.
+
+        Returns `(wav, sample_rate, accented_text)`, where `wav` is a mono
+        float32 NumPy array in [-1, 1]. Nothing is encoded, so callers can
+        process the audio and encode it once.
+        """
+
+        text, speed = self.validate(text, voice, stress, speed)
+
+        _cancel.event = cancel
+        try:
+            _check_cancelled()
+            text = self.frontend(text, stress)
+        finally:
+            _cancel.event = None
+        wav, _ = self._run_model(text, voice, speed, cancel)
+        return wav, self.synthesizer.fs, text
+
+    def synthesize_accented(self, text: str, voice: str, speed: float = 1.0, cancel=None):
+        """
+        Run only the acoustic model and vocoder on `text` that already went through `frontend`.
+
+        Lets callers run the text frontend of the next utterance while this one
+        is being synthesised. Arguments and result are as in `synthesize`; `voice`
+        and `speed` are expected to have been checked by `validate` already.
+        """
+        wav, _ = self._run_model(text, voice, speed, cancel)
+        return wav, self.synthesizer.fs, text
+
+    def synthesize_aligned(self, text: str, voice: str, stress: str, speed: float = 1.0, cancel=None):
+        """
+        Like `synthesize`, plus where every input token ended up in the audio.
+
+        Returns `(wav, sample_rate, accented_text, alignment)`; `alignment` is a
+        list of `(token, start_sample, end_sample)` taken from the model's
+        durations (FastSpeech-like models) or its attention (Tacotron2), so
+        punctuation can be located in the waveform without analysing it.
         """
+        text, speed = self.validate(text, voice, stress, speed)
+
+        _cancel.event = cancel
+        try:
+            _check_cancelled()
+            text = self.frontend(text, stress)
+        finally:
+            _cancel.event = None
+        wav, output = self._run_model(text, voice, speed, cancel)
+        return wav, self.synthesizer.fs, text, self._alignment(text, output, len(wav))
+
+    def _run_model(self, text: str, voice: str, speed: float, cancel=None):
+        """(float32 waveform, raw model output dict) for frontend output `text`; `voice` and `speed` already checked."""
+        _cancel.event = cancel
+        try:
+            _check_cancelled()
+
+            # synthesis
+            from torch import no_grad  # type: ignore
+
+            decode_conf = {"alpha": 1.0 / speed} if speed != 1.0 and self.rate_control == "alpha" else None
+            _rate.speed = speed if self.rate_control == "frames" else 1.0
+            _rate.vocoder_seconds = _rate.hook_seconds = 0.0
+            with no_grad():
+                start = time.perf_counter()
+                output = self.synthesizer(text, spembs=self.voices.get(voice), decode_conf=decode_conf)
+                elapsed = time.perf_counter() - start
+        finally:
+            _rate.speed = 1.0
+            _cancel.event = None
+        wav = output["wav"]
+
+        # the vocoder hook reports its own time; the rest of the model call is the acoustic model
+        record("acoustic", elapsed - _rate.hook_seconds)
+        if _rate.hook_seconds:
+            record("vocoder", _rate.vocoder_seconds)
+
+        rtf = elapsed / (len(wav) / self.synthesizer.fs)
+        print(f"RTF = {rtf:5f}")
+
+        wav = wav.view(-1).cpu().numpy()
+        if wav.dtype != np.float32:
+            wav = wav.astype(np.float32)
+        if speed != 1.0 and self.rate_control is None:
+            with span("time_stretch"):
+                wav = wsola(wav, speed, self.synthesizer.fs)
+        return wav, output
+
+    def _alignment(self, text: str, output, samples: int):
+        """(token, start, end) in samples for the tokens of `text`, from the model `output`."""
+        ids = self.synthesizer.preprocess_fn("<dummy>", dict(text=text))["text"]
+        tokens = self.synthesizer.preprocess_fn.token_id_converter.ids2tokens(ids)
+        if output.get("duration") is not None:
+            durations = output["duration"].view(-1).cpu().numpy()
+        elif output.get("att_w") is not None:
+            # attention (frames, tokens): each frame belongs to the token it attends to most
+            att_w = output["att_w"].cpu().numpy()
+            durations = np.bincount(att_w.argmax(axis=-1), minlength=att_w.shape[-1])
+        else:
+            raise ValueError("The model reports neither durations nor attention weights")
+        return token_spans(tokens, durations, samples)
 
+    def validate(self, text: str, voice: str, stress: str, speed: float = 1.0):
+        """
+        Check the request options and clean `text`, without running anything else.
+
+        Returns `(text, speed)`: the sanitised text and the speed as synthesis
+        uses it. Raises `ValueError` for an unknown voice or stress option, a
+        non-positive speed, or text with nothing speakable in it.
+        """
+        self._check_stress(stress)
+        speed = self._check_voice_and_speed(voice, speed)
+        return self.sanitizer.clean(text), speed
+
+    def _check_stress(self, stress: str) -> None:
         if stress not in [option.value for option in Stress]:
             raise ValueError(
                 f"Invalid value for stress option selected! Please use one of the following values: {', '.join([option.value for option in Stress])}."
             )
 
-        # Визначаємо чи використовувати stress модель
-        use_stress_model: bool = (stress == Stress.Model.value)
-        
-        if voice not in [option.value for option in Voices]:
-            if voice not in self.xvectors.keys():
-                raise ValueError(
-                    f"Invalid value for voice selected! Please use one of the following values: {', '.join([option.value for option in Voices])}."
-                )
+    def _check_voice_and_speed(self, voice: str, speed: float) -> float:
+        if voice not in self.voices:
+            raise ValueError(
+                f"Invalid value for voice selected! Please use one of the following values: {', '.join(self.voices.names())}."
+            )
 
-        text = preprocess_text(text)
-        text = sentence_to_stress(text, stress_with_model if use_stress_model else stress_dict)
+        if not speed or speed <= 0:
+            raise ValueError(f"Invalid value for speed: {speed}. It must be a positive number.")
+        return 1.0 if abs(speed - 1.0) < 1e-3 else speed
 
-        # synthesis
-        with no_grad():
-            start = time.time()
-            wav = self.synthesizer(text, spembs=self.xvectors[voice][0])["wav"]
+    def tts(self, text: str, voice: str, stress: str, output_fp=None, speed: float = 1.0):
+        """
+        Run a Text-to-Speech engine and output to `output_fp` BytesIO-like object.
+        - `text` - your model input text.
+        - `voice` - one of predefined voices from `Voices` enum.
+        - `stress` - stress method options, predefined in `Stress` enum.
+        - `output_fp` - file-like object output. Stores in RAM by default.
+        - `speed` - speaking rate, >1 faster, <1 slower.
 
-        rtf = (time.time() - start) / (len(wav) / self.synthesizer.fs)
-        print(f"RTF = {rtf:5f}")
+        Encodes 16-bit WAV; use `synthesize` to get the float waveform instead.
+        """
+        if output_fp is None:
+            output_fp = BytesIO()
+
+        wav, sample_rate, text = self.synthesize(text, voice, stress, speed)
 
         sf.write(
             output_fp,
-            wav.view(-1).cpu().numpy(),
-            self.synthesizer.fs,
+            wav,
+            sample_rate,
             "PCM_16",
             format="wav",
         )
@@ -107,6 +396,95 @@ class TTS:
 
         return output_fp, text
 
+    def synthesize_long(
+        self, text: str, voice: str, stress: str, speed: float = 1.0, max_chars: int = MAX_CHUNK_CHARS, cancel=None
+    ):
+        """
+        Synthesise arbitrarily long `text` in chunks of at most `max_chars`, in parallel.
+
+        Chunks are synthesised on `workers` threads and joined with short
+        crossfades and fixed pauses at sentence and clause boundaries. A chunk
+        that fails is retried on its own, then split in half, without touching
+        the others. Returns `(wav, sample_rate, accented_text)` like `synthesize`.
+        """
+        return self._synthesize_long(text, voice, stress, speed, max_chars, cancel, aligned=False)
+
+    def synthesize_long_aligned(
+        self, text: str, voice: str, stress: str, speed: float = 1.0, max_chars: int = MAX_CHUNK_CHARS, cancel=None
+    ):
+        """
+        `synthesize_long` plus the alignment of `synthesize_aligned`.
+
+        Every chunk is aligned on its own, so attention stays reliable on long
+        texts; the spans are shifted to where the trimmed chunk lands in the
+        joined audio. Returns `(wav, sample_rate, accented_text, alignment)`.
+        """
+        return self._synthesize_long(text, voice, stress, speed, max_chars, cancel, aligned=True)
+
+    def _synthesize_long(self, text, voice, stress, speed, max_chars, cancel, aligned: bool):
+        chunks = split_chunks(self.sanitizer.clean(text), max_chars)
+        if len(chunks) <= 1:
+            return (self.synthesize_aligned if aligned else self.synthesize)(text, voice, stress, speed, cancel)
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(chunks))) as pool:
+            results = list(
+                pool.map(lambda chunk: self.synthesize_chunk(chunk.text, voice, stress, speed, cancel, aligned=aligned), chunks)
+            )
+        return self._join_results(results, [chunk.pause for chunk in chunks], aligned)
+
+    @staticmethod
+    def _join_results(results, pauses, aligned: bool):
+        """Join chunk results of `synthesize` (or `synthesize_aligned`) with `join_chunks`."""
+        sample_rate = results[0][1]
+        bounds = [trim_bounds(result[0], sample_rate) for result in results]
+        waves = [result[0][start:stop] for result, (start, stop) in zip(results, bounds)]
+        wav = join_chunks(waves, pauses, sample_rate)
+        text = " ".join(result[2] for result in results)
+        if not aligned:
+            return wav, sample_rate, text
+        offsets = chunk_offsets([len(wave) for wave in waves], pauses, sample_rate)
+        return wav, sample_rate, text, join_alignments([result[3] for result in results], bounds, offsets)
+
+    def synthesize_chunk(
+        self, text: str, voice: str, stress: str, speed: float, cancel=None, retries: int = 1, aligned: bool = False
+    ):
+        """
+        `synthesize` one chunk of a long text, retrying it `retries` times and then
+        splitting it in half, so one bad word doesn't fail the whole text.
+        With `aligned`, `synthesize_aligned` instead.
+        """
+        error = None
+        for attempt in range(retries + 1):
+            try:
+                return (self.synthesize_aligned if aligned else self.synthesize)(text, voice, stress, speed, cancel)
+            except (ValueError, SynthesisCancelled):
+                raise  # invalid voice, stress or speed, or cancelled: retrying won't help
+            except Exception as e:
+                error = e
+                print(f"Chunk synthesis failed (attempt {attempt + 1}): {e}")
+        words = text.split()
+        if len(words) < 2:
+            raise error
+        # isolate the failing part: synthesise both halves separately
+        middle = len(words) // 2
+        halves = [
+            self.synthesize_chunk(" ".join(part), voice, stress, speed, cancel, retries=0, aligned=aligned)
+            for part in (words[:middle], words[middle:])
+        ]
+        return self._join_results(halves, [0.0], aligned)
+
+    def frontend(self, text: str, stress: str) -> str:
+        """Normalise and stress `text`, skipping sentences already in `frontend_cache`.
+
+        The result only contains characters from the model's token inventory.
+        """
+        stress_function = stress_with_model if stress == Stress.Model.value else stress_dict
+        with self._frontend_lock:
+            text = run_frontend(text, stress, stress_function, self.frontend_cache)
+        return self.sanitizer.filter_tokens(text)
+
     def __setup_cache(self, cache_folder=None):
         """Downloads models and stores them into `cache_folder`. By default stores in current directory."""
         release_number = "v6.0.0"
@@ -132,10 +510,22 @@ class TTS:
         self.__download(feat_stats_link, feat_stats_path)
         print("downloaded.")
 
-        self.synthesizer = CustomText2Speech(
+        self.synthesizer = _custom_text2speech_class()(
             train_config=config_path, model_file=model_path, device=self.device
         )
-        self.xvectors = {k: v for k, v in load_ark(speakers_path)}
+        self.sanitizer = TextSanitizer.from_config(config_path)
+        self.rate_control = _install_rate_control(self.synthesizer)
+        _install_cancellation(self.synthesizer)
+        self.cache_folder = cache_folder
+        # changes when the release or the downloaded model files change; keys pre-rendered audio
+        self.model_fingerprint = ":".join(
+            [release_number] + [f"{os.path.getsize(path)}-{int(getmtime(path))}" for path in (model_path, config_path)]
+        )
+        self.xvectors = load_xvectors(speakers_path)
+        # x-vectors stay on the synthesis device; custom voices persist next to the model
+        self.voices = VoiceRegistry(
+            self.xvectors, device=self.synthesizer.device, store_path=join(cache_folder, "custom_voices.npy")
+        )
 
     def __download(self, url, file_name):
         """Downloads file from `url` into local `file_name` file."""
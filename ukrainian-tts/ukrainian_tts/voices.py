@@ -0,0 +1,209 @@
+"""Speaker x-vector registry.
+
+All x-vectors live in one contiguous float32 tensor on the synthesis device,
+so a voice lookup is a row view and ESPnet does not convert or copy the
+embedding on every call. Custom voices (registered from a reference x-vector
+or blended from existing ones) are persisted to a small `.npy` store and
+reloaded at startup.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+
+_NAME = re.compile(r"^[A-Za-z0-9_\-]{1,64}$")
+
+
+def read_xvector(source, key: Optional[str] = None, format: Optional[str] = None) -> np.ndarray:
+    """Read one x-vector from a `.npy`, `.npz` or Kaldi `.ark` file.
+
+    - `source` - path or binary file-like object.
+    - `key` - entry to use in multi-entry files; the first one by default.
+    - `format` - "npy", "npz" or "ark"; guessed from the file name if omitted.
+    """
+    name = source if isinstance(source, str) else getattr(source, "name", "") or ""
+    format = (format or os.path.splitext(name)[1].lstrip(".") or "npy").lower()
+    if format == "ark":
+        from kaldiio import load_ark  # type: ignore
+
+        entries = dict(load_ark(source))
+    elif format == "npz":
+        with np.load(source) as data:
+            entries = {name: data[name] for name in data.files}
+    elif format == "npy":
+        entries = {"": np.load(source)}
+    else:
+        raise ValueError(f"Unsupported x-vector format '{format}', use npy, npz or ark")
+    if not entries:
+        raise ValueError("No x-vectors in the file")
+    if key is not None and key not in entries:
+        raise ValueError(f"No x-vector '{key}' in the file")
+    return _as_vector(entries[key] if key is not None else next(iter(entries.values())))
+
+
+def _as_vector(xvector) -> np.ndarray:
+    xvector = np.asarray(xvector, dtype=np.float32)
+    if xvector.ndim == 2:
+        # ESPnet stores (1, dim) per speaker; several rows are utterance x-vectors
+        xvector = xvector.mean(axis=0)
+    if xvector.ndim != 1 or not np.all(np.isfinite(xvector)):
+        raise ValueError(f"Expected a finite 1-D x-vector, got shape {xvector.shape}")
+    return xvector
+
+
+class VoiceRegistry:
+    """Name -> x-vector table kept on `device`.
+
+    - `xvectors` - built-in voices, e.g. from `spk_xvector.ark`.
+    - `store_path` - `.npy` file for custom voices; None keeps them in memory only.
+    """
+
+    def __init__(self, xvectors: Mapping[str, np.ndarray], device="cpu", store_path: Optional[str] = None) -> None:
+        self.device = device
+        self.store_path = store_path
+        self._lock = threading.Lock()
+        self._names: List[str] = []
+        self._custom: Dict[str, np.ndarray] = {}
+        vectors = [_as_vector(v) for v in xvectors.values()]
+        self._names = list(xvectors.keys())
+        self.builtin = frozenset(self._names)
+        self._table = np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        for name, vector in self._load_store().items():
+            try:
+                self._append(name, vector)
+            except ValueError as e:
+                # e.g. stored for another model: one stale voice must not stop the TTS from loading
+                print(f"Skipping custom voice '{name}' from {self.store_path}: {e}")
+                continue
+            self._custom[name] = vector
+        self._tensor = self._to_device(self._table)
+
+    def _to_device(self, table: np.ndarray):
+        import torch  # type: ignore
+
+        return torch.from_numpy(np.ascontiguousarray(table, dtype=np.float32)).to(self.device)
+
+    def _append(self, name: str, vector: np.ndarray) -> None:
+        if self._table.size and vector.shape[0] != self._table.shape[1]:
+            raise ValueError(f"x-vector has {vector.shape[0]} dims, voices use {self._table.shape[1]}")
+        if name in self._names:
+            # a new table, never in place: tensors handed out by `get` may share the old one's memory
+            table = self._table.copy()
+            table[self._names.index(name)] = vector
+            self._table = table
+        else:
+            self._table = np.vstack([self._table, vector[None]]) if self._table.size else vector[None].copy()
+            self._names.append(name)
+
+    @property
+    def dim(self) -> int:
+        return int(self._table.shape[1]) if self._table.size else 0
+
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def custom(self) -> List[str]:
+        return list(self._custom)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def get(self, name: str):
+        """Device tensor of shape (dim,) for `name`; a view, no copy."""
+        with self._lock:
+            return self._tensor[self._names.index(name)]
+
+    def vector(self, name: str) -> np.ndarray:
+        """Host copy of the x-vector for `name`."""
+        with self._lock:
+            return self._table[self._names.index(name)].copy()
+
+    def register(self, name: str, xvector, persist: bool = True) -> None:
+        """Add or replace the custom voice `name`. Built-in voices cannot be replaced."""
+        if not _NAME.match(name):
+            raise ValueError("Voice name must be 1-64 characters of latin letters, digits, '_' or '-'")
+        if name in self.builtin:
+            raise ValueError(f"'{name}' is a built-in voice")
+        vector = _as_vector(xvector)
+        with self._lock:
+            self._append(name, vector)
+            self._custom[name] = vector
+            # the whole table is tiny (hundreds x 512 floats): re-upload instead of resizing in place
+            self._tensor = self._to_device(self._table)
+        if persist:
+            self.save()
+
+    def blend(self, name: str, weights: Mapping[str, float], persist: bool = True) -> np.ndarray:
+        """Register `name` as the weighted average of existing voices.
+
+        The result is rescaled to the weighted mean norm of its components, so
+        blends stay in the range the model was trained on.
+        """
+        if not weights:
+            raise ValueError("At least one voice is required to blend")
+        unknown = [voice for voice in weights if voice not in self]
+        if unknown:
+            raise ValueError(f"Unknown voices: {', '.join(unknown)}")
+        w = np.asarray([float(weights[voice]) for voice in weights], dtype=np.float32)
+        if np.any(w < 0) or w.sum() <= 0:
+            raise ValueError("Blend weights must be non-negative and not all zero")
+        w /= w.sum()
+        vectors = np.stack([self.vector(voice) for voice in weights])
+        blended = w @ vectors
+        norm = float(np.linalg.norm(blended))
+        if norm > 0:
+            blended *= float(w @ np.linalg.norm(vectors, axis=1)) / norm
+        self.register(name, blended, persist=persist)
+        return blended
+
+    def remove(self, name: str, persist: bool = True) -> None:
+        if name not in self._custom:
+            raise ValueError(f"'{name}' is not a custom voice")
+        with self._lock:
+            index = self._names.index(name)
+            del self._names[index]
+            del self._custom[name]
+            self._table = np.delete(self._table, index, axis=0)
+            self._tensor = self._to_device(self._table)
+        if persist:
+            self.save()
+
+    def _load_store(self) -> Dict[str, np.ndarray]:
+        if not self.store_path or not os.path.exists(self.store_path):
+            return {}
+        try:
+            table = np.load(self.store_path)
+            entries = zip(table["name"], table["xvector"])
+        except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+            print(f"Ignoring custom voice store {self.store_path}: {e}")
+            return {}
+        voices = {}
+        for name, vector in entries:
+            try:
+                voices[str(name)] = _as_vector(vector)
+            except ValueError as e:
+                print(f"Skipping custom voice '{name}' from {self.store_path}: {e}")
+        return voices
+
+    def save(self) -> None:
+        """Write custom voices to `store_path` atomically."""
+        if not self.store_path:
+            return
+        with self._lock:
+            custom = dict(self._custom)
+        dim = self.dim
+        table = np.empty(len(custom), dtype=[("name", "U64"), ("xvector", np.float32, (dim,))])
+        table["name"] = list(custom.keys())
+        if custom:
+            table["xvector"] = np.stack(list(custom.values()))
+        directory = os.path.dirname(os.path.abspath(self.store_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.store_path}.tmp.npy"
+        np.save(tmp_path, table)
+        os.replace(tmp_path, self.store_path)
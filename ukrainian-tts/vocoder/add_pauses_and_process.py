@@ -1,90 +1,143 @@
 #!/usr/bin/env python3
-"""Insert longer pauses at commas and sentence ends and run SoX-based processing.
+"""Insert longer pauses at commas and sentence ends and apply the SoX-style effect chain.
 
 Usage:
   python add_pauses_and_process.py \
     --in /tmp/atlas_story_uk_master_very_slow_cleaned_pitch_plus2_sox.wav \
     --out /tmp/atlas_story_final_deep_slow.wav
 
-This script requires: soundfile, numpy, scipy, sox (CLI) available.
+  # exact pauses: synthesise the text and use the model's alignment
+  python add_pauses_and_process.py --text "$(cat story.txt)" --voice dmytro --out /tmp/story.wav
+
+  # or an alignment saved next to the input ([[token, start, end], ...] in samples)
+  python add_pauses_and_process.py --in story.wav --alignment story.align.json --out /tmp/story.wav
+
+  # many files at once on a process pool
+  python add_pauses_and_process.py --batch /tmp/stories/ 'takes/*.wav' --out-dir /tmp/mastered --style rough
+
+This script requires: soundfile, numpy, scipy; the sox CLI only with --engine sox.
 It will:
- - detect low-amplitude regions to locate natural pauses (optional)
- - add fixed extra silence at commas and sentence ends by simple rule-based mapping
- - write an intermediate WAV
- - call sox to apply tempo, pitch, bass/treble and overdrive
+ - add fixed extra silence at commas and sentence ends: at the positions the
+   TTS alignment gives when the text is known, otherwise after low-amplitude
+   regions, mapped to punctuation by their length
+ - apply tempo, pitch, overdrive, bass/treble in-process (`ukrainian_tts.soxchain`),
+   or write an intermediate WAV and call sox with --engine sox
 """
 
 import argparse
+import json
 import os
 import subprocess
+import sys
 import tempfile
+import time
 import hashlib
 import soundfile as sf
 import numpy as np
-from scipy.signal import resample_poly
 
+# the package lives one level up when the script runs from a checkout
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ukrainian_tts.resampling import resample  # noqa: E402
+from ukrainian_tts.soxchain import SoxChain, process_batch  # noqa: E402
 
-def add_silence_at_boundaries(y, sr, comma_extra=0.25, sentence_extra=0.6):
-    # This is a heuristic: find zero-crossings near low-energy regions isn't reliable without alignment.
-    # We'll instead insert silences after approximate positions by re-synthesizing the text timing is hard.
-    # Simpler approach: split on longer pauses (silence segments) and after each silence, append extra silence
-    # based on nearest punctuation mapping. But we don't have text-timestamp mapping here.
-    # So fallback: increase all silences shorter than 0.5s by comma_extra, and silences between 0.5s and 1.5s by sentence_extra.
-
-    # compute frame energy via short-time RMS
-    frame_len = int(sr * 0.02)  # 20ms
+SENTENCE_MARKS = frozenset('.!?')
+CLAUSE_MARKS = frozenset(',:;')
+
+
+def silent_segments(y, sr, frame_ms=20.0):
+    """(starts, ends) in samples of runs of quiet 20 ms frames (10 ms hop)."""
+    frame_len = int(sr * frame_ms / 1000)
     hop = int(frame_len // 2)
     if hop <= 0:
         hop = 256
-    frames = []
-    for i in range(0, max(1, len(y) - frame_len + 1), hop):
-        f = y[i:i+frame_len]
-        frames.append(np.sqrt(np.mean(f*f)))
-    frames = np.array(frames)
+    frame_len = max(frame_len, 1)
+    if len(y) < frame_len:
+        frames = np.array([np.sqrt(np.mean(y * y))]) if len(y) else np.zeros(1)
+    else:
+        # strided view of every hop-th frame; einsum sums the squares without a copy
+        windows = np.lib.stride_tricks.sliding_window_view(y, frame_len)[::hop]
+        frames = np.sqrt(np.einsum('ij,ij->i', windows, windows) / frame_len)
     # threshold for silence
     thresh = np.percentile(frames, 10) * 1.2
-    # mark silent frames
-    silent = frames < thresh
-    # merge contiguous silent frames into segments
-    segs = []  # (start_sample, end_sample)
-    i = 0
-    n = len(frames)
-    while i < n:
-        if silent[i]:
-            j = i
-            while j < n and silent[j]:
-                j += 1
-            # convert frame idx to samples
-            start = i*hop
-            end = min(len(y), j*hop + frame_len)
-            segs.append((start, end))
-            i = j
-        else:
-            i += 1
-
-    # build new signal with expanded silences
-    out = []
-    last = 0
-    for (s,e) in segs:
-        # append non-silent chunk before segment
-        if s > last:
-            out.append(y[last:s])
-        seg_dur = (e - s) / sr
-        extra = 0.0
-        if seg_dur < 0.5:
-            extra = comma_extra
-        elif seg_dur < 1.5:
-            extra = sentence_extra
-        # append original silent chunk
-        out.append(y[s:e])
-        if extra > 0:
-            out.append(np.zeros(int(round(extra * sr)), dtype=y.dtype))
-        last = e
-    if last < len(y):
-        out.append(y[last:])
-    if not out:
+    edges = np.diff(np.concatenate([[0], (frames < thresh).astype(np.int8), [0]]))
+    first = np.flatnonzero(edges == 1)
+    stop = np.flatnonzero(edges == -1)
+    starts = first * hop
+    ends = np.minimum(len(y), stop * hop + frame_len)
+    # a segment's last frame can overlap the next segment's first one
+    if len(starts) > 1:
+        starts[1:] = np.maximum(starts[1:], ends[:-1])
+    return starts, ends
+
+
+def insert_silence(y, positions, lengths):
+    """Copy of `y` with `lengths[k]` zeros inserted before sample `positions[k]` (sorted)."""
+    positions = np.asarray(positions, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    keep = lengths > 0
+    positions, lengths = positions[keep], lengths[keep]
+    out = np.zeros(len(y) + int(lengths.sum()), dtype=y.dtype)
+    # samples between two insertion points move by all the silence inserted before them
+    bounds = np.concatenate([[0], np.clip(positions, 0, len(y)), [len(y)]])
+    shifts = np.concatenate([[0], np.cumsum(lengths)])
+    for k in range(len(bounds) - 1):
+        a, b = bounds[k], bounds[k + 1]
+        out[a + shifts[k]:b + shifts[k]] = y[a:b]
+    return out
+
+
+def add_silence_at_boundaries(y, sr, comma_extra=0.25, sentence_extra=0.6):
+    """Lengthen the pauses already in `y`, guessing punctuation from their length.
+
+    Without text timing: silences shorter than 0.5 s get `comma_extra` seconds
+    more, silences between 0.5 s and 1.5 s get `sentence_extra`. When the text
+    is known, `add_silence_at_punctuation` puts the pauses where the
+    punctuation actually is.
+    """
+    starts, ends = silent_segments(y, sr)
+    if not len(starts):
         return y
-    return np.concatenate(out)
+    seg_dur = (ends - starts) / sr
+    extra = np.where(seg_dur < 0.5, comma_extra, np.where(seg_dur < 1.5, sentence_extra, 0.0))
+    return insert_silence(y, ends, np.round(extra * sr).astype(np.int64))
+
+
+def punctuation_pauses(alignment, sr, comma_extra=0.25, sentence_extra=0.6):
+    """(positions, lengths) in samples of the pauses to add after punctuation in `alignment`.
+
+    `alignment` is `(token, start, end)` per input token, as returned by
+    `TTS.synthesize_long_aligned`; a run of marks such as `?!` gets one pause, the
+    longest of them, at the end of the run.
+    """
+    positions, lengths = [], []
+    in_run = False
+    for token, _, end in alignment:
+        extra = sentence_extra if token in SENTENCE_MARKS else comma_extra if token in CLAUSE_MARKS else None
+        if extra is None:
+            in_run = False
+            continue
+        samples = int(round(extra * sr))
+        if in_run:
+            positions[-1] = end
+            lengths[-1] = max(lengths[-1], samples)
+        else:
+            positions.append(end)
+            lengths.append(samples)
+        in_run = True
+    return positions, lengths
+
+
+def add_silence_at_punctuation(y, sr, alignment, comma_extra=0.25, sentence_extra=0.6):
+    """Insert pauses right after commas and sentence ends, located by the TTS alignment."""
+    positions, lengths = punctuation_pauses(alignment, sr, comma_extra, sentence_extra)
+    return insert_silence(y, positions, lengths)
+
+
+def load_alignment(path, scale=1.0):
+    """Alignment JSON (`[[token, start, end], ...]` in samples), rescaled by `scale`."""
+    with open(path, encoding='utf-8') as f:
+        spans = json.load(f)
+    return [(token, int(round(start * scale)), int(round(end * scale))) for token, start, end in spans]
 
 
 def sox_process(inpath, outpath, tempo=0.75, pitch_semitones=-4, overdrive_db=6, bass_gain=8, treble_gain=-4, compand=None):
@@ -110,17 +163,64 @@ def sox_process(inpath, outpath, tempo=0.75, pitch_semitones=-4, overdrive_db=6,
 
 
 def md5_and_duration(path):
-    import soundfile as sf, hashlib
-    y, sr = sf.read(path, dtype='float32')
-    dur = len(y)/sr
-    md5 = hashlib.md5(open(path,'rb').read()).hexdigest()
-    return md5, round(dur, 2), sr
+    """md5 of the file and its duration; the audio is not decoded, only the header is read."""
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            md5.update(chunk)
+    info = sf.info(path)
+    return md5.hexdigest(), round(info.frames / info.samplerate, 2), info.samplerate
+
+
+STYLES = {
+    'neutral': dict(tempo=0.78, pitch=-3, overdrive=6, bass=6, treble=-3),
+    'rough': dict(tempo=0.75, pitch=-4, overdrive=9, bass=8, treble=-4),
+    'very_rough': dict(tempo=0.72, pitch=-5, overdrive=12, bass=10, treble=-6),
+}
+
+
+def to_master_rate(y, sr, alignment=None):
+    """Resample to 44.1 kHz; `alignment` sample positions are rescaled with it."""
+    if sr == 44100:
+        return y, sr, alignment
+    print('Resampling from', sr, 'to 44100')
+    y = resample(y, sr, 44100)
+    if alignment is not None:
+        alignment = [(token, start * 44100 // sr, end * 44100 // sr) for token, start, end in alignment]
+    return y, 44100, alignment
+
+
+def prepare(y, sr):
+    """Batch pre-processing: 44.1 kHz and expanded pauses (no alignment available)."""
+    y, sr, _ = to_master_rate(y, sr)
+    return add_silence_at_boundaries(y, sr, comma_extra=0.25, sentence_extra=0.6), sr
+
+
+def batch_inputs(patterns):
+    """WAV files from directories and glob patterns, sorted, without duplicates."""
+    import glob
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            found += glob.glob(os.path.join(pattern, '*.wav'))
+        else:
+            found += glob.glob(pattern)
+    return sorted(set(found))
 
 
 def main():
     p = argparse.ArgumentParser()
-    p.add_argument('--in', dest='infile', required=True)
-    p.add_argument('--out', dest='outfile', required=True)
+    p.add_argument('--in', dest='infile', help='Input WAV (omit with --text or --batch)')
+    p.add_argument('--text', help='Synthesise this text and place pauses from the model alignment')
+    p.add_argument('--voice', default='dmytro', help='Voice for --text')
+    p.add_argument('--stress', default='dictionary', choices=['dictionary', 'model'], help='Stress for --text')
+    p.add_argument('--alignment', help='Alignment JSON for --in: [[token, start_sample, end_sample], ...]')
+    p.add_argument('--out', dest='outfile', help='Output WAV (single file)')
+    p.add_argument('--batch', nargs='+', help='Directories or glob patterns of WAVs to process in parallel')
+    p.add_argument('--out-dir', help='Output directory for --batch')
+    p.add_argument('--workers', type=int, help='Processes for --batch (default: CPU count)')
+    p.add_argument('--engine', choices=['native', 'sox'], default='native',
+                   help='native: in-process effect chain; sox: the sox binary (for comparison)')
     p.add_argument('--tmp', dest='tmpdir')
     p.add_argument('--style', choices=['neutral','rough','very_rough'], help='Processing style preset')
     p.add_argument('--tempo', type=float, help='Manual tempo override (e.g. 0.75)')
@@ -130,71 +230,76 @@ def main():
     p.add_argument('--treble', type=float, help='Manual treble gain')
     args = p.parse_args()
 
-    tmpdir = args.tmpdir or tempfile.mkdtemp(prefix='atlas_pauses_')
-    os.makedirs(tmpdir, exist_ok=True)
+    # choose preset parameters by style, or numeric overrides via CLI
+    params = STYLES.get(args.style) or dict(
+        tempo=args.tempo if args.tempo else 0.75,
+        pitch=args.pitch if args.pitch is not None else -4,
+        overdrive=args.overdrive if args.overdrive is not None else 8,
+        bass=args.bass if args.bass is not None else 8,
+        treble=args.treble if args.treble is not None else -4,
+    )
+    compand = None
+    chain = SoxChain(tempo=params['tempo'], pitch_semitones=params['pitch'], overdrive_db=params['overdrive'],
+                     bass_gain=params['bass'], treble_gain=params['treble'], compand=compand)
 
-    print('Loading', args.infile)
-    y, sr = sf.read(args.infile, dtype='float32')
-    if y.ndim > 1:
-        y = y.mean(axis=1)
+    if args.batch:
+        if not args.out_dir:
+            p.error('--batch needs --out-dir')
+        os.makedirs(args.out_dir, exist_ok=True)
+        inputs = batch_inputs(args.batch)
+        jobs = [(path, os.path.join(args.out_dir, os.path.basename(path))) for path in inputs]
+        print('Processing', len(jobs), 'files (style=', args.style, ')...')
+        start = time.perf_counter()
+        done = process_batch(chain, jobs, workers=args.workers, prepare=prepare)
+        elapsed = time.perf_counter() - start
+        print('Wrote', len(done), 'files to', args.out_dir, f'in {elapsed:.1f}s')
+        return
+
+    if not args.outfile:
+        p.error('--out is required')
+    if not args.infile and not args.text:
+        p.error('one of --in, --text or --batch is required')
+
+    alignment = None
+    if args.text:
+        from ukrainian_tts.tts import TTS
+        print('Synthesising', len(args.text), 'characters')
+        y, sr, _, alignment = TTS(device='cpu').synthesize_long_aligned(args.text, args.voice, args.stress)
+    else:
+        print('Loading', args.infile)
+        y, sr = sf.read(args.infile, dtype='float32')
+        if y.ndim > 1:
+            y = y.mean(axis=1)
+        if args.alignment:
+            alignment = load_alignment(args.alignment)
 
     print('Original sr=', sr, 'len=', len(y))
     # ensure 44100
-    if sr != 44100:
-        print('Resampling from', sr, 'to 44100')
-        from math import gcd
-        up = 44100
-        down = sr
-        g = gcd(up, down)
-        up //= g
-        down //= g
-        y = resample_poly(y, up, down)
-        sr = 44100
+    y, sr, alignment = to_master_rate(y, sr, alignment)
 
     print('Adding pause expansions...')
-    y2 = add_silence_at_boundaries(y, sr, comma_extra=0.25, sentence_extra=0.6)
-    inter = os.path.join(tmpdir, 'with_pauses.wav')
-    sf.write(inter, y2, sr, subtype='PCM_24')
-    print('Wrote intermediate with pauses to', inter)
-
-    # choose preset parameters by style
-    style = getattr(args, 'style', 'neutral')
-    if style == 'neutral':
-        tempo = 0.78
-        pitch = -3
-        overdrive = 6
-        bass = 6
-        treble = -3
-        compand = None
-    elif style == 'rough':
-        tempo = 0.75
-        pitch = -4
-        overdrive = 9
-        bass = 8
-        treble = -4
-        compand = None
-    elif style == 'very_rough':
-        tempo = 0.72
-        pitch = -5
-        overdrive = 12
-        bass = 10
-        treble = -6
-        compand = None
+    if alignment is not None:
+        y2 = add_silence_at_punctuation(y, sr, alignment, comma_extra=0.25, sentence_extra=0.6)
+    else:
+        y2 = add_silence_at_boundaries(y, sr, comma_extra=0.25, sentence_extra=0.6)
+
+    if args.engine == 'sox':
+        tmpdir = args.tmpdir or tempfile.mkdtemp(prefix='atlas_pauses_')
+        os.makedirs(tmpdir, exist_ok=True)
+        inter = os.path.join(tmpdir, 'with_pauses.wav')
+        sf.write(inter, y2, sr, subtype='PCM_24')
+        print('Wrote intermediate with pauses to', inter)
+        print('Running SoX processing (style=', args.style, ')...')
+        sox_process(inter, args.outfile, tempo=params['tempo'], pitch_semitones=params['pitch'],
+                    overdrive_db=params['overdrive'], bass_gain=params['bass'], treble_gain=params['treble'],
+                    compand=compand)
+        md5_i, dur_i, _ = md5_and_duration(inter)
+        print('Intermediate:', inter, 'md5=', md5_i, 'dur=', dur_i)
     else:
-        # allow numeric override via CLI
-        tempo = args.tempo if args.tempo else 0.75
-        pitch = args.pitch if args.pitch is not None else -4
-        overdrive = args.overdrive if args.overdrive is not None else 8
-        bass = args.bass if args.bass is not None else 8
-        treble = args.treble if args.treble is not None else -4
-        compand = None
-
-    print('Running SoX processing (style=', style, ')...')
-    sox_process(inter, args.outfile, tempo=tempo, pitch_semitones=pitch, overdrive_db=overdrive, bass_gain=bass, treble_gain=treble, compand=compand)
-
-    md5_i, dur_i, _ = md5_and_duration(inter)
+        print('Running effect chain (style=', args.style, ')...')
+        sf.write(args.outfile, chain.apply(y2, sr), sr, subtype='PCM_24')
+
     md5_o, dur_o, sr_o = md5_and_duration(args.outfile)
-    print('Intermediate:', inter, 'md5=', md5_i, 'dur=', dur_i)
     print('Final:', args.outfile, 'md5=', md5_o, 'dur=', dur_o, 'sr=', sr_o)
 
 
@@ -0,0 +1,110 @@
+"""Content-addressed cache for the intermediate files of the vocoder pipeline.
+
+Every stage output (synthesised WAV, mel, vocoder WAV, mastered WAV) is stored
+under a key derived from the stage name, its parameters and the keys or
+content hashes of its inputs:
+
+    key = sha256(stage, params, input keys)
+
+A stage whose key already has an artifact is not run again, so changing the
+vocoder checkpoint re-runs only the vocoder and the mastering, and changing
+only the mastering re-uses the vocoder output. Artifacts are written to a
+temp file and renamed into place, so an interrupted run never leaves a
+half-written artifact behind. The manifest of a run lists every stage with
+its key, inputs and whether it was reused or recomputed.
+
+Layout: `<root>/objects/<key[:2]>/<key><ext>` plus `<key>.json` with the
+stage, params and inputs that produced it.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser('~'), '.cache', 'atlas', 'supervoice')
+_CHUNK = 1 << 20
+
+
+def file_hash(path: str) -> str:
+    """sha256 of a file's content, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stage_key(stage: str, params: Dict, inputs: Sequence[str]) -> str:
+    blob = json.dumps({'stage': stage, 'params': params, 'inputs': list(inputs)}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class ArtifactCache:
+    """Stage outputs keyed by parameters and inputs; see the module docstring."""
+
+    def __init__(self, root: str = DEFAULT_ROOT, rebuild: bool = False) -> None:
+        self.root = root
+        self.rebuild = rebuild
+        self.entries: List[Dict] = []
+        # content hashes of external files, by (path, size, mtime)
+        self._hashes: Dict[tuple, str] = {}
+
+    def source(self, path: str) -> str:
+        """Key of an external input file (source WAV, checkpoint): its content hash."""
+        stat = os.stat(path)
+        marker = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if marker not in self._hashes:
+            self._hashes[marker] = file_hash(path)
+        return self._hashes[marker]
+
+    def path(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, 'objects', key[:2], key + ext)
+
+    def stage(self, name: str, params: Dict, inputs: Sequence[str], ext: str,
+              compute: Callable[[str], None]) -> Tuple[str, str]:
+        """Return `(path, key)` of the artifact, running `compute(tmp_path)` only if it is missing.
+
+        `compute` writes the artifact to the path it is given.
+        """
+        key = stage_key(name, params, inputs)
+        path = self.path(key, ext)
+        reused = os.path.exists(path) and not self.rebuild
+        started = time.perf_counter()
+        if not reused:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.tmp{ext}'
+            try:
+                compute(tmp)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            with open(self.path(key, '.json'), 'w', encoding='utf-8') as f:
+                json.dump({'stage': name, 'params': params, 'inputs': list(inputs)}, f, ensure_ascii=False, indent=2)
+        self.entries.append({
+            'stage': name,
+            'key': key,
+            'status': 'reused' if reused else 'recomputed',
+            'seconds': round(time.perf_counter() - started, 3),
+            'params': params,
+            'inputs': list(inputs),
+            'path': path,
+        })
+        print(f"[{name}] {'reused' if reused else 'recomputed'} {key[:12]} ({self.entries[-1]['seconds']}s)")
+        return path, key
+
+    def manifest(self) -> Dict:
+        return {
+            'root': self.root,
+            'reused': [e['stage'] for e in self.entries if e['status'] == 'reused'],
+            'recomputed': [e['stage'] for e in self.entries if e['status'] == 'recomputed'],
+            'stages': self.entries,
+        }
+
+    def write_manifest(self, path: str, extra: Optional[Dict] = None) -> Dict:
+        manifest = dict(self.manifest(), **(extra or {}))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return manifest
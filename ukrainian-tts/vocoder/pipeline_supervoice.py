@@ -12,8 +12,13 @@ Behavior:
   hop_length 256) and saves `mel.npy`.
 - Invokes the vocoder wrapper `ukrainian_tts.vocoder.infer` (must be installed
   / available) or instructs the user to run it manually.
-- Postprocesses the resulting WAV: peak normalize to -0.5 dBFS, resample to
-  44100 Hz and write PCM_24.
+- Postprocesses the resulting WAV: resample to 44100 Hz, normalise loudness
+  to -18 LUFS with a true-peak limiter (`ukrainian_tts.loudness`) and write
+  PCM_24.
+- Every stage output is kept in a content-addressed cache (`artifacts.py`,
+  `--cache-dir`): a re-run only recomputes stages whose text, voice, mel
+  parameters, checkpoint or inputs changed, and writes a manifest saying
+  which stages were reused.
 
 Usage examples:
 python ukrainian-tts/vocoder/pipeline_supervoice.py --text "Привіт" --voice dmytro --checkpoint /path/to/hifigan.pth --out out_super.wav
@@ -25,12 +30,16 @@ import argparse
 import importlib
 import importlib.util  # Explicit import to satisfy Pylance
 import os
+import shutil
 import sys
-import tempfile
 import numpy as np
 import soundfile as sf
 from typing import Any, cast
 
+# sibling modules, also when this file is loaded by path from the run_story scripts
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from artifacts import DEFAULT_ROOT, ArtifactCache  # noqa: E402
+
 
 def find_tts_package():
     # First, try to import an installed `ukrainian_tts` from site-packages
@@ -113,13 +122,20 @@ def synthesize_text_to_wav(TTSClass, text, voice, stress, device, out_wav):
     return out_wav
 
 
+def resample(y, orig_sr, target_sr):
+    """Resample with the TTS package's cached polyphase filters (`ukrainian_tts.resampling`)."""
+    find_tts_package()  # puts a local checkout on sys.path when the package isn't installed
+    from ukrainian_tts.resampling import resample as shared_resample  # type: ignore
+    return shared_resample(y, orig_sr, target_sr)
+
+
 def wav_to_mel(wav_path, sr=22050, n_fft=1024, hop_length=256, n_mels=80):
     import librosa
     y, orig_sr = sf.read(wav_path, dtype='float32')
     if y.ndim > 1:
         y = y.mean(axis=1)
     if orig_sr != sr:
-        y = librosa.resample(y, orig_sr=orig_sr, target_sr=sr)
+        y = resample(y, orig_sr, sr)
     # librosa power mel (use keyword arg for y for compatibility with newer librosa)
     mel = librosa.feature.melspectrogram(y=y, sr=sr, n_fft=n_fft, hop_length=hop_length, n_mels=n_mels, power=1.0)
     # convert to log scale (what most vocoders expect)
@@ -127,11 +143,11 @@ def wav_to_mel(wav_path, sr=22050, n_fft=1024, hop_length=256, n_mels=80):
     return mel, sr
 
 
-def normalize_peak(y, peak_db=-0.5):
-    # scale y to peak_db dBFS (peak_db negative)
-    peak = max(1e-9, float(np.max(np.abs(y))))
-    target = 10 ** (peak_db / 20.0)
-    return (y / peak) * target
+def normalize_loudness(y, sr, target_lufs=-18.0, ceiling=0.95):
+    """Integrated loudness to `target_lufs`, true peaks under `ceiling`; in place (`ukrainian_tts.loudness`)."""
+    find_tts_package()
+    from ukrainian_tts.loudness import normalise  # type: ignore
+    return normalise(y, sr, target_lufs, ceiling)
 
 
 def run_vocoder_infer(mel_path, checkpoint, out_wav, sr=22050):
@@ -181,6 +197,21 @@ def run_vocoder_infer(mel_path, checkpoint, out_wav, sr=22050):
     raise RuntimeError('No infer function available in ukrainian_tts.vocoder.infer')
 
 
+MEL_PARAMS = dict(sr=22050, n_fft=1024, hop_length=256, n_mels=80)
+MASTER_PARAMS = dict(target_sr=44100, target_lufs=-18.0, ceiling=0.95, subtype='PCM_24')
+
+
+def master_wav(in_wav, out_wav, target_sr=44100, target_lufs=-18.0, ceiling=0.95, subtype='PCM_24'):
+    """Resample to `target_sr`, normalise loudness and write `subtype`."""
+    y, sr_in = sf.read(in_wav, dtype='float32')
+    if y.ndim > 1:
+        y = y.mean(axis=1)
+    if sr_in != target_sr:
+        y = resample(y, sr_in, target_sr)
+    y = normalize_loudness(y, target_sr, target_lufs, ceiling)
+    sf.write(out_wav, y, target_sr, subtype=subtype)
+
+
 def main():
     p = argparse.ArgumentParser()
     g = p.add_mutually_exclusive_group(required=True)
@@ -191,32 +222,42 @@ def main():
     p.add_argument('--device', default='mps', help='Device for TTS (mps/cpu)')
     p.add_argument('--checkpoint', help='Path to vocoder checkpoint (required to run vocoder)')
     p.add_argument('--out', required=True, help='Output WAV path (final mastered WAV)')
-    p.add_argument('--tmpdir', help='Temporary directory to use')
+    p.add_argument('--cache-dir', default=os.environ.get('SUPERVOICE_CACHE', DEFAULT_ROOT),
+                   help='Artifact cache for stage outputs (env SUPERVOICE_CACHE)')
+    p.add_argument('--tmpdir', help='Use a fresh cache here instead (nothing is reused across runs)')
+    p.add_argument('--rebuild', action='store_true', help='Recompute every stage, refreshing the cache')
+    p.add_argument('--manifest', help='Where to write the run manifest (default: <out>.manifest.json)')
     args = p.parse_args()
 
-    tmpdir = args.tmpdir or tempfile.mkdtemp(prefix='supervoice_')
-    print('Using tmpdir:', tmpdir)
+    cache_dir = args.tmpdir or args.cache_dir
+    print('Using artifact cache:', cache_dir)
+    cache = ArtifactCache(cache_dir, rebuild=args.rebuild)
 
-    source_wav = None
     if args.text:
-        TTSClass = find_tts_package()
-        if TTSClass is None:
-            raise RuntimeError('Could not find a local ukrainian_tts package. Ensure ukrainian-tts-mps or ukrainian-tts is available in the repository.')
-        source_wav = os.path.join(tmpdir, 'tts_out.wav')
-        print('Synthesizing text to', source_wav)
-        synthesize_text_to_wav(TTSClass, args.text, args.voice, args.stress, args.device, source_wav)
+        def synthesize(tmp):
+            TTSClass = find_tts_package()
+            if TTSClass is None:
+                raise RuntimeError('Could not find a local ukrainian_tts package. Ensure ukrainian-tts-mps or ukrainian-tts is available in the repository.')
+            print('Synthesizing text to', tmp)
+            synthesize_text_to_wav(TTSClass, args.text, args.voice, args.stress, args.device, tmp)
+
+        tts_params = dict(text=args.text, voice=args.voice, stress=args.stress, device=args.device)
+        source_wav, source_key = cache.stage('tts', tts_params, [], '.wav', synthesize)
     else:
         source_wav = args.wav
         if not os.path.exists(source_wav):
             raise FileNotFoundError(f'Source wav not found: {source_wav}')
+        source_key = cache.source(source_wav)
 
     print('Extracting mel...')
-    mel, sr = wav_to_mel(source_wav)
-    mel_path = os.path.join(tmpdir, 'mel.npy')
-    np.save(mel_path, mel)
-    print('Saved mel to', mel_path, 'shape', mel.shape)
+    mel_path, mel_key = cache.stage('mel', MEL_PARAMS, [source_key], '.npy',
+                                    lambda tmp: np.save(tmp, wav_to_mel(source_wav, **MEL_PARAMS)[0]))
+    sr = MEL_PARAMS['sr']
+    print('Mel at', mel_path)
 
+    manifest_path = args.manifest or os.path.splitext(args.out)[0] + '.manifest.json'
     if not args.checkpoint:
+        cache.write_manifest(manifest_path, {'out': None})
         print('\nNo vocoder checkpoint provided. To get the best quality, provide a HiFi-GAN or ParallelWaveGAN checkpoint.\n')
         print('Example (HiFi-GAN): --checkpoint /path/to/hifigan_generator.pth')
         print('You can still run the vocoder manually with:')
@@ -224,36 +265,21 @@ def main():
         return
 
     print('Running vocoder infer...')
-    voc_out = os.path.join(tmpdir, 'vocoder_out.wav')
-    run_vocoder_infer(mel_path, args.checkpoint, voc_out, sr=sr)
-    print('Vocoder wrote', voc_out)
+    # a checkpoint that is not where it was given is resolved inside run_vocoder_infer: key it by path
+    checkpoint_key = cache.source(args.checkpoint) if os.path.exists(args.checkpoint) else args.checkpoint
+    voc_out, voc_key = cache.stage('vocoder', {'sr': sr}, [mel_key, checkpoint_key], '.wav',
+                                   lambda tmp: run_vocoder_infer(mel_path, args.checkpoint, tmp, sr=sr))
+    print('Vocoder output', voc_out)
 
     # Postprocess: read, normalize, resample to 44.1k PCM_24
     print('Postprocessing: normalize and resample to 44.1k PCM_24')
-    import librosa
-    from scipy.signal import resample_poly
-    y, sr_in = sf.read(voc_out, dtype='float32')
-    if y.ndim > 1:
-        y = y.mean(axis=1)
-    target_sr = 44100
-    if sr_in != target_sr:
-        # Use scipy.signal.resample_poly for robust resampling (avoids librosa API
-        # compatibility issues across versions). resample_poly expects (x, up, down).
-        # Compute integer up/down factors approximating the ratio.
-        from math import gcd
-        up = target_sr
-        down = sr_in
-        g = gcd(up, down)
-        up //= g
-        down //= g
-        if y.ndim == 1:
-            y = resample_poly(y, up, down)
-        else:
-            # apply per-channel
-            y = np.stack([resample_poly(y[:, i], up, down) for i in range(y.shape[1])], axis=1)
-    y = normalize_peak(y, peak_db=-0.5)
-    sf.write(args.out, y, target_sr, subtype='PCM_24')
+    mastered, _ = cache.stage('master', MASTER_PARAMS, [voc_key], '.wav',
+                              lambda tmp: master_wav(voc_out, tmp, **MASTER_PARAMS))
+    shutil.copyfile(mastered, args.out)
+    manifest = cache.write_manifest(manifest_path, {'out': os.path.abspath(args.out)})
     print('Wrote final mastered WAV to', args.out)
+    print('Reused:', ', '.join(manifest['reused']) or '-', '| recomputed:', ', '.join(manifest['recomputed']) or '-',
+          '| manifest:', manifest_path)
 
 
 if __name__ == '__main__':
@@ -79,25 +79,15 @@ def main():
 
     # Postprocess and write final mastered WAV (PCM_24, 44.1k)
     import soundfile as sf
-    from scipy.signal import resample_poly
     y, sr_in = sf.read(voc_out, dtype='float32')
     if y.ndim > 1:
         y = y.mean(axis=1)
     target_sr = 44100
     if sr_in != target_sr:
-        from math import gcd
-        up = target_sr
-        down = sr_in
-        g = gcd(up, down)
-        up //= g
-        down //= g
-        y = resample_poly(y, up, down)
-
-    # normalize (match prior pipeline behavior)
-    import numpy as _np
-    peak = max(1e-9, float(_np.max(_np.abs(y))))
-    target = 10 ** (-0.5 / 20.0)
-    y = (y / peak) * target
+        y = mod.resample(y, sr_in, target_sr)
+
+    # loudness (match the pipeline's mastering)
+    y = mod.normalize_loudness(y, target_sr)
     sf.write(args.out, y, target_sr, subtype='PCM_24')
     print('Wrote final mastered WAV to', args.out)
 
@@ -10,7 +10,7 @@ The script:
 - applies optional word->replacement overrides (JSON)
 - if --extra-pauses is set it inserts sentence breaks (splits on commas) to increase pauses
 - synthesizes with Coqui TTS `tts_models/uk/mai/vits` with the requested speed
-- rescales to 44.1kHz and writes PCM_24
+- rescales to 44.1kHz, normalises loudness to -18 LUFS and writes PCM_24
 
 This is a pragmatic helper for iterative manual correction of intonation. For precise control we can accept phonetic (IPA) overrides in the JSON file.
 """
@@ -18,7 +18,7 @@ import argparse
 import json
 import os
 import re
-from math import gcd
+import sys
 
 try:
     from TTS.api import TTS
@@ -26,7 +26,11 @@ except Exception as e:
     raise RuntimeError('TTS package not available in current Python environment') from e
 
 import soundfile as sf
-from scipy.signal import resample_poly
+
+# the package lives one level up when the script runs from a checkout
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ukrainian_tts.loudness import normalise  # noqa: E402
+from ukrainian_tts.resampling import resample  # noqa: E402
 
 
 def extract_story(script_path):
@@ -67,20 +71,13 @@ def synthesize_and_master(text, out_path, speed=0.7, tmp_raw='/tmp/tts_raw.wav')
     # synthesize to temporary raw file (model sample_rate is typically 22050)
     model.tts_to_file(text=text, file_path=tmp_raw, speed=speed, split_sentences=True)
 
-    # postprocess: resample to 44100 and normalize to -0.5 dBFS
+    # postprocess: resample to 44100, loudness to -18 LUFS with a true-peak limiter
     y, sr = sf.read(tmp_raw, dtype='float32')
     if y.ndim > 1:
         y = y.mean(axis=1)
     if sr != 44100:
-        up = 44100
-        down = sr
-        g = gcd(up, down)
-        up //= g
-        down //= g
-        y = resample_poly(y, up, down)
-    peak = max(1e-9, float(abs(y).max()))
-    target = 10 ** (-0.5 / 20.0)
-    y = (y / peak) * target
+        y = resample(y, sr, 44100)
+    y = normalise(y, 44100)
     sf.write(out_path, y, 44100, subtype='PCM_24')
 
 
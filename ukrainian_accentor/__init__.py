@@ -13,16 +13,26 @@ module and install the official distribution instead.
 """
 from __future__ import annotations
 
-from typing import Callable
+from functools import lru_cache
+from typing import Callable, List, Sequence
 
-try:  # pragma: no cover - best effort optional dependency
-    from ukrainian_word_stress import Stressifier, StressSymbol
-except Exception as exc:  # pragma: no cover
-    raise ImportError(
-        "ukrainian_word_stress is required for the fallback ukrainian_accentor"
-    ) from exc
+_COMBINING_ACUTE = "\u0301"
 
-_stressifier = Stressifier(stress_symbol=StressSymbol.CombiningAcuteAccent)
+
+@lru_cache(maxsize=None)
+def _get_stressifier() -> Callable[[str], str]:
+    """Return the shared Stressifier, built on first use.
+
+    Building it loads a stanza pipeline, so importing this module stays cheap
+    and processes that never need model stress never pay for it.
+    """
+    try:  # pragma: no cover - best effort optional dependency
+        from ukrainian_word_stress import Stressifier, StressSymbol
+    except Exception as exc:  # pragma: no cover
+        raise ImportError(
+            "ukrainian_word_stress is required for the fallback ukrainian_accentor"
+        ) from exc
+    return Stressifier(stress_symbol=StressSymbol.CombiningAcuteAccent)
 
 
 def _shift_plus_markers(text: str, marker: str = "+") -> str:
@@ -65,13 +75,38 @@ def process(text: str, mode: str = "plus", *, _shift_fn: Callable[[str], str] |
     if not text:
         return text
 
-    stressed = _stressifier(text)
+    stressed = _get_stressifier()(text)
     if mode != "plus":
         return stressed
 
-    shifted = stressed.replace(StressSymbol.CombiningAcuteAccent, "+")
+    shifted = stressed.replace(_COMBINING_ACUTE, "+")
     shift = _shift_fn or _shift_plus_markers
     return shift(shifted)
 
 
-__all__ = ["process"]
+def process_many(texts: Sequence[str], mode: str = "plus") -> List[str]:
+    """Batched variant of :func:`process`.
+
+    All distinct non-empty ``texts`` are joined with newlines and stressed
+    with a single Stressifier pass, so the NLP pipeline runs once per batch
+    instead of once per word. Falls back to per-text processing if the
+    newline layout does not survive the round trip.
+    """
+    unique = [text for text in dict.fromkeys(texts) if text]
+    if not unique:
+        return list(texts)
+
+    stressed_lines = _get_stressifier()("\n".join(unique)).split("\n")
+    if len(stressed_lines) != len(unique):
+        stressed_lines = [_get_stressifier()(text) for text in unique]
+
+    if mode == "plus":
+        stressed_lines = [
+            _shift_plus_markers(line.replace(_COMBINING_ACUTE, "+"))
+            for line in stressed_lines
+        ]
+    resolved = dict(zip(unique, stressed_lines))
+    return [resolved.get(text, text) for text in texts]
+
+
+__all__ = ["process", "process_many"]